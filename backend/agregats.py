@@ -0,0 +1,174 @@
+"""
+Agrégats du dataset Superstore construits en flux
+🧮 Alimentés bloc par bloc pendant la lecture du CSV
+📊 Suffisent à calculer tous les KPI sans garder les lignes brutes en mémoire
+"""
+
+from typing import List, Dict, Optional
+import hashlib
+import pandas as pd
+
+# Dimensions du cube au grain "commande" (permet des nunique exacts)
+DIMENSIONS_CUBE = ['Order ID', 'Customer ID', 'Order Date', 'Category', 'Region', 'Segment']
+
+# Mesures additives agrégées dans le cube et la table produits
+MESURES = ['Sales', 'Profit', 'Quantity']
+
+# Nombre de cubes partiels accumulés avant compactage
+SEUIL_COMPACTAGE = 8
+
+
+class Agregats:
+    """
+    Résultat figé de la construction des agrégats
+
+    Attributes:
+        commandes: Cube au grain commande × client × date × catégorie × région × segment
+        produits: Ventes par (produit, catégorie)
+        noms_clients: Nom de chaque client (premier rencontré), indexé par Customer ID
+        etats: Liste triée des États
+        nb_lignes: Nombre de lignes brutes agrégées
+        empreinte: Empreinte du contenu des lignes agrégées (identique d'un
+            démarrage à l'autre tant que les données ne changent pas)
+    """
+
+    def __init__(
+        self,
+        commandes: pd.DataFrame,
+        produits: pd.DataFrame,
+        noms_clients: pd.Series,
+        etats: List[str],
+        nb_lignes: int,
+        empreinte: str = ""
+    ):
+        self.commandes = commandes
+        self.produits = produits
+        self.noms_clients = noms_clients
+        self.etats = etats
+        self.nb_lignes = nb_lignes
+        self.empreinte = empreinte
+
+    @property
+    def date_min(self) -> Optional[str]:
+        if self.commandes.empty:
+            return None
+        return self.commandes['Order Date'].min().strftime('%Y-%m-%d')
+
+    @property
+    def date_max(self) -> Optional[str]:
+        if self.commandes.empty:
+            return None
+        return self.commandes['Order Date'].max().strftime('%Y-%m-%d')
+
+
+class ConstructeurAgregats:
+    """
+    Construit les agrégats de manière incrémentale : chaque bloc de lignes
+    est réduit immédiatement, puis les réductions partielles sont fusionnées
+    """
+
+    def __init__(self):
+        self._commandes: List[pd.DataFrame] = []
+        self._produits: List[pd.DataFrame] = []
+        self._noms: Dict[str, str] = {}
+        self._etats: set = set()
+        self.nb_lignes = 0
+        # Empreinte chaînée des blocs ajoutés (dans l'ordre)
+        self._empreinte = hashlib.sha256()
+
+    @classmethod
+    def depuis(cls, agregats: Agregats) -> "ConstructeurAgregats":
+        """
+        Repart d'agrégats existants pour y intégrer de nouveaux blocs
+        (ingestion incrémentale, sans relire les lignes brutes)
+        """
+        constructeur = cls()
+        constructeur._commandes = [agregats.commandes]
+        constructeur._produits = [agregats.produits]
+        constructeur._noms = agregats.noms_clients.to_dict()
+        constructeur._etats = set(agregats.etats)
+        constructeur.nb_lignes = agregats.nb_lignes
+        constructeur._empreinte.update(agregats.empreinte.encode())
+        return constructeur
+
+    def ajouter(self, bloc: pd.DataFrame) -> None:
+        """
+        Intègre un bloc de lignes brutes nettoyées
+
+        Args:
+            bloc: Lignes du dataset (mêmes colonnes que le CSV)
+        """
+        if bloc.empty:
+            return
+        self.nb_lignes += len(bloc)
+
+        # Empreinte : colonnes, taille du bloc et hachage de chaque ligne
+        self._empreinte.update("|".join(map(str, bloc.columns)).encode())
+        self._empreinte.update(len(bloc).to_bytes(8, "little"))
+        self._empreinte.update(pd.util.hash_pandas_object(bloc, index=False).to_numpy().tobytes())
+
+        self._commandes.append(
+            bloc.groupby(DIMENSIONS_CUBE, sort=False, dropna=False)[MESURES].sum().reset_index()
+        )
+        self._produits.append(
+            bloc.groupby(['Product Name', 'Category'], sort=False)[MESURES].sum().reset_index()
+        )
+
+        # Premier nom rencontré pour chaque client
+        noms = bloc.drop_duplicates('Customer ID')
+        for customer_id, nom in zip(noms['Customer ID'], noms['Customer Name']):
+            self._noms.setdefault(customer_id, nom)
+        self._etats.update(bloc['State'].dropna().unique().tolist())
+
+        if len(self._commandes) >= SEUIL_COMPACTAGE:
+            self._compacter()
+
+    def _compacter(self) -> None:
+        """Fusionne les réductions partielles pour borner la mémoire"""
+        self._commandes = [_fusionner(self._commandes, DIMENSIONS_CUBE)]
+        self._produits = [_fusionner(self._produits, ['Product Name', 'Category'])]
+
+    def finaliser(self) -> Agregats:
+        """
+        Fusionne les réductions partielles et retourne les agrégats
+
+        Returns:
+            Agregats: Agrégats prêts à servir les KPI
+        """
+        colonnes_cube = DIMENSIONS_CUBE + MESURES
+        colonnes_produits = ['Product Name', 'Category'] + MESURES
+        commandes = _fusionner(self._commandes, DIMENSIONS_CUBE) if self._commandes \
+            else pd.DataFrame(columns=colonnes_cube)
+        produits = _fusionner(self._produits, ['Product Name', 'Category']) if self._produits \
+            else pd.DataFrame(columns=colonnes_produits)
+        # Ordre des clés identique à un groupby classique (départage stable des ex aequo)
+        produits = produits.sort_values(['Product Name', 'Category'], ignore_index=True)
+        noms_clients = pd.Series(self._noms, name='Customer Name', dtype=object)
+        return Agregats(
+            _compacter_textes(commandes),
+            _compacter_textes(produits),
+            noms_clients,
+            sorted(self._etats),
+            self.nb_lignes,
+            self._empreinte.hexdigest()[:32]
+        )
+
+
+def _compacter_textes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit les colonnes texte en 'category' : les valeurs deviennent des
+    codes entiers dans des tableaux NumPy, bien plus compacts, et qui restent
+    partagés (copy-on-write) entre les workers forkés au lieu d'être recopiés
+    à chaque mise à jour de compteur de références Python
+    """
+    for colonne in df.columns:
+        if df[colonne].dtype == object:
+            df[colonne] = df[colonne].astype('category')
+    return df
+
+def _fusionner(parties: List[pd.DataFrame], cles: List[str]) -> pd.DataFrame:
+    """Concatène des réductions partielles et ré-agrège les mesures"""
+    if len(parties) == 1:
+        return parties[0]
+    fusion = pd.concat(parties, ignore_index=True)
+    return fusion.groupby(cles, sort=False, dropna=False, observed=True)[MESURES].sum().reset_index()
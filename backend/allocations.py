@@ -0,0 +1,110 @@
+"""
+Suivi des allocations mémoire des calculs (mode débogage)
+🧪 tracemalloc mesure, pour chaque calcul, le pic d'allocations (copies
+   temporaires de tables comprises) et ce qui reste alloué à la fin (net)
+📊 Statistiques par endpoint : pour mesurer un travail d'élimination de
+   copies et repérer les régressions
+⚠️ Débogage seulement : tracemalloc ralentit chaque allocation Python, et
+   les calculs mesurés passent un par un (le pic de tracemalloc est global
+   au processus : deux calculs simultanés se mélangeraient)
+"""
+
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List
+import threading
+import tracemalloc
+
+from etapes import noter
+
+
+class SuiviAllocations:
+    """
+    Pic et net des allocations de chaque calcul, cumulés par endpoint
+
+    Attributes:
+        actif: Suivi démarré (sinon mesurer() ne fait rien)
+    """
+
+    def __init__(self, actif: bool, nb_cadres: int = 1):
+        self.actif = actif
+        self._verrou_mesure = threading.Lock()
+        self._verrou = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        if actif and not tracemalloc.is_tracing():
+            tracemalloc.start(nb_cadres)
+
+    def mesurer(self, endpoint: str):
+        """
+        Bloc dont les allocations sont mesurées et attribuées à endpoint ;
+        le pic et le net sont aussi notés dans l'étape en cours (voir etapes.py)
+        """
+        if not self.actif:
+            return nullcontext()
+        return self._mesurer(endpoint)
+
+    @contextmanager
+    def _mesurer(self, endpoint: str) -> Iterator[None]:
+        with self._verrou_mesure:
+            avant, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                yield
+            finally:
+                apres, pic = tracemalloc.get_traced_memory()
+                self._ajouter(endpoint, pic - avant, apres - avant)
+
+    def _ajouter(self, endpoint: str, pic: int, net: int) -> None:
+        noter(allocation_pic_octets=pic, allocation_nette_octets=net)
+        with self._verrou:
+            stats = self._stats.setdefault(endpoint, {
+                "nb_calculs": 0, "pic_total": 0, "pic_max": 0, "net_total": 0, "dernier_pic": 0, "dernier_net": 0
+            })
+            stats["nb_calculs"] += 1
+            stats["pic_total"] += pic
+            stats["pic_max"] = max(stats["pic_max"], pic)
+            stats["net_total"] += net
+            stats["dernier_pic"], stats["dernier_net"] = pic, net
+
+    def par_endpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Pic moyen / maximal et net moyen (octets) des calculs de chaque endpoint"""
+        with self._verrou:
+            stats = {endpoint: dict(valeurs) for endpoint, valeurs in self._stats.items()}
+        return {
+            endpoint: {
+                "nb_calculs": s["nb_calculs"],
+                "pic_moyen_octets": int(s["pic_total"] / s["nb_calculs"]),
+                "pic_max_octets": s["pic_max"],
+                "net_moyen_octets": int(s["net_total"] / s["nb_calculs"]),
+                "dernier_pic_octets": s["dernier_pic"],
+                "dernier_net_octets": s["dernier_net"]
+            }
+            for endpoint, s in sorted(stats.items())
+        }
+
+    def reinitialiser(self) -> None:
+        """Repart de zéro (ex. avant de mesurer une optimisation)"""
+        with self._verrou:
+            self._stats.clear()
+
+    def principaux_sites(self, nombre: int) -> List[Dict[str, Any]]:
+        """Lignes de code qui retiennent le plus de mémoire en ce moment (instantané tracemalloc)"""
+        if not self.actif:
+            return []
+        instantane = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        return [
+            {"site": str(stat.traceback[0]), "octets": stat.size, "blocs": stat.count}
+            for stat in instantane.statistics("lineno")[:nombre]
+        ]
+
+    def etat(self) -> Dict[str, Any]:
+        if not self.actif:
+            return {"actif": False}
+        courant, _ = tracemalloc.get_traced_memory()
+        return {
+            "actif": True,
+            "suivi_courant_octets": courant,
+            "surcout_tracemalloc_octets": tracemalloc.get_tracemalloc_memory()
+        }
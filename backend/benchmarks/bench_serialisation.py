@@ -0,0 +1,85 @@
+"""
+Benchmark de la latence des endpoints (calcul + sérialisation JSON)
+⏱️ Médiane et p95 par endpoint, mesurées dans le processus (sans réseau)
+🧹 Les caches de réponses (mémoire et disque) sont vidés avant chaque requête
+   et le préchauffage est désactivé : chaque mesure calcule et sérialise vraiment
+
+Usage (depuis backend/) :
+    python benchmarks/bench_serialisation.py --repetitions 50
+
+Pour comparer avant/après une modification, lancer le script sur deux copies
+du backend (ex. `git worktree add /tmp/avant HEAD~1`) :
+    python benchmarks/bench_serialisation.py --backend /tmp/avant/backend
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+DOSSIER_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoints mesurés (les plus coûteux à sérialiser en dernier)
+URLS = [
+    "/kpi/globaux",
+    "/kpi/globaux?categorie=Technology&region=West",
+    "/kpi/produits/top?limite=50",
+    "/kpi/categories",
+    "/kpi/geographique",
+    "/kpi/clients?limite=100",
+    "/kpi/temporel?periode=mois",
+    "/kpi/temporel?periode=jour",
+    "/filters/valeurs",
+    "/data/commandes?limite=1000",
+    "/data/commandes?limite=1000&offset=5000",
+]
+
+# Réponses non compressées : seuls le calcul et la sérialisation sont mesurés
+SANS_COMPRESSION = {"Accept-Encoding": "identity"}
+
+
+def vider_caches(api) -> None:
+    """Vide les caches de réponses (hors chronométrage) : la requête suivante est recalculée"""
+    api.cache_resultats.vider()
+    if getattr(api, "cache_disque", None):
+        api.cache_disque.vider()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=DOSSIER_BACKEND, help="Dossier backend à mesurer")
+    parser.add_argument("--repetitions", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.backend))
+    os.chdir(args.backend)
+    # Pas de préchauffage : il remplirait le cache entre deux mesures
+    os.environ["PRECHAUFFAGE"] = "0"
+    from fastapi.testclient import TestClient
+    import main as api
+
+    with TestClient(api.app) as client:
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.2)
+
+        print(f"{'endpoint':<45} | {'médiane':>9} | {'p95':>9} | {'taille':>9}")
+        print("-" * 82)
+        for url in URLS:
+            client.get(url, headers=SANS_COMPRESSION)  # chauffe (tables matérialisées, partitions)
+            durees = []
+            for _ in range(args.repetitions):
+                vider_caches(api)
+                debut = time.perf_counter()
+                reponse = client.get(url, headers=SANS_COMPRESSION)
+                durees.append((time.perf_counter() - debut) * 1000)
+            durees.sort()
+            p95 = durees[int(len(durees) * 0.95) - 1]
+            print(
+                f"{url:<45} | {statistics.median(durees):>7.2f}ms | {p95:>7.2f}ms | "
+                f"{len(reponse.content) / 1024:>7.1f}Ko"
+            )
+
+
+if __name__ == "__main__":
+    main()
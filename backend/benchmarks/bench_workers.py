@@ -0,0 +1,126 @@
+"""
+Benchmark du mode production (serveur.py)
+📏 Mémoire par worker (RSS, PSS, privée) et débit selon le nombre de workers
+
+Usage (depuis backend/) :
+    python benchmarks/bench_workers.py --workers 1 2 4 --duree 10 --clients 16
+
+Nécessite Linux (/proc/<pid>/smaps_rollup). La PSS répartit les pages partagées
+entre les processus : si le dataset est bien partagé en copy-on-write, la mémoire
+privée de chaque worker reste faible devant sa RSS.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DOSSIER_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mélange de requêtes représentatif des dashboards
+URLS = [
+    "/kpi/globaux",
+    "/kpi/globaux?categorie=Technology&region=West",
+    "/kpi/temporel?periode=mois",
+    "/kpi/temporel?periode=jour",
+    "/kpi/clients?limite=5",
+    "/kpi/categories",
+    "/kpi/geographique",
+    "/kpi/produits/top?limite=8",
+]
+
+
+def memoire(pid: int) -> dict:
+    """Rss, Pss et mémoire privée (en Mo) d'un processus"""
+    valeurs = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for ligne in f:
+            morceaux = ligne.split()
+            if len(morceaux) >= 2 and morceaux[0].rstrip(":") in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                valeurs[morceaux[0].rstrip(":")] = int(morceaux[1]) / 1024
+    return {
+        "rss": valeurs.get("Rss", 0),
+        "pss": valeurs.get("Pss", 0),
+        "privee": valeurs.get("Private_Clean", 0) + valeurs.get("Private_Dirty", 0),
+    }
+
+
+def enfants(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def attendre_pret(base: str, delai: float = 300) -> None:
+    fin = time.time() + delai
+    while time.time() < fin:
+        try:
+            with urllib.request.urlopen(f"{base}/ready", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Le serveur n'est pas prêt")
+
+
+def mesurer_debit(base: str, duree: float, clients: int) -> float:
+    """Nombre de requêtes par seconde avec `clients` clients concurrents"""
+    fin = time.time() + duree
+
+    def client(indice: int) -> int:
+        nb = 0
+        while time.time() < fin:
+            url = base + URLS[(indice + nb) % len(URLS)]
+            with urllib.request.urlopen(url, timeout=60) as r:
+                r.read()
+            nb += 1
+        return nb
+
+    debut = time.time()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(client, range(clients)))
+    return total / (time.time() - debut)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duree", type=float, default=10, help="Durée de la mesure de débit (s)")
+    parser.add_argument("--clients", type=int, default=16, help="Clients concurrents")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"{'workers':>7} | {'RSS/worker':>10} | {'PSS/worker':>10} | {'privée/worker':>13} | {'PSS totale':>10} | {'req/s':>8}")
+    print("-" * 75)
+    for nb_workers in args.workers:
+        serveur = subprocess.Popen(
+            [sys.executable, "serveur.py", "--workers", str(nb_workers), "--port", str(args.port)],
+            cwd=DOSSIER_BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            attendre_pret(base)
+            # Une passe de chauffe pour que chaque worker ait touché ses données
+            mesurer_debit(base, 2, args.clients)
+            debit = mesurer_debit(base, args.duree, args.clients)
+
+            workers = [memoire(pid) for pid in enfants(serveur.pid)]
+            parent = memoire(serveur.pid)
+            n = max(len(workers), 1)
+            pss_totale = parent["pss"] + sum(w["pss"] for w in workers)
+            print(
+                f"{nb_workers:>7} | {sum(w['rss'] for w in workers) / n:>8.1f}Mo | "
+                f"{sum(w['pss'] for w in workers) / n:>8.1f}Mo | {sum(w['privee'] for w in workers) / n:>11.1f}Mo | "
+                f"{pss_totale:>8.1f}Mo | {debit:>8.1f}"
+            )
+        finally:
+            serveur.send_signal(signal.SIGTERM)
+            serveur.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
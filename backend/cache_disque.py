@@ -0,0 +1,188 @@
+"""
+Cache des réponses sur disque (SQLite)
+💽 Les réponses calculées survivent à un redémarrage du backend : tant que les
+   données (et le code des calculs) n'ont pas changé, elles sont resservies
+   sans recalcul dès le démarrage
+🧹 Taille bornée, éviction des réponses les moins récemment utilisées (LRU)
+"""
+
+from typing import Optional, Hashable, Iterable, List, Dict, Any
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from cache_resultats import decrire_cle, taux_succes
+
+logger = logging.getLogger(__name__)
+
+
+def empreinte_code(fichiers: Iterable[str]) -> str:
+    """
+    Empreinte du code qui produit les réponses (sources + versions de pandas/pyarrow)
+
+    Elle fait partie de chaque clé : après une modification des calculs, les
+    réponses enregistrées par l'ancien code ne sont plus jamais servies.
+    """
+    empreinte = hashlib.sha256(f"pandas {pd.__version__} pyarrow {pa.__version__}".encode())
+    for fichier in sorted(fichiers):
+        with open(fichier, "rb") as f:
+            empreinte.update(f.read())
+    return empreinte.hexdigest()[:16]
+
+
+class CacheDisque:
+    """
+    Réponses sérialisées (et leurs variantes compressées) dans une base SQLite
+
+    Une ligne par (clé, encodage). La date du dernier accès sert à l'éviction :
+    au-delà du budget, les lignes les plus anciennement lues sont supprimées.
+    Plusieurs workers peuvent partager le même fichier (verrouillage SQLite).
+    """
+
+    def __init__(self, repertoire: str, budget_octets: int, version_code: str):
+        os.makedirs(repertoire, exist_ok=True)
+        self.chemin = os.path.join(repertoire, "reponses.sqlite")
+        self.budget_octets = budget_octets
+        self.version_code = version_code
+        self._verrou = threading.Lock()
+        self._pid = None
+        with self._verrou, self._connexion:
+            self._connexion.execute("PRAGMA journal_mode=WAL")
+            self._connexion.execute(
+                "CREATE TABLE IF NOT EXISTS reponses ("
+                " cle TEXT NOT NULL, encodage TEXT NOT NULL, fonction TEXT NOT NULL,"
+                " description TEXT NOT NULL DEFAULT '', contenu BLOB NOT NULL, taille INTEGER NOT NULL,"
+                " dernier_acces REAL NOT NULL, lectures INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (cle, encodage))"
+            )
+            self._connexion.execute("CREATE INDEX IF NOT EXISTS reponses_acces ON reponses (dernier_acces)")
+            # Réponses produites par une autre version du code : inutilisables
+            self._connexion.execute("DELETE FROM reponses WHERE cle NOT LIKE ?", (f"{version_code}:%",))
+        self.nb_succes = 0
+        self.nb_echecs = 0
+
+    @property
+    def _connexion(self) -> sqlite3.Connection:
+        """
+        Connexion propre au processus : une connexion SQLite ne doit pas être
+        réutilisée après un fork (workers lancés après le préchargement)
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connexion_processus = sqlite3.connect(self.chemin, check_same_thread=False, timeout=5)
+        return self._connexion_processus
+
+    def _cle(self, cle: Hashable) -> str:
+        return f"{self.version_code}:{hashlib.sha256(repr(cle).encode()).hexdigest()}"
+
+    def lire(self, cle: Hashable, encodage: str) -> Optional[bytes]:
+        """Retourne une variante de la réponse (et note l'accès) ou None"""
+        cle_texte = self._cle(cle)
+        with self._verrou:
+            try:
+                ligne = self._connexion.execute(
+                    "SELECT contenu FROM reponses WHERE cle = ? AND encodage = ?", (cle_texte, encodage)
+                ).fetchone()
+                if ligne is None:
+                    self.nb_echecs += 1
+                    return None
+                with self._connexion:
+                    self._connexion.execute(
+                        "UPDATE reponses SET dernier_acces = ?, lectures = lectures + 1"
+                        " WHERE cle = ? AND encodage = ?",
+                        (time.time(), cle_texte, encodage)
+                    )
+            except sqlite3.Error as e:
+                # Le cache disque n'est qu'une optimisation : une erreur = un échec de lecture
+                logger.warning(f"⚠️ Lecture du cache disque impossible : {e}")
+                return None
+            self.nb_succes += 1
+            return bytes(ligne[0])
+
+    def ajouter(self, cle: Hashable, contenu: bytes, encodage: str) -> None:
+        """Enregistre une variante puis supprime les moins récemment lues si le budget est dépassé"""
+        if len(contenu) > self.budget_octets:
+            return
+        with self._verrou:
+            try:
+                with self._connexion:
+                    self._connexion.execute(
+                        "INSERT OR REPLACE INTO reponses (cle, encodage, fonction, description, contenu, taille, dernier_acces)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (self._cle(cle), encodage, str(cle[0]), decrire_cle(cle), contenu, len(contenu), time.time())
+                    )
+                    self._evincer()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Écriture dans le cache disque impossible : {e}")
+
+    def _evincer(self) -> None:
+        """Supprime les lignes les plus anciennement lues jusqu'à revenir sous le budget"""
+        total = self._connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM reponses").fetchone()[0]
+        if total <= self.budget_octets:
+            return
+        a_liberer = total - self.budget_octets
+        # Seuil d'accès en dessous duquel les lignes cumulées libèrent assez de place
+        for dernier_acces, cumul in self._connexion.execute(
+            "SELECT dernier_acces, SUM(taille) OVER (ORDER BY dernier_acces) FROM reponses ORDER BY dernier_acces"
+        ).fetchall():
+            if cumul >= a_liberer:
+                self._connexion.execute("DELETE FROM reponses WHERE dernier_acces <= ?", (dernier_acces,))
+                return
+
+    def invalider(self, fonction: Optional[str] = None, motif: Optional[str] = None) -> int:
+        """
+        Supprime les réponses d'une fonction de calcul et/ou dont la clé
+        (voir decrire_cle) correspond au motif (*, ?, [...], comme CacheResultats.invalider)
+
+        Returns:
+            int: Nombre de réponses supprimées
+        """
+        conditions, valeurs = [], []
+        if fonction is not None:
+            conditions.append("fonction = ?")
+            valeurs.append(fonction)
+        if motif is not None:
+            conditions.append("description GLOB ?")
+            valeurs.append(motif)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        with self._verrou, self._connexion:
+            nombre = self._connexion.execute(f"SELECT COUNT(DISTINCT cle) FROM reponses{where}", valeurs).fetchone()[0]
+            self._connexion.execute(f"DELETE FROM reponses{where}", valeurs)
+        return nombre
+
+    def vider(self) -> None:
+        """Supprime toutes les réponses enregistrées"""
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM reponses")
+
+    def principales(self, nombre: int = 10) -> List[Dict[str, Any]]:
+        """Réponses les plus lues, avec leur taille et leurs variantes"""
+        with self._verrou:
+            lignes = self._connexion.execute(
+                "SELECT description, SUM(lectures), SUM(taille), GROUP_CONCAT(encodage) FROM reponses"
+                " GROUP BY cle ORDER BY SUM(lectures) DESC, MAX(dernier_acces) DESC LIMIT ?", (nombre,)
+            ).fetchall()
+        return [
+            {"cle": description, "lectures": lectures, "octets": octets, "encodages": sorted(encodages.split(","))}
+            for description, lectures, octets, encodages in lignes
+        ]
+
+    def etat(self) -> dict:
+        with self._verrou:
+            entrees, octets = self._connexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM reponses"
+            ).fetchone()
+        return {
+            "entrees": entrees,
+            "octets": octets,
+            "budget_octets": self.budget_octets,
+            "succes": self.nb_succes,
+            "echecs": self.nb_echecs,
+            "taux_succes": taux_succes(self.nb_succes, self.nb_echecs)
+        }
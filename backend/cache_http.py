@@ -0,0 +1,89 @@
+"""
+Cache HTTP des réponses (ETag / Last-Modified)
+🏷️ L'ETag d'une réponse ne dépend que de l'empreinte des données et des
+   paramètres normalisés : il est connu AVANT tout calcul
+↩️ If-None-Match (ou If-Modified-Since) correspondant -> 304 sans calcul ni corps
+"""
+
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, Optional
+import hashlib
+
+from versions import Snapshot
+
+
+def etag(cle: Hashable) -> str:
+    """
+    ETag fort d'une réponse
+
+    La clé contient l'empreinte du contenu des données : l'ETag reste le même
+    après un redémarrage ou un rechargement tant que les données ne changent pas.
+
+    Args:
+        cle: Clé normalisée du calcul (voir kpi.cle_calcul)
+    """
+    return '"' + hashlib.sha1(repr(cle).encode()).hexdigest()[:20] + '"'
+
+
+def derniere_modification(snap: Snapshot) -> str:
+    """Date de publication de la version, au format HTTP (en-tête Last-Modified)"""
+    return format_datetime(snap.cree_le.astimezone(timezone.utc), usegmt=True)
+
+
+def entetes_cache(
+    snap: Snapshot,
+    cle: Hashable,
+    max_age_s: int,
+    vary: str = "Accept, Accept-Encoding",
+    encodage: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    En-têtes de cache HTTP, identiques sur la réponse 200 et la réponse 304
+
+    Args:
+        encodage: Compression négociée (une variante compressée a son propre ETag)
+    """
+    return {
+        "ETag": etag((cle, encodage) if encodage else cle),
+        "Last-Modified": derniere_modification(snap),
+        # must-revalidate : une fois périmée, la réponse est revalidée (304 si inchangée)
+        "Cache-Control": f"public, max-age={max_age_s}, must-revalidate",
+        "Vary": vary,
+    }
+
+
+def _etag_correspond(if_none_match: str, etag_courant: str) -> bool:
+    """Comparaison faible (RFC 9110) : W/"x" et "x" désignent la même réponse"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidat.strip().removeprefix("W/") == etag_courant
+        for candidat in if_none_match.split(",")
+    )
+
+
+def non_modifiee(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    snap: Snapshot,
+    entetes: Dict[str, str]
+) -> bool:
+    """
+    True si le client possède déjà cette réponse (répondre 304)
+
+    If-None-Match est prioritaire ; If-Modified-Since n'est consulté qu'en son absence.
+    """
+    if if_none_match:
+        return _etag_correspond(if_none_match, entetes["ETag"])
+    if if_modified_since:
+        try:
+            date_client = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if date_client.tzinfo is None:
+            return False
+        # Last-Modified est à la seconde près
+        publication = snap.cree_le.astimezone(timezone.utc).replace(microsecond=0)
+        return publication <= date_client
+    return False
@@ -0,0 +1,144 @@
+"""
+Cache des réponses calculées
+💾 Réponses sérialisées gardées en mémoire par clé de calcul (fonction, version
+   des données, paramètres normalisés, format) : un KPI déjà calculé est
+   renvoyé sans recalcul ni resérialisation
+🗜️ Les variantes compressées (gzip, br, zstd) sont rangées avec la réponse :
+   une réponse chaude n'est compressée qu'une fois par encodage
+"""
+
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Optional, Dict, Hashable, List, Any
+import threading
+
+# Variante non compressée d'une réponse
+IDENTITE = "identity"
+
+
+def decrire_cle(cle: Hashable) -> str:
+    """
+    Forme lisible d'une clé de calcul (voir kpi.cle_calcul), sans l'empreinte
+    des données : "fonction?parametre=valeur&..." (affichage et invalidation par motif)
+    """
+    fonction, _, parametres = cle
+    texte = "&".join(
+        f"{nom}={','.join(map(str, valeur)) if isinstance(valeur, tuple) else valeur}"
+        for nom, valeur in parametres
+    )
+    return f"{fonction}?{texte}" if texte else str(fonction)
+
+
+def taux_succes(nb_succes: int, nb_echecs: int) -> Optional[float]:
+    """Part des lectures servies par le cache (None avant la première lecture)"""
+    total = nb_succes + nb_echecs
+    return round(nb_succes / total, 4) if total else None
+
+
+class CacheResultats:
+    """
+    Cache LRU des réponses, borné par un budget mémoire (en octets)
+
+    Chaque entrée regroupe les variantes d'une même réponse ({encodage: octets}) ;
+    elles sont évincées ensemble. La clé contient la version des données :
+    les entrées d'une version remplacée ne sont plus jamais lues et sortent
+    du cache au fil des évictions.
+    """
+
+    def __init__(self, budget_octets: int):
+        self.budget_octets = budget_octets
+        self.octets = 0
+        self._entrees: "OrderedDict[Hashable, Dict[str, bytes]]" = OrderedDict()
+        # Nombre de lectures réussies de chaque réponse (toutes variantes confondues)
+        self._lectures: Dict[Hashable, int] = {}
+        self._verrou = threading.Lock()
+        self.nb_succes = 0
+        self.nb_echecs = 0
+
+    def lire(self, cle: Hashable, encodage: str = IDENTITE) -> Optional[bytes]:
+        """Retourne une variante de la réponse (et la marque comme récente) ou None"""
+        with self._verrou:
+            variantes = self._entrees.get(cle)
+            contenu = variantes.get(encodage) if variantes else None
+            if contenu is None:
+                # Variante compressée absente : la réponse brute sera cherchée ensuite,
+                # seul ce second accès compte comme échec
+                if encodage == IDENTITE:
+                    self.nb_echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._lectures[cle] = self._lectures.get(cle, 0) + 1
+            self.nb_succes += 1
+            return contenu
+
+    def contient(self, cle: Hashable, encodage: str = IDENTITE) -> bool:
+        """True si la variante est en cache (sans la marquer comme récente ni compter d'accès)"""
+        with self._verrou:
+            return encodage in self._entrees.get(cle, {})
+
+    def ajouter(self, cle: Hashable, contenu: bytes, encodage: str = IDENTITE) -> None:
+        """Ajoute une variante puis évince les réponses les moins récentes si le budget est dépassé"""
+        if len(contenu) > self.budget_octets:
+            # Une réponse plus grosse que le budget n'est jamais conservée
+            return
+        with self._verrou:
+            variantes = self._entrees.setdefault(cle, {})
+            if encodage in variantes:
+                self.octets -= len(variantes[encodage])
+            variantes[encodage] = contenu
+            self.octets += len(contenu)
+            self._entrees.move_to_end(cle)
+            while self.octets > self.budget_octets:
+                evincee, evincees = self._entrees.popitem(last=False)
+                self.octets -= sum(len(v) for v in evincees.values())
+                self._lectures.pop(evincee, None)
+
+    def invalider(self, fonction: Optional[str] = None, motif: Optional[str] = None) -> int:
+        """
+        Supprime les réponses d'une fonction de calcul et/ou dont la clé
+        (voir decrire_cle) correspond au motif (*, ?, [...])
+
+        Returns:
+            int: Nombre de réponses supprimées
+        """
+        with self._verrou:
+            a_supprimer = [
+                cle for cle in self._entrees
+                if (fonction is None or cle[0] == fonction)
+                and (motif is None or fnmatchcase(decrire_cle(cle), motif))
+            ]
+            for cle in a_supprimer:
+                self.octets -= sum(len(v) for v in self._entrees.pop(cle).values())
+                self._lectures.pop(cle, None)
+        return len(a_supprimer)
+
+    def vider(self) -> None:
+        """Vide complètement le cache"""
+        with self._verrou:
+            self._entrees.clear()
+            self._lectures.clear()
+            self.octets = 0
+
+    def principales(self, nombre: int = 10) -> List[Dict[str, Any]]:
+        """Réponses les plus lues, avec leur taille et leurs variantes"""
+        with self._verrou:
+            cles = sorted(self._entrees, key=lambda cle: self._lectures.get(cle, 0), reverse=True)[:nombre]
+            return [
+                {
+                    "cle": decrire_cle(cle),
+                    "lectures": self._lectures.get(cle, 0),
+                    "octets": sum(len(v) for v in self._entrees[cle].values()),
+                    "encodages": sorted(self._entrees[cle])
+                }
+                for cle in cles
+            ]
+
+    def etat(self) -> dict:
+        return {
+            "entrees": len(self._entrees),
+            "octets": self.octets,
+            "budget_octets": self.budget_octets,
+            "succes": self.nb_succes,
+            "echecs": self.nb_echecs,
+            "taux_succes": taux_succes(self.nb_succes, self.nb_echecs)
+        }
@@ -0,0 +1,63 @@
+"""
+Compression des réponses (gzip, brotli, zstd)
+🤝 Encodage négocié avec l'en-tête Accept-Encoding du client
+📏 Les petites réponses ne sont pas compressées (gain nul, coût CPU inutile)
+🏹 Codecs fournis par pyarrow (déjà requis) : aucune dépendance supplémentaire
+"""
+
+from typing import Optional, Tuple
+import pyarrow as pa
+
+# Encodage HTTP -> (codec pyarrow, niveau pour une réponse compressée d'un bloc)
+# (les flux d'export utilisent le niveau par défaut du codec)
+ENCODAGES = {
+    "br": ("brotli", 5),
+    "zstd": ("zstd", 3),
+    "gzip": ("gzip", 6),
+}
+
+# Ordre de préférence du serveur quand le client accepte plusieurs encodages :
+# - réponses mises en cache (compressées une seule fois) : le plus compact d'abord
+# - flux d'export (compressés à chaque requête) : le plus rapide d'abord
+PREFERENCES_REPONSES = ("br", "zstd", "gzip")
+PREFERENCES_FLUX = ("zstd", "gzip", "br")
+
+
+def choisir_encodage(accept_encoding: Optional[str], preferences: Tuple[str, ...]) -> Optional[str]:
+    """
+    Encodage à utiliser d'après l'en-tête Accept-Encoding
+
+    Les poids (q=...) du client sont respectés ; à poids égal, l'ordre de
+    préférence du serveur départage.
+
+    Returns:
+        str: "br", "zstd" ou "gzip", None si aucun n'est accepté (réponse non compressée)
+    """
+    if not accept_encoding:
+        return None
+    poids = {}
+    for element in accept_encoding.split(","):
+        nom, _, parametres = element.partition(";")
+        q = 1.0
+        parametre = parametres.strip()
+        if parametre.startswith("q="):
+            try:
+                q = float(parametre[2:])
+            except ValueError:
+                q = 0.0
+        poids[nom.strip().lower()] = q
+
+    defaut = poids.get("*", 0.0)
+    meilleur, meilleur_poids = None, 0.0
+    for encodage in preferences:
+        q = poids.get(encodage, defaut)
+        if q > meilleur_poids:
+            meilleur, meilleur_poids = encodage, q
+    return meilleur
+
+
+def compresser(contenu: bytes, encodage: str) -> bytes:
+    """Compresse une réponse complète"""
+    codec, niveau = ENCODAGES[encodage]
+    return pa.Codec(codec, compression_level=niveau).compress(contenu, asbytes=True)
+
@@ -0,0 +1,100 @@
+"""
+Mesure des étapes d'un calcul
+⏱️ Arbre des étapes (filtrage, agrégation, sérialisation...) avec leur durée
+   et des informations libres (nombre de lignes...)
+🪶 Hors d'une mesure, etape() ne coûte qu'une lecture de variable de contexte
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+
+class Etape:
+    """
+    Une étape mesurée et ses sous-étapes
+
+    Attributes:
+        nom: Nom de l'étape
+        debut_s: Instant de début (time.perf_counter)
+        duree_s: Durée totale (sous-étapes comprises)
+        enfants: Sous-étapes, dans l'ordre d'exécution
+        infos: Informations notées pendant l'étape (ex. lignes parcourues)
+    """
+
+    def __init__(self, nom: str):
+        self.nom = nom
+        self.debut_s = 0.0
+        self.duree_s = 0.0
+        self.enfants: List["Etape"] = []
+        self.infos: Dict[str, Any] = {}
+
+    @property
+    def duree_propre_s(self) -> float:
+        """Durée passée dans l'étape elle-même, hors sous-étapes"""
+        return max(0.0, self.duree_s - sum(enfant.duree_s for enfant in self.enfants))
+
+    def descendants(self) -> Iterator["Etape"]:
+        """Toutes les sous-étapes (en profondeur, sans l'étape elle-même)"""
+        for enfant in self.enfants:
+            yield enfant
+            yield from enfant.descendants()
+
+    def en_dict(self) -> Dict[str, Any]:
+        """Arbre des durées (en millisecondes) et des informations"""
+        return {
+            "etape": self.nom,
+            "duree_ms": round(self.duree_s * 1000, 3),
+            "propre_ms": round(self.duree_propre_s * 1000, 3),
+            **self.infos,
+            **({"etapes": [enfant.en_dict() for enfant in self.enfants]} if self.enfants else {})
+        }
+
+
+# Étape en cours dans ce thread / cette tâche (None = aucune mesure)
+_etape_courante: ContextVar[Optional[Etape]] = ContextVar("etape_courante", default=None)
+
+
+@contextmanager
+def _mesurer(etape: Etape) -> Iterator[Etape]:
+    jeton = _etape_courante.set(etape)
+    etape.debut_s = time.perf_counter()
+    try:
+        yield etape
+    finally:
+        etape.duree_s = time.perf_counter() - etape.debut_s
+        _etape_courante.reset(jeton)
+
+
+@contextmanager
+def suivre(nom: str) -> Iterator[Etape]:
+    """Démarre une mesure : les étapes exécutées dans le bloc deviennent ses sous-étapes"""
+    with _mesurer(Etape(nom)) as racine:
+        yield racine
+
+
+@contextmanager
+def etape(nom: str) -> Iterator[Optional[Etape]]:
+    """
+    Sous-étape de la mesure en cours (sans effet s'il n'y en a pas)
+
+    Usage :
+        with etape("filtrage"):
+            df = filtrer(...)
+    """
+    parent = _etape_courante.get()
+    if parent is None:
+        yield None
+        return
+    enfant = Etape(nom)
+    parent.enfants.append(enfant)
+    with _mesurer(enfant):
+        yield enfant
+
+
+def noter(**infos: Any) -> None:
+    """Ajoute des informations à l'étape en cours (sans effet hors mesure)"""
+    courante = _etape_courante.get()
+    if courante is not None:
+        courante.infos.update(infos)
@@ -0,0 +1,138 @@
+"""
+Exécution bornée des calculs de KPI
+🧵 Un pool de threads dimensionné sur la machine, hors de la boucle asynchrone
+🚦 File d'attente limitée et délai maximal : au-delà, la requête est refusée
+   tout de suite (503) au lieu de s'empiler
+🤝 Les requêtes identiques simultanées partagent un seul calcul (single-flight)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Awaitable, Hashable, Dict, Any
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServeurSature(Exception):
+    """Le calcul n'a pas pu être lancé ou terminé à temps (file pleine ou délai dépassé)"""
+
+    def __init__(self, raison: str):
+        super().__init__(raison)
+        self.raison = raison
+
+
+class ExecuteurBorne:
+    """
+    Pool de threads avec une limite sur le nombre de calculs en cours
+
+    Pandas/NumPy relâchent le GIL sur l'essentiel des calculs vectoriels :
+    des threads suffisent et partagent l'instantané sans le copier
+    (contrairement à des processus).
+
+    Attributes:
+        nb_threads: Calculs exécutés en parallèle
+        profondeur_max: Calculs acceptés au total (en cours + en attente)
+        delai_s: Temps maximal d'attente d'un résultat
+    """
+
+    def __init__(self, nb_threads: int, profondeur_max: int, delai_s: float):
+        self.nb_threads = nb_threads
+        self.profondeur_max = profondeur_max
+        self.delai_s = delai_s
+        self._pool = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="calcul-kpi")
+        self._verrou = threading.Lock()
+        self._en_cours = 0
+        self.nb_refus = 0
+        self.nb_delais_depasses = 0
+
+    @property
+    def en_cours(self) -> int:
+        """Calculs acceptés et pas encore terminés (en cours + en attente)"""
+        return self._en_cours
+
+    def _terminer(self, _future) -> None:
+        with self._verrou:
+            self._en_cours -= 1
+
+    async def executer(self, fonction: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute fonction(*args, **kwargs) dans le pool
+
+        Raises:
+            ServeurSature: File pleine, ou résultat non obtenu dans le délai
+        """
+        with self._verrou:
+            if self._en_cours >= self.profondeur_max:
+                self.nb_refus += 1
+                raise ServeurSature("file d'attente pleine")
+            self._en_cours += 1
+
+        # Un thread ne peut pas être interrompu : la place n'est libérée
+        # qu'à la fin réelle du calcul, même si le client a abandonné
+        future = self._pool.submit(fonction, *args, **kwargs)
+        future.add_done_callback(self._terminer)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.delai_s)
+        except asyncio.TimeoutError:
+            self.nb_delais_depasses += 1
+            logger.warning(f"⏱️ Calcul {getattr(fonction, '__name__', fonction)} abandonné après {self.delai_s}s")
+            raise ServeurSature("délai de calcul dépassé")
+
+    def etat(self) -> dict:
+        return {
+            "nb_threads": self.nb_threads,
+            "profondeur_max": self.profondeur_max,
+            "delai_s": self.delai_s,
+            "en_cours": self._en_cours,
+            "refus": self.nb_refus,
+            "delais_depasses": self.nb_delais_depasses
+        }
+
+
+class VolUnique:
+    """
+    Fusion des calculs identiques simultanés (single-flight)
+
+    La première requête d'une clé lance le calcul ; celles qui arrivent
+    pendant qu'il est en cours attendent ce même calcul et reçoivent le même
+    résultat (ou la même erreur). La clé est oubliée dès la fin du calcul :
+    ce n'est pas un cache.
+
+    À utiliser depuis la boucle asynchrone uniquement (pas de verrou).
+    """
+
+    def __init__(self):
+        self._en_vol: Dict[Hashable, asyncio.Future] = {}
+        self.nb_calculs = 0
+        self.nb_fusionnees = 0
+
+    async def executer(self, cle: Hashable, lancer: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Args:
+            cle: Clé normalisée du calcul (deux requêtes équivalentes -> même clé)
+            lancer: Lance le calcul (appelée seulement si aucun calcul de même clé n'est en cours)
+        """
+        tache = self._en_vol.get(cle)
+        if tache is None:
+            self.nb_calculs += 1
+            tache = asyncio.ensure_future(lancer())
+            self._en_vol[cle] = tache
+            tache.add_done_callback(lambda t: self._oublier(cle, t))
+        else:
+            self.nb_fusionnees += 1
+        # shield : un client qui abandonne n'annule pas le calcul des autres
+        return await asyncio.shield(tache)
+
+    def _oublier(self, cle: Hashable, tache: asyncio.Future) -> None:
+        self._en_vol.pop(cle, None)
+        if not tache.cancelled():
+            tache.exception()  # erreur considérée comme lue même si tous les clients sont partis
+
+    def etat(self) -> dict:
+        return {
+            "calculs_lances": self.nb_calculs,
+            "requetes_fusionnees": self.nb_fusionnees,
+            "calculs_partages_en_cours": len(self._en_vol)
+        }
@@ -0,0 +1,152 @@
+"""
+Export en flux du dataset filtré
+🚰 NDJSON, CSV ou Parquet écrits lot par lot : la mémoire utilisée reste
+   constante, quel que soit le nombre de lignes exportées
+🗜️ Compression (gzip, brotli ou zstd) à la volée
+"""
+
+from typing import Optional, List, Dict, Iterator, Iterable
+import io
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from stockage import StockagePartitionne
+from serialisation import enregistrements, OPTIONS_JSON
+from compression import ENCODAGES
+
+# Format -> (type MIME, extension du fichier)
+FORMATS_EXPORT = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def lots_filtres(
+    stockage: StockagePartitionne,
+    date_debut: Optional[str] = None,
+    date_fin: Optional[str] = None,
+    egalites: Optional[Dict[str, str]] = None,
+    colonnes: Optional[List[str]] = None,
+    taille_lot: int = 50000
+) -> Iterator[pd.DataFrame]:
+    """
+    Lots de lignes satisfaisant les filtres, réduits aux colonnes demandées
+
+    Les colonnes servant aux filtres sont lues même si elles ne sont pas
+    exportées, puis retirées après filtrage.
+    """
+    egalites = egalites or {}
+    a_lire = None
+    if colonnes:
+        utiles = (['Order Date'] if date_debut or date_fin else []) + list(egalites)
+        a_lire = colonnes + [c for c in utiles if c not in colonnes]
+
+    for lot in stockage.parcourir(date_debut, date_fin, egalites, a_lire, taille_lot):
+        masque = pd.Series(True, index=lot.index)
+        if date_debut:
+            masque &= lot['Order Date'] >= date_debut
+        if date_fin:
+            masque &= lot['Order Date'] <= date_fin
+        for colonne, valeur in egalites.items():
+            masque &= lot[colonne] == valeur
+        if not masque.all():
+            lot = lot[masque]
+        if colonnes:
+            lot = lot[colonnes]
+        if len(lot):
+            yield lot
+
+
+def exporter_ndjson(lots: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """Un objet JSON par ligne"""
+    for lot in lots:
+        yield b"".join(orjson.dumps(ligne, option=OPTIONS_JSON | orjson.OPT_APPEND_NEWLINE)
+                       for ligne in enregistrements(lot))
+
+
+def exporter_csv(lots: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """CSV avec en-tête (dates au format YYYY-MM-DD), écrit par l'encodeur CSV d'Arrow"""
+    premier = True
+    for lot in lots:
+        table = pa.Table.from_pandas(lot, preserve_index=False)
+        # Dates sans heure : timestamp -> date32
+        for i, champ in enumerate(table.schema):
+            if pa.types.is_timestamp(champ.type):
+                table = table.set_column(i, champ.name, table.column(i).cast(pa.date32()))
+        sortie = pa.BufferOutputStream()
+        pa_csv.write_csv(table, sortie, pa_csv.WriteOptions(include_header=premier))
+        yield sortie.getvalue().to_pybytes()
+        premier = False
+
+
+class _FluxSortie(io.RawIOBase):
+    """
+    Fichier en écriture seule dont le contenu est récupéré au fur et à mesure
+    (la position continue d'avancer : le pied de page Parquet reste valide)
+    """
+
+    def __init__(self):
+        self._morceaux: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, donnees) -> int:
+        self._morceaux.append(bytes(donnees))
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self) -> int:
+        return self._position
+
+    def vider(self) -> bytes:
+        contenu = b"".join(self._morceaux)
+        self._morceaux = []
+        return contenu
+
+
+def exporter_parquet(lots: Iterable[pd.DataFrame], vide: pd.DataFrame) -> Iterator[bytes]:
+    """
+    Fichier Parquet : un row group par lot
+
+    Args:
+        vide: DataFrame sans ligne donnant le schéma si aucun lot n'est exporté
+    """
+    flux = _FluxSortie()
+    ecrivain = None
+    for lot in lots:
+        table = pa.Table.from_pandas(lot, preserve_index=False)
+        if ecrivain is None:
+            ecrivain = pq.ParquetWriter(flux, table.schema)
+        elif not table.schema.equals(ecrivain.schema):
+            table = table.cast(ecrivain.schema)
+        ecrivain.write_table(table)
+        yield flux.vider()
+    if ecrivain is None:
+        ecrivain = pq.ParquetWriter(flux, pa.Table.from_pandas(vide, preserve_index=False).schema)
+    ecrivain.close()
+    yield flux.vider()
+
+
+def compresser_flux(morceaux: Iterable[bytes], encodage: str) -> Iterator[bytes]:
+    """
+    Compresse un flux d'octets morceau par morceau
+
+    Args:
+        encodage: Encodage HTTP ("gzip", "br" ou "zstd", voir compression.ENCODAGES)
+    """
+    flux = _FluxSortie()
+    compresseur = pa.CompressedOutputStream(pa.PythonFile(flux, mode="w"), ENCODAGES[encodage][0])
+    for morceau in morceaux:
+        compresseur.write(morceau)
+        compresseur.flush()  # le morceau compressé part tout de suite vers le client
+        compresse = flux.vider()
+        if compresse:
+            yield compresse
+    compresseur.close()
+    yield flux.vider()
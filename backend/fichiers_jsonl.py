@@ -0,0 +1,132 @@
+"""
+Fichiers JSON lines écrits en arrière-plan (journaux de l'API)
+🧵 Les lignes passent par une file bornée (logging.QueueHandler) : la requête
+   ne touche jamais le disque, un thread (logging.QueueListener) écrit à sa place
+🔄 Rotation à taille maximale : fichier.1 garde les lignes précédentes
+🪣 File pleine (disque trop lent) : la ligne est perdue et comptée, la requête n'attend pas
+📖 Relecture de la fin du fichier seulement (nombre d'octets borné)
+🍴 Thread démarré à la première ligne, dans chaque processus : un worker forké
+   après l'import (serveur.py) a le sien
+"""
+
+from typing import Any, Dict, Iterator
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+import orjson
+
+# Lignes en attente d'écriture au maximum
+NB_MAX_EN_ATTENTE = 10000
+
+
+class _FileBornee(logging.handlers.QueueHandler):
+    """QueueHandler qui perd (et compte) les lignes quand la file est pleine, sans bloquer"""
+
+    def __init__(self, file: queue.Queue):
+        super().__init__(file)
+        self.nb_perdues = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.nb_perdues += 1
+
+
+class _Ecouteur(logging.handlers.QueueListener):
+    """QueueListener dont l'arrêt attend une place dans la file (pleine à l'arrêt du processus)"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class FichierJsonl:
+    """
+    Fichier JSON lines alimenté par un thread d'écriture
+
+    Attributes:
+        fichier: Chemin du fichier
+        taille_max_octets: Taille déclenchant la rotation (0 = jamais)
+    """
+
+    def __init__(self, fichier: str, taille_max_octets: int = 0, nb_max_en_attente: int = NB_MAX_EN_ATTENTE):
+        self.fichier = fichier
+        self.taille_max_octets = taille_max_octets
+        self.nb_max_en_attente = nb_max_en_attente
+        os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+        self._verrou = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._ecouteur = None
+        self._actif = True
+        # Écrit les lignes encore en attente à l'arrêt du processus
+        atexit.register(self.fermer)
+
+    def _file_du_processus(self) -> _FileBornee:
+        """
+        File et thread d'écriture propres au processus, démarrés à la première ligne :
+        après un fork, le thread du parent n'existe pas dans l'enfant (comme la
+        connexion de CacheDisque, tout est recréé quand le pid change)
+        """
+        if self._pid != os.getpid():
+            with self._verrou:
+                if self._pid != os.getpid():
+                    ecriture = logging.handlers.RotatingFileHandler(
+                        self.fichier, maxBytes=self.taille_max_octets, backupCount=1, encoding="utf-8", delay=True
+                    )
+                    ecriture.setFormatter(logging.Formatter("%(message)s"))
+                    self._file = _FileBornee(queue.Queue(self.nb_max_en_attente))
+                    self._ecouteur = _Ecouteur(self._file.queue, ecriture)
+                    self._ecouteur.start()
+                    self._pid = os.getpid()
+        return self._file
+
+    def ajouter(self, entree: Dict[str, Any]) -> None:
+        """Ajoute une ligne (sans attendre l'écriture)"""
+        # Enregistrement remis directement à la file : indépendant de la configuration des journaux
+        self._file_du_processus().handle(
+            logging.makeLogRecord({"msg": orjson.dumps(entree).decode(), "levelno": logging.INFO})
+        )
+
+    def lire_fin(self, max_octets: int) -> Iterator[Dict[str, Any]]:
+        """
+        Dernières lignes du fichier, dans l'ordre d'écriture : au plus max_octets
+        sont lus, quelle que soit la taille du fichier (lignes illisibles ignorées)
+        """
+        try:
+            with open(self.fichier, "rb") as f:
+                taille = f.seek(0, os.SEEK_END)
+                f.seek(max(0, taille - max_octets))
+                lignes = f.read(max_octets).split(b"\n")
+        except FileNotFoundError:
+            return
+        if taille > max_octets:
+            # Première ligne coupée par la limite
+            lignes = lignes[1:]
+        for ligne in lignes:
+            try:
+                yield orjson.loads(ligne)
+            except orjson.JSONDecodeError:
+                continue
+
+    def fermer(self) -> None:
+        """Attend l'écriture des lignes en attente et arrête le thread (du processus courant)"""
+        if self._actif and self._pid == os.getpid():
+            self._actif = False
+            self._ecouteur.stop()
+
+    @property
+    def nb_perdues(self) -> int:
+        return self._file.nb_perdues if self._file is not None else 0
+
+    def etat(self) -> Dict[str, Any]:
+        return {
+            "fichier": self.fichier,
+            "taille_max_octets": self.taille_max_octets,
+            "en_attente": self._file.queue.qsize() if self._file is not None else 0,
+            "perdues": self.nb_perdues
+        }
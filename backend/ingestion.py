@@ -0,0 +1,204 @@
+"""
+Ingestion incrémentale de nouvelles commandes
+✅ Validation vectorielle d'un lot de lignes (aucune boucle ligne à ligne),
+   chaque colonne convertie dans le type des partitions existantes
+💾 Lots acceptés conservés sur disque, rejoués à chaque rechargement complet
+📂 Surveillance d'un dossier de dépôt pour les fichiers CSV
+"""
+
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
+import os
+import shutil
+import threading
+import pandas as pd
+import pyarrow as pa
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colonnes indispensables au calcul des KPI
+COLONNES_OBLIGATOIRES = [
+    'Order ID', 'Order Date', 'Ship Date', 'Customer ID', 'Customer Name',
+    'Segment', 'State', 'Region', 'Product Name', 'Category',
+    'Sales', 'Quantity', 'Profit'
+]
+
+COLONNES_DATES = ['Order Date', 'Ship Date']
+
+# Types attendus quand aucun schéma n'est encore stocké (dataset vide)
+SCHEMA_MINIMAL = pa.schema(
+    [(c, pa.timestamp('ns')) for c in COLONNES_DATES]
+    + [('Sales', pa.float64()), ('Quantity', pa.int64()), ('Profit', pa.float64())]
+)
+
+# Nombre maximal d'erreurs détaillées renvoyées à l'appelant
+MAX_ERREURS = 20
+
+
+def convertir_colonne(serie: pd.Series, type_arrow: pa.DataType) -> Tuple[pd.Series, str]:
+    """
+    Convertit une colonne dans le type stocké (vectoriel) : les valeurs non
+    convertibles deviennent manquantes
+
+    Returns:
+        tuple: (colonne convertie, type attendu pour les messages d'erreur)
+    """
+    if pa.types.is_timestamp(type_arrow) or pa.types.is_date(type_arrow):
+        return pd.to_datetime(serie, errors='coerce'), "date"
+    if pa.types.is_integer(type_arrow):
+        nombres = pd.to_numeric(serie, errors='coerce')
+        # 2.5 n'est pas un entier : refusé plutôt qu'arrondi
+        nombres = nombres.where(nombres % 1 == 0)
+        # Entiers "nullables" s'il manque des valeurs (sinon int64 comme les partitions)
+        return nombres.astype('Int64' if nombres.isna().any() else 'int64'), "entier"
+    if pa.types.is_floating(type_arrow):
+        return pd.to_numeric(serie, errors='coerce').astype('float64'), "nombre"
+    # Texte : un fichier CSV déposé peut avoir lu "10024" comme un nombre
+    return serie.astype(str).where(serie.notna(), None), "texte"
+
+
+def colonne_vide(nb_lignes: int, type_arrow: pa.DataType) -> pd.Series:
+    """Colonne optionnelle absente du lot : valeurs manquantes, dans le type stocké"""
+    return convertir_colonne(pd.Series([None] * nb_lignes, dtype=object), type_arrow)[0]
+
+
+def valider_lot(lot: pd.DataFrame, schema: Optional[pa.Schema] = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Valide et convertit un lot de nouvelles lignes
+
+    Chaque colonne est convertie dans le type des partitions existantes : un
+    lot accepté s'écrit donc (et se relit, s'exporte) comme les données d'origine.
+
+    Args:
+        lot: Lignes brutes (colonnes du CSV Superstore)
+        schema: Schéma des partitions existantes (voir StockagePartitionne.schema) ;
+            None = seules les colonnes obligatoires sont vérifiées
+
+    Returns:
+        tuple: (lot converti, dans l'ordre des colonnes du schéma ; liste d'erreurs) -
+            le lot n'est utilisable que si la liste d'erreurs est vide
+    """
+    lot = lot.copy()
+    lot.columns = lot.columns.str.strip()
+
+    erreurs = [
+        {"ligne": None, "colonne": c, "erreur": "colonne manquante"}
+        for c in COLONNES_OBLIGATOIRES if c not in lot.columns
+    ]
+    if schema is not None:
+        erreurs += [
+            {"ligne": None, "colonne": c, "erreur": "colonne inconnue"}
+            for c in lot.columns if c not in schema.names
+        ]
+    if erreurs:
+        return lot, erreurs[:MAX_ERREURS]
+
+    # Conversions vectorielles : les valeurs invalides deviennent NaT/NaN/None
+    manquantes = lot[COLONNES_OBLIGATOIRES].isna()
+    for champ in schema or SCHEMA_MINIMAL:
+        if champ.name not in lot.columns:
+            # Colonne optionnelle absente (les obligatoires ont été vérifiées)
+            lot[champ.name] = colonne_vide(len(lot), champ.type)
+            continue
+        brute = lot[champ.name]
+        lot[champ.name], attendu = convertir_colonne(brute, champ.type)
+        invalides = brute.notna() & lot[champ.name].isna()
+        for ligne in invalides.index[invalides][:MAX_ERREURS]:
+            erreurs.append({
+                "ligne": int(ligne), "colonne": champ.name,
+                "erreur": f"type invalide ({attendu} attendu) : {brute[ligne]!r}"
+            })
+
+    for colonne in COLONNES_OBLIGATOIRES:
+        for ligne in manquantes.index[manquantes[colonne]][:MAX_ERREURS]:
+            erreurs.append({"ligne": int(ligne), "colonne": colonne, "erreur": "valeur manquante"})
+
+    if schema is not None:
+        lot = lot[schema.names]
+    return lot, erreurs[:MAX_ERREURS]
+
+
+class LotsIngeres:
+    """
+    Lots acceptés par l'ingestion, conservés dans un dossier en ajout seul
+    (un fichier Parquet par lot, numérotés dans l'ordre d'arrivée)
+
+    Un rechargement complet ne relit que le CSV source : les lots sont rejoués
+    ensuite (voir load_data dans main.py), sans quoi ils disparaîtraient avec
+    les répertoires des anciennes versions.
+    """
+
+    def __init__(self, dossier: str):
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+
+    def _fichiers(self) -> List[str]:
+        return sorted(nom for nom in os.listdir(self.dossier) if nom.startswith("lot-") and nom.endswith(".parquet"))
+
+    @property
+    def nb_lots(self) -> int:
+        return len(self._fichiers())
+
+    def ajouter(self, lot: pd.DataFrame) -> str:
+        """
+        Enregistre un lot validé (écriture dans un fichier temporaire puis
+        renommage : un lot à moitié écrit n'est jamais rejoué)
+
+        Returns:
+            str: Chemin du fichier du lot
+        """
+        numeros = [int(nom[4:-8]) for nom in self._fichiers() if nom[4:-8].isdigit()]
+        chemin = os.path.join(self.dossier, f"lot-{max(numeros, default=0) + 1:06d}.parquet")
+        lot.to_parquet(chemin + ".tmp", index=False)
+        os.replace(chemin + ".tmp", chemin)
+        return chemin
+
+    def parcourir(self) -> Iterator[pd.DataFrame]:
+        """Lots enregistrés, dans l'ordre d'arrivée"""
+        for nom in self._fichiers():
+            yield pd.read_parquet(os.path.join(self.dossier, nom))
+
+
+class SurveillantDepot:
+    """
+    Surveille un dossier de dépôt : chaque fichier CSV déposé est ingéré
+    puis déplacé dans traites/ (ou rejetes/ en cas d'erreur)
+    """
+
+    def __init__(self, dossier: str, ingerer: Callable[[pd.DataFrame], Any], intervalle: float = 5.0):
+        self.dossier = dossier
+        self.ingerer = ingerer
+        self.intervalle = intervalle
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self) -> None:
+        """Lance la surveillance dans un thread d'arrière-plan (une seule fois)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        for sous_dossier in ("traites", "rejetes"):
+            os.makedirs(os.path.join(self.dossier, sous_dossier), exist_ok=True)
+        self._thread = threading.Thread(target=self._boucle, name="surveillant-depot", daemon=True)
+        self._thread.start()
+        logger.info(f"📂 Surveillance du dossier de dépôt {self.dossier}")
+
+    def arreter(self) -> None:
+        self._arret.set()
+
+    def _boucle(self) -> None:
+        while not self._arret.wait(self.intervalle):
+            for nom in sorted(os.listdir(self.dossier)):
+                chemin = os.path.join(self.dossier, nom)
+                if os.path.isfile(chemin) and nom.endswith(".csv"):
+                    self._traiter(chemin)
+
+    def _traiter(self, chemin: str) -> None:
+        nom = os.path.basename(chemin)
+        try:
+            self.ingerer(pd.read_csv(chemin, encoding='latin-1'))
+            destination = "traites"
+            logger.info(f"📥 Fichier ingéré : {nom}")
+        except Exception as e:
+            destination = "rejetes"
+            logger.error(f"❌ Fichier rejeté {nom} : {e}")
+        shutil.move(chemin, os.path.join(self.dossier, destination, nom))
@@ -0,0 +1,117 @@
+"""
+Journal des requêtes lentes
+🐢 Chaque requête au-delà d'un seuil de durée est gardée dans un tampon
+   circulaire (les plus récentes) et ajoutée à un fichier JSON lines, écrit
+   par un thread d'arrière-plan (voir fichiers_jsonl.py)
+🔎 Paramètres normalisés, chemin suivi (cache, table matérialisée, cube,
+   index), lignes parcourues / retenues et durée de chaque étape : de quoi
+   repérer les combinaisons de filtres qui méritent d'être précalculées
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Optional
+import threading
+
+from etapes import Etape
+from fichiers_jsonl import FichierJsonl
+
+
+def resumer_mesures(calcul: Optional[Etape], compression: Optional[Etape]) -> Dict[str, Any]:
+    """
+    Chemin suivi et lignes traitées d'après les étapes mesurées (voir etapes.py)
+
+    Args:
+        calcul: Mesure du calcul (None si la réponse était dans le cache en mémoire)
+        compression: Mesure de la compression (None si aucune)
+
+    Returns:
+        dict: chemin ("cache_memoire", "cache_disque", ou sources des données :
+              "materialisee", "cube", "index"), lignes parcourues / retenues
+              et arbres des étapes ({"calcul": ..., "compression": ...})
+    """
+    racines = {nom: racine for nom, racine in (("calcul", calcul), ("compression", compression)) if racine is not None}
+    if calcul is None:
+        chemin = "cache_memoire"
+    elif not any(enfant.nom == "agregation" for enfant in calcul.enfants):
+        chemin = "cache_disque"
+    else:
+        sources = [e.infos["source"] for e in calcul.descendants() if "source" in e.infos]
+        chemin = "+".join(dict.fromkeys(sources)) or "calcul"
+    etapes = [e for racine in racines.values() for e in racine.descendants()]
+    return {
+        "chemin": chemin,
+        "lignes_parcourues": sum(e.infos.get("lignes_parcourues", 0) for e in etapes),
+        "lignes_retenues": sum(e.infos.get("lignes_retenues", 0) for e in etapes),
+        "etapes": {nom: racine.en_dict() for nom, racine in racines.items()}
+    }
+
+
+class JournalLent:
+    """
+    Requêtes plus lentes que seuil_s : les `capacite` plus récentes en mémoire,
+    toutes dans le fichier (une ligne JSON par requête)
+
+    Attributes:
+        seuil_s: Durée à partir de laquelle une requête est journalisée
+        fichier: Fichier JSON lines (None = mémoire seulement)
+    """
+
+    def __init__(self, seuil_s: float, capacite: int, fichier: Optional[str] = None, taille_max_octets: int = 0):
+        self.seuil_s = seuil_s
+        self.fichier = FichierJsonl(fichier, taille_max_octets) if fichier and seuil_s > 0 else None
+        self._entrees: deque = deque(maxlen=capacite)
+        self._verrou = threading.Lock()
+        self.nb_enregistrees = 0
+
+    def est_lente(self, duree_s: float) -> bool:
+        return self.seuil_s > 0 and duree_s >= self.seuil_s
+
+    def enregistrer(self, entree: Dict[str, Any]) -> None:
+        """Ajoute une requête lente au tampon et au fichier (sans attendre l'écriture sur disque)"""
+        with self._verrou:
+            self._entrees.append(entree)
+            self.nb_enregistrees += 1
+        if self.fichier:
+            self.fichier.ajouter(entree)
+
+    def pires(self, nombre: int, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Requêtes les plus lentes du tampon (éventuellement d'un seul endpoint)"""
+        with self._verrou:
+            entrees = [e for e in self._entrees if endpoint is None or e["endpoint"] == endpoint]
+        return sorted(entrees, key=lambda e: e["duree_ms"], reverse=True)[:nombre]
+
+    def par_requete(self, nombre: int, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Requêtes lentes regroupées par endpoint et paramètres normalisés,
+        les plus coûteuses au total d'abord (candidates au précalcul)
+        """
+        groupes: Dict[tuple, Dict[str, Any]] = {}
+        with self._verrou:
+            entrees = [e for e in self._entrees if endpoint is None or e["endpoint"] == endpoint]
+        for entree in entrees:
+            groupe = groupes.setdefault((entree["endpoint"], entree["requete"]), {
+                "endpoint": entree["endpoint"],
+                "requete": entree["requete"],
+                "filtres": entree["filtres"],
+                "nombre": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "chemins": []
+            })
+            groupe["nombre"] += 1
+            groupe["total_ms"] = round(groupe["total_ms"] + entree["duree_ms"], 3)
+            groupe["max_ms"] = max(groupe["max_ms"], entree["duree_ms"])
+            if entree["chemin"] not in groupe["chemins"]:
+                groupe["chemins"].append(entree["chemin"])
+        return sorted(groupes.values(), key=lambda g: g["total_ms"], reverse=True)[:nombre]
+
+    def etat(self) -> Dict[str, Any]:
+        with self._verrou:
+            en_memoire = len(self._entrees)
+        return {
+            "seuil_ms": round(self.seuil_s * 1000, 3),
+            "capacite": self._entrees.maxlen,
+            "en_memoire": en_memoire,
+            "nb_enregistrees": self.nb_enregistrees,
+            "fichier": self.fichier.etat() if self.fichier else None
+        }
@@ -0,0 +1,412 @@
+"""
+Calcul des KPI à partir d'un instantané du dataset
+🧮 Fonctions pures : mêmes paramètres + même version des données = même résultat
+⚙️ Exécutées hors de la boucle asynchrone (voir executeur.py)
+📋 Les tables sont renvoyées en DataFrame : leur mise en forme (lignes,
+   colonnes ou Arrow) est faite par serialisation.py
+"""
+
+from typing import Optional, List, Dict, Any, Callable, Tuple
+import pandas as pd
+
+from agregats import Agregats
+from versions import Snapshot
+from pagination import index_pour, encoder_curseur
+from etapes import etape, noter
+
+
+# === FILTRES ===
+
+def filtres_egalite(
+    categorie: Optional[str] = None,
+    region: Optional[str] = None,
+    segment: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Traduit les filtres catégorie/région/segment en filtres d'égalité par colonne
+    ("Toutes"/"Tous" = pas de filtre)
+    """
+    egalites = {}
+    if categorie and categorie != "Toutes":
+        egalites['Category'] = categorie
+    if region and region != "Toutes":
+        egalites['Region'] = region
+    if segment and segment != "Tous":
+        egalites['Segment'] = segment
+    return egalites
+
+def filtrer_agregats(
+    agregats: Agregats,
+    date_debut: Optional[str] = None,
+    date_fin: Optional[str] = None,
+    categorie: Optional[str] = None,
+    region: Optional[str] = None,
+    segment: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Applique les filtres sur le cube des commandes (pas de lecture des lignes brutes)
+
+    Returns:
+        pd.DataFrame: Cube filtré (à ne pas modifier)
+    """
+    cube = agregats.commandes
+    masque = pd.Series(True, index=cube.index)
+    if date_debut:
+        masque &= cube['Order Date'] >= date_debut
+    if date_fin:
+        masque &= cube['Order Date'] <= date_fin
+    for colonne, valeur in filtres_egalite(categorie, region, segment).items():
+        masque &= cube[colonne] == valeur
+    return cube if masque.all() else cube[masque]
+
+def normaliser_parametres(parametres: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Forme canonique des paramètres d'un calcul : deux requêtes équivalentes
+    ("Toutes" ou filtre absent, ordre des paramètres...) donnent le même résultat
+    """
+    normalises = {}
+    for nom, valeur in parametres.items():
+        if nom in ('categorie', 'region') and valeur == "Toutes":
+            valeur = None
+        elif nom == 'segment' and valeur == "Tous":
+            valeur = None
+        if valeur is None or valeur == "":
+            continue
+        normalises[nom] = valeur
+    return dict(sorted(normalises.items()))
+
+def cle_calcul(fonction: Callable, snap: Snapshot, parametres: Dict[str, Any]) -> Tuple:
+    """
+    Clé identifiant un calcul : fonction + empreinte des données + paramètres normalisés
+
+    L'empreinte (et non le numéro de version) rend la clé stable d'un
+    démarrage à l'autre : un résultat reste valable tant que les données
+    sont les mêmes.
+    """
+    return (fonction.__name__, snap.empreinte, tuple(normaliser_parametres(parametres).items()))
+
+# === CHAMPS DES RÉPONSES (paramètre fields=) ===
+
+# Champs disponibles par calcul ; pour une table, la première colonne identifie
+# la ligne et est toujours renvoyée
+CHAMPS_KPI_GLOBAUX = ['ca_total', 'nb_commandes', 'nb_clients', 'panier_moyen',
+                      'quantite_vendue', 'profit_total', 'marge_moyenne']
+CHAMPS_TOP_PRODUITS = ['produit', 'categorie', 'ca', 'quantite', 'profit']
+CHAMPS_CATEGORIES = ['categorie', 'ca', 'profit', 'nb_commandes', 'marge_pct']
+CHAMPS_TEMPOREL = ['periode', 'ca', 'profit', 'nb_commandes', 'quantite']
+CHAMPS_GEOGRAPHIQUE = ['region', 'ca', 'profit', 'nb_clients', 'nb_commandes']
+CHAMPS_CLIENTS = ['top_clients', 'recurrence', 'segments']
+CHAMPS_VALEURS_FILTRES = ['categories', 'regions', 'segments', 'etats', 'plage_dates']
+
+def champs_voulus(champs: Optional[Tuple[str, ...]], disponibles: List[str], table: bool = False) -> List[str]:
+    """
+    Champs à calculer, dans l'ordre de la réponse complète
+
+    Args:
+        champs: Champs demandés (None = tous)
+        disponibles: Champs de la réponse complète
+        table: True pour une table (sa colonne d'identification est toujours gardée)
+    """
+    if champs is None:
+        return list(disponibles)
+    return [c for c in disponibles if c in champs or (table and c == disponibles[0])]
+
+# === TABLES MATÉRIALISABLES ===
+# Tables complètes dont les calculs ne sélectionnent que quelques lignes ou
+# colonnes : le planificateur (planificateur.py) les construit en arrière-plan
+# pour chaque version et les range dans snap.materialises ; sans elles, les
+# calculs les reconstruisent sur place (en se limitant aux champs demandés).
+
+# Granularité temporelle -> (unité de troncature NumPy, format de la période)
+FORMATS_PERIODE = {
+    'jour': ('D', '%Y-%m-%d'),
+    'mois': ('M', '%Y-%m'),
+    'annee': ('Y', '%Y'),
+}
+
+def classement_produits(snap: Snapshot, tri_par: str) -> pd.DataFrame:
+    """Ventes par produit triées par CA, profit ou quantité (décroissant)"""
+    colonne = {"ca": 'Sales', "profit": 'Profit', "quantite": 'Quantity'}[tri_par]
+    return snap.agregats.produits.sort_values(colonne, ascending=False)
+
+def table_categories(snap: Snapshot, nb_commandes: bool = True) -> pd.DataFrame:
+    """CA, profit, commandes et marge par catégorie, triés par CA décroissant"""
+    mesures = {'ca': ('Sales', 'sum'), 'profit': ('Profit', 'sum')}
+    if nb_commandes:
+        mesures['nb_commandes'] = ('Order ID', 'nunique')
+    categories = snap.agregats.commandes.groupby('Category', observed=True).agg(**mesures).reset_index()
+    categories = categories.rename(columns={'Category': 'categorie'})
+
+    # Calcul de la marge
+    categories['marge_pct'] = (categories['profit'] / categories['ca'] * 100).round(2)
+
+    # Tri par CA décroissant
+    return categories.sort_values('ca', ascending=False)
+
+def table_temporelle(snap: Snapshot, periode: str, nb_commandes: bool = True) -> pd.DataFrame:
+    """CA, profit, quantité et commandes par période, dans l'ordre chronologique"""
+    df_temp = snap.agregats.commandes
+
+    # Clé de période : dates tronquées par NumPy (jour, mois ou année) ; seules
+    # les périodes distinctes sont ensuite mises en texte, pas chaque ligne du cube
+    unite, format_periode = FORMATS_PERIODE[periode]
+    cle_periode = pd.Series(
+        df_temp['Order Date'].to_numpy().astype(f'datetime64[{unite}]').astype('datetime64[ns]'),
+        index=df_temp.index, name='periode'
+    )
+
+    mesures = {'ca': ('Sales', 'sum'), 'profit': ('Profit', 'sum'), 'quantite': ('Quantity', 'sum')}
+    if nb_commandes:
+        mesures['nb_commandes'] = ('Order ID', 'nunique')
+    temporal = df_temp.groupby(cle_periode).agg(**mesures).reset_index()
+    temporal['periode'] = temporal['periode'].dt.strftime(format_periode)
+
+    # Tri chronologique
+    return temporal.sort_values('periode')
+
+def table_geographique(snap: Snapshot, nb_clients: bool = True, nb_commandes: bool = True) -> pd.DataFrame:
+    """CA, profit, clients et commandes par région, triés par CA décroissant"""
+    mesures = {'ca': ('Sales', 'sum'), 'profit': ('Profit', 'sum')}
+    if nb_clients:
+        mesures['nb_clients'] = ('Customer ID', 'nunique')
+    if nb_commandes:
+        mesures['nb_commandes'] = ('Order ID', 'nunique')
+    geo = snap.agregats.commandes.groupby('Region', observed=True).agg(**mesures).reset_index()
+    geo = geo.rename(columns={'Region': 'region'})
+    return geo.sort_values('ca', ascending=False)
+
+def table_clients(snap: Snapshot) -> pd.DataFrame:
+    """CA, profit et nombre de commandes de chaque client"""
+    clients = snap.agregats.commandes.groupby('Customer ID', observed=True).agg({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Order ID': 'nunique'
+    }).reset_index()
+    clients.columns = ['customer_id', 'ca_total', 'profit_total', 'nb_commandes']
+    return clients
+
+def table_segments(snap: Snapshot) -> pd.DataFrame:
+    """CA, profit et nombre de clients par segment"""
+    segments = snap.agregats.commandes.groupby('Segment', observed=True).agg({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Customer ID': 'nunique'
+    }).reset_index()
+    segments.columns = ['segment', 'ca', 'profit', 'nb_clients']
+    return segments
+
+def table_derivee(
+    snap: Snapshot,
+    nom: str,
+    construire: Callable[[], pd.DataFrame],
+    base: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Table déjà construite par le planificateur (snap.materialises), sinon
+    construite sur place à partir du cube (base : cube des commandes par défaut)
+
+    Mesurée comme une étape du nom de la table, avec sa source et les
+    lignes parcourues / retenues (voir etapes.py).
+    """
+    with etape(nom):
+        table = snap.materialises.get(nom)
+        if table is not None:
+            noter(source="materialisee", lignes_parcourues=len(table), lignes_retenues=len(table))
+            return table
+        table = construire()
+        base = snap.agregats.commandes if base is None else base
+        noter(source="cube", lignes_parcourues=len(base), lignes_retenues=len(table))
+        return table
+
+# Tables construites par le planificateur : nom dans snap.materialises -> construction
+TABLES_MATERIALISEES: Dict[str, Callable[[Snapshot], pd.DataFrame]] = {
+    **{f"produits_{tri}": (lambda snap, tri=tri: classement_produits(snap, tri)) for tri in ("ca", "profit", "quantite")},
+    "categories": table_categories,
+    **{f"temporel_{periode}": (lambda snap, periode=periode: table_temporelle(snap, periode)) for periode in FORMATS_PERIODE},
+    "geographique": table_geographique,
+    "clients": table_clients,
+    "segments": table_segments,
+}
+
+# === CALCULS DES KPI ===
+
+def calcul_kpi_globaux(
+    snap: Snapshot,
+    date_debut: Optional[str] = None,
+    date_fin: Optional[str] = None,
+    categorie: Optional[str] = None,
+    region: Optional[str] = None,
+    segment: Optional[str] = None,
+    champs: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """KPI globaux (CA, commandes, clients, panier moyen, quantité, profit, marge)"""
+    voulus = champs_voulus(champs, CHAMPS_KPI_GLOBAUX)
+
+    # Application des filtres sur le cube des commandes
+    with etape("filtrage"):
+        df_filtered = filtrer_agregats(snap.agregats, date_debut, date_fin, categorie, region, segment)
+        noter(source="cube", lignes_parcourues=len(snap.agregats.commandes), lignes_retenues=len(df_filtered))
+
+    # Calcul des seuls KPI demandés (et de ceux dont ils dépendent) ;
+    # les comptages distincts (nunique) sont les plus coûteux
+    kpi = {}
+    ca_total = df_filtered['Sales'].sum()
+    profit_total = df_filtered['Profit'].sum()
+    if 'nb_commandes' in voulus or 'panier_moyen' in voulus:
+        nb_commandes = df_filtered['Order ID'].nunique()
+        kpi['nb_commandes'] = nb_commandes
+        kpi['panier_moyen'] = round(ca_total / nb_commandes if nb_commandes > 0 else 0, 2)
+    if 'nb_clients' in voulus:
+        kpi['nb_clients'] = df_filtered['Customer ID'].nunique()
+    if 'quantite_vendue' in voulus:
+        kpi['quantite_vendue'] = int(df_filtered['Quantity'].sum())
+    kpi['ca_total'] = round(ca_total, 2)
+    kpi['profit_total'] = round(profit_total, 2)
+    kpi['marge_moyenne'] = round((profit_total / ca_total * 100) if ca_total > 0 else 0, 2)
+
+    return {champ: kpi[champ] for champ in voulus}
+
+def calcul_top_produits(
+    snap: Snapshot,
+    limite: int = 10,
+    tri_par: str = "ca",
+    champs: Optional[Tuple[str, ...]] = None
+) -> pd.DataFrame:
+    """Meilleurs produits selon le critère choisi (ca, profit ou quantite)"""
+    # Produits déjà triés par le planificateur, sinon tri sur place
+    produits = table_derivee(
+        snap, f"produits_{tri_par}", lambda: classement_produits(snap, tri_par), snap.agregats.produits
+    )
+
+    # Sélection du top
+    top = produits.head(limite)
+
+    # Formatage de la réponse
+    colonnes = {
+        "produit": lambda: top['Product Name'],
+        "categorie": lambda: top['Category'],
+        "ca": lambda: top['Sales'].round(2),
+        "quantite": lambda: top['Quantity'].astype('int64'),
+        "profit": lambda: top['Profit'].round(2)
+    }
+    return pd.DataFrame({
+        champ: colonnes[champ]() for champ in champs_voulus(champs, CHAMPS_TOP_PRODUITS, table=True)
+    })
+
+def calcul_categories(snap: Snapshot, champs: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """CA, profit, nombre de commandes et marge par catégorie"""
+    voulus = champs_voulus(champs, CHAMPS_CATEGORIES, table=True)
+    # Sans table matérialisée, le comptage distinct des commandes seulement s'il est demandé
+    categories = table_derivee(snap, "categories", lambda: table_categories(snap, nb_commandes='nb_commandes' in voulus))
+    return categories[voulus]
+
+def calcul_temporel(
+    snap: Snapshot,
+    periode: str = 'mois',
+    champs: Optional[Tuple[str, ...]] = None
+) -> pd.DataFrame:
+    """CA, profit, commandes et quantité par jour, mois ou année"""
+    voulus = champs_voulus(champs, CHAMPS_TEMPOREL, table=True)
+    temporal = table_derivee(
+        snap, f"temporel_{periode}", lambda: table_temporelle(snap, periode, nb_commandes='nb_commandes' in voulus)
+    )
+    return temporal[voulus]
+
+def calcul_geographique(snap: Snapshot, champs: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """CA, profit, clients et commandes par région"""
+    voulus = champs_voulus(champs, CHAMPS_GEOGRAPHIQUE, table=True)
+    geo = table_derivee(
+        snap, "geographique",
+        lambda: table_geographique(snap, nb_clients='nb_clients' in voulus, nb_commandes='nb_commandes' in voulus)
+    )
+    return geo[voulus]
+
+def calcul_clients(
+    snap: Snapshot,
+    limite: int = 10,
+    champs: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """Top clients, statistiques de récurrence et analyse par segment"""
+    voulus = champs_voulus(champs, CHAMPS_CLIENTS)
+    resultat = {}
+
+    # Agrégation par client : uniquement pour le top clients et la récurrence
+    if 'top_clients' in voulus or 'recurrence' in voulus:
+        clients = table_derivee(snap, "clients", lambda: table_clients(snap))
+
+        # Top clients (noms et valeur moyenne calculés pour ces seuls clients)
+        if 'top_clients' in voulus:
+            top_clients = clients.sort_values('ca_total', ascending=False).head(limite)
+            resultat['top_clients'] = top_clients.assign(
+                nom=top_clients['customer_id'].map(snap.agregats.noms_clients),
+                valeur_commande_moy=(top_clients['ca_total'] / top_clients['nb_commandes']).round(2)
+            )
+
+        # Statistiques de récurrence
+        if 'recurrence' in voulus:
+            resultat['recurrence'] = {
+                "clients_1_achat": len(clients[clients['nb_commandes'] == 1]),
+                "clients_recurrents": len(clients[clients['nb_commandes'] > 1]),
+                "nb_commandes_moyen": round(clients['nb_commandes'].mean(), 2),
+                "total_clients": len(clients)
+            }
+
+    # Analyse par segment
+    if 'segments' in voulus:
+        resultat['segments'] = table_derivee(snap, "segments", lambda: table_segments(snap))
+
+    return {champ: resultat[champ] for champ in voulus}
+
+def calcul_valeurs_filtres(snap: Snapshot, champs: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """Valeurs uniques disponibles pour les filtres"""
+    df = snap.agregats.commandes
+
+    valeurs = {
+        "categories": lambda: sorted(df['Category'].unique().tolist()),
+        "regions": lambda: sorted(df['Region'].unique().tolist()),
+        "segments": lambda: sorted(df['Segment'].unique().tolist()),
+        "etats": lambda: snap.agregats.etats,
+        "plage_dates": lambda: {
+            "min": snap.stockage.date_min,
+            "max": snap.stockage.date_max
+        }
+    }
+    return {champ: valeurs[champ]() for champ in champs_voulus(champs, CHAMPS_VALEURS_FILTRES)}
+
+def calcul_commandes(
+    snap: Snapshot,
+    limite: int = 100,
+    offset: int = 0,
+    tri: str = "ligne",
+    ordre: str = "asc",
+    apres: Optional[Tuple[float, int]] = None,
+    date_debut: Optional[str] = None,
+    date_fin: Optional[str] = None,
+    categorie: Optional[str] = None,
+    region: Optional[str] = None,
+    segment: Optional[str] = None,
+    champs: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """
+    Page de commandes brutes triées et filtrées (pagination par curseur, voir pagination.py)
+    champs : colonnes des lignes renvoyées (toutes par défaut)
+    """
+    index = index_pour(snap.version, snap.stockage)
+    egalites = filtres_egalite(categorie, region, segment)
+    with etape("filtrage"):
+        numeros, dernier = index.page(tri, ordre, limite, apres, offset, date_debut, date_fin, egalites)
+        total = index.total(date_debut, date_fin, egalites)
+        noter(source="index", lignes_parcourues=index.nb_lignes, lignes_retenues=total)
+    with etape("lecture"):
+        data = index.lire(numeros, list(champs) if champs else None)
+        noter(lignes_lues=len(data))
+
+    return {
+        "total": total,
+        "limite": limite,
+        "offset": offset,
+        "tri": tri,
+        "ordre": ordre,
+        "curseur_suivant": encoder_curseur(snap.empreinte, tri, ordre, *dernier) if dernier else None,
+        "data": data
+    }
@@ -4,14 +4,44 @@ API FastAPI pour l'analyse du dataset Superstore
 📊 Tous les KPI e-commerce implémentés
 """
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Body, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Optional, List, Dict, Tuple, Any, Callable
+from datetime import date, datetime
+from contextlib import nullcontext
+import os
+import time
+import secrets
+import threading
 import pandas as pd
+import orjson
 from pydantic import BaseModel
 import logging
 
+from stockage import StockagePartitionne, CacheLRU
+from agregats import Agregats, ConstructeurAgregats
+from ingestion import valider_lot, LotsIngeres, SurveillantDepot
+from versions import Snapshot, GestionnaireDataset
+from executeur import ExecuteurBorne, ServeurSature, VolUnique
+import kpi
+from pagination import decoder_curseur, CurseurInvalide, index_pour, memoire_index
+from export import FORMATS_EXPORT, lots_filtres, exporter_ndjson, exporter_csv, exporter_parquet, compresser_flux
+from cache_http import entetes_cache, non_modifiee
+from cache_resultats import CacheResultats, IDENTITE, decrire_cle
+from cache_disque import CacheDisque, empreinte_code
+from prechauffage import Prechauffage
+from planificateur import Planificateur, A_CHAQUE_VERSION, A_INTERVALLE
+from memoire import taille_profonde, memoire_processus
+from etapes import Etape, suivre, etape
+from metriques import Registre, MEDIA_PROMETHEUS
+from profilage import Echantillonneur
+from journal_lent import JournalLent, resumer_mesures
+from allocations import SuiviAllocations
+from traces import JournalTraces, verifier_lot_otlp, lire_traceparent, nouvel_id_span, span, spans_etapes, lot_otlp, SPAN_SERVEUR
+from compression import choisir_encodage, compresser, PREFERENCES_REPONSES, PREFERENCES_FLUX
+from serialisation import serialiser, serialiser_arrow, mettre_en_forme, FormatNonDisponible, MEDIA_JSON, MEDIA_ARROW
+
 # Configuration du logger pour faciliter le débogage
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,42 +66,822 @@ app.add_middleware(
 
 # === CHARGEMENT DES DONNÉES ===
 
-# URL du dataset Superstore sur GitHub
-DATASET_URL = "https://raw.githubusercontent.com/leonism/sample-superstore/master/data/superstore.csv"
+# URL du dataset Superstore sur GitHub (surchargeable via la variable d'environnement)
+DATASET_URL = os.getenv(
+    "DATASET_URL",
+    "https://raw.githubusercontent.com/leonism/sample-superstore/master/data/superstore.csv"
+)
+
+# Répertoire des partitions sur disque et budget mémoire des partitions "chaudes"
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees"))
+BUDGET_MEMOIRE_MO = int(os.getenv("BUDGET_MEMOIRE_MO", "256"))
+# Nombre de lignes par groupe couvert par une zone map (min/max/valeurs distinctes)
+TAILLE_GROUPE_LIGNES = int(os.getenv("TAILLE_GROUPE_LIGNES", "128"))
+# Nombre de lignes du CSV lues à la fois (lecture en flux)
+TAILLE_BLOC_CSV = int(os.getenv("TAILLE_BLOC_CSV", "50000"))
+
+# Mode production (voir serveur.py) : chargement synchrone à l'import, avant le fork
+# des workers, pour qu'ils partagent les pages mémoire du dataset en lecture seule
+PRECHARGEMENT = os.getenv("PRECHARGEMENT") == "1"
+NB_WORKERS = int(os.getenv("NB_WORKERS", "1"))
+
+# Jeton requis pour les endpoints d'administration (rechargement du dataset, ...)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Jeton requis pour l'ingestion de nouvelles commandes (ingestion désactivée si absent)
+INGEST_TOKEN = os.getenv("INGEST_TOKEN")
+# Dossier de dépôt surveillé pour les fichiers CSV de nouvelles commandes (optionnel)
+DOSSIER_DEPOT = os.getenv("DOSSIER_DEPOT")
+# Lots ingérés conservés (un fichier Parquet par lot), rejoués à chaque rechargement complet
+DOSSIER_LOTS_INGERES = os.getenv("DOSSIER_LOTS_INGERES") or os.path.join(DATA_DIR, "lots_ingeres")
+
+# Nombre de lignes lues et écrites à la fois par l'export en flux
+TAILLE_LOT_EXPORT = int(os.getenv("TAILLE_LOT_EXPORT") or 50000)
+
+# Calculs des KPI : threads en parallèle, calculs acceptés au total (en cours + en
+# attente) et délai maximal ; au-delà, réponse 503 immédiate avec Retry-After
+NB_THREADS_CALCUL = int(os.getenv("NB_THREADS_CALCUL") or os.cpu_count() or 1)
+FILE_ATTENTE_MAX = int(os.getenv("FILE_ATTENTE_MAX") or 4 * NB_THREADS_CALCUL)
+DELAI_CALCUL_S = float(os.getenv("DELAI_CALCUL_S") or 30)
+
+# Durée (s) pendant laquelle navigateurs et proxys réutilisent une réponse sans
+# la revalider ; ensuite, requête conditionnelle (304 si les données n'ont pas changé)
+CACHE_MAX_AGE_S = int(os.getenv("CACHE_MAX_AGE_S") or 0)
+
+# Réponses calculées gardées en mémoire (avec leurs variantes compressées)
+BUDGET_CACHE_RESULTATS_MO = int(os.getenv("BUDGET_CACHE_RESULTATS_MO") or 64)
+# Réponses gardées sur disque d'un démarrage à l'autre (0 = cache disque désactivé)
+DOSSIER_CACHE = os.getenv("DOSSIER_CACHE") or os.path.join(DATA_DIR, "cache")
+BUDGET_CACHE_DISQUE_MO = int(os.getenv("BUDGET_CACHE_DISQUE_MO") or 512)
+# Taille minimale (octets) d'une réponse pour qu'elle soit compressée
+SEUIL_COMPRESSION_OCTETS = int(os.getenv("SEUIL_COMPRESSION_OCTETS") or 1024)
+
+# Préchauffage du cache à chaque nouvelle version des données (0 = désactivé),
+# nombre de calculs en parallèle (la moitié des threads de calcul par défaut) et
+# période (s) de re-préchauffage des réponses évincées entre-temps (0 = jamais)
+PRECHAUFFAGE = (os.getenv("PRECHAUFFAGE") or "1") == "1"
+NB_THREADS_PRECHAUFFAGE = int(os.getenv("NB_THREADS_PRECHAUFFAGE") or max(1, NB_THREADS_CALCUL // 2))
+PRECHAUFFAGE_INTERVALLE_S = float(os.getenv("PRECHAUFFAGE_INTERVALLE_S") or 0)
 
-def load_data() -> pd.DataFrame:
+# Requêtes plus lentes que ce seuil (ms) journalisées (0 = désactivé) : les
+# NB_REQUETES_LENTES plus récentes en mémoire (/admin/slow), toutes dans le fichier
+SEUIL_REQUETE_LENTE_MS = float(os.getenv("SEUIL_REQUETE_LENTE_MS") or 250)
+NB_REQUETES_LENTES = int(os.getenv("NB_REQUETES_LENTES") or 500)
+FICHIER_REQUETES_LENTES = os.getenv("FICHIER_REQUETES_LENTES") or os.path.join(DATA_DIR, "requetes_lentes.jsonl")
+# Taille (Mo) au-delà de laquelle le fichier est renommé en .1 et recommencé (0 = jamais)
+TAILLE_MAX_REQUETES_LENTES_MO = float(os.getenv("TAILLE_MAX_REQUETES_LENTES_MO") or 50)
+
+# Traces de bout en bout (1 = activées) : requêtes portant un en-tête traceparent et
+# spans envoyés par les dashboards (POST /v1/traces), au format OTLP/JSON dans ce fichier
+TRACES = os.getenv("TRACES") == "1"
+FICHIER_TRACES = os.getenv("FICHIER_TRACES") or os.path.join(DATA_DIR, "traces.jsonl")
+# Taille (Mo) au-delà de laquelle le fichier des traces est renommé en .1 (0 = jamais)
+TAILLE_MAX_TRACES_MO = float(os.getenv("TAILLE_MAX_TRACES_MO") or 50)
+# Jeton que les dashboards joignent à leurs spans (POST /v1/traces désactivé si absent)
+# et taille maximale (Ko) d'un lot reçu
+TRACES_TOKEN = os.getenv("TRACES_TOKEN")
+TAILLE_MAX_LOT_TRACES_KO = int(os.getenv("TAILLE_MAX_LOT_TRACES_KO") or 256)
+
+# Débogage mémoire (1 = activé) : pic et net des allocations de chaque calcul, par
+# endpoint (tracemalloc ; ralentit l'API et exécute les calculs un par un)
+SUIVI_ALLOCATIONS = os.getenv("SUIVI_ALLOCATIONS") == "1"
+
+def nettoyer_bloc(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Charge le dataset Superstore depuis GitHub
-    Nettoie et prépare les données pour l'analyse
+    Nettoie un bloc de lignes brutes du CSV
     
+    Args:
+        df: Bloc lu par pd.read_csv
+        
     Returns:
-        pd.DataFrame: Dataset nettoyé et prêt à l'emploi
+        pd.DataFrame: Bloc nettoyé
     """
+    # Nettoyage des noms de colonnes (suppression espaces)
+    df.columns = df.columns.str.strip()
+    
+    # Conversion des dates au format datetime
+    df['Order Date'] = pd.to_datetime(df['Order Date'])
+    df['Ship Date'] = pd.to_datetime(df['Ship Date'])
+    
+    # Suppression des lignes avec valeurs manquantes critiques
+    return df.dropna(subset=['Order ID', 'Customer ID', 'Sales'])
+
+# Lots acceptés par l'ingestion depuis le chargement du CSV
+lots_ingeres = LotsIngeres(DOSSIER_LOTS_INGERES)
+
+# Avancement du chargement en cours (exposé par /ready)
+etat_chargement: Dict[str, Any] = {
+    "etape": "en attente",
+    "lignes_lues": 0,
+    "debut": None,
+    "duree_s": None,
+    "erreur": None
+}
+
+def load_data(stockage: StockagePartitionne) -> Agregats:
+    """
+    Charge le dataset Superstore depuis GitHub, en flux
+    
+    Le CSV est lu par blocs de TAILLE_BLOC_CSV lignes : chaque bloc est nettoyé,
+    ajouté aux partitions sur disque puis réduit dans les agrégats. Les lignes
+    brutes ne sont donc jamais toutes en mémoire, même pour un export de plusieurs Go.
+    Les lots reçus par l'ingestion sont ensuite rejoués de la même façon.
+    
+    Args:
+        stockage: Stockage partitionné à remplir
+        
+    Returns:
+        Agregats: Agrégats servant tous les KPI
+    """
+    debut = time.perf_counter()
+    etat_chargement.update(etape="lecture", lignes_lues=0, debut=datetime.now().isoformat(), duree_s=None, erreur=None)
     try:
         logger.info(f"Chargement du dataset depuis {DATASET_URL}")
         
-        # Lecture du CSV
-        df = pd.read_csv(DATASET_URL, encoding='latin-1')
+        constructeur = ConstructeurAgregats()
+        stockage.ouvrir_ecriture()
         
-        # Nettoyage des noms de colonnes (suppression espaces)
-        df.columns = df.columns.str.strip()
+        # Lecture du CSV bloc par bloc
+        for bloc in pd.read_csv(DATASET_URL, encoding='latin-1', chunksize=TAILLE_BLOC_CSV):
+            bloc = nettoyer_bloc(bloc)
+            stockage.ajouter(bloc)
+            constructeur.ajouter(bloc)
+            etat_chargement["lignes_lues"] += len(bloc)
         
-        # Conversion des dates au format datetime
-        df['Order Date'] = pd.to_datetime(df['Order Date'])
-        df['Ship Date'] = pd.to_datetime(df['Ship Date'])
+        # Lots ingérés depuis (déjà validés et convertis, voir ingerer_lot)
+        etat_chargement["etape"] = "lots_ingeres"
+        for lot in lots_ingeres.parcourir():
+            stockage.ajouter(lot)
+            constructeur.ajouter(lot)
+            etat_chargement["lignes_lues"] += len(lot)
         
-        # Suppression des lignes avec valeurs manquantes critiques
-        df = df.dropna(subset=['Order ID', 'Customer ID', 'Sales'])
+        etat_chargement["etape"] = "agregation"
+        stockage.fermer_ecriture()
+        agregats = constructeur.finaliser()
         
-        logger.info(f"✅ Dataset chargé : {len(df)} commandes")
-        return df
+        etat_chargement.update(etape="termine", duree_s=round(time.perf_counter() - debut, 3))
+        logger.info(f"✅ Dataset chargé : {agregats.nb_lignes} commandes")
+        return agregats
         
     except Exception as e:
+        etat_chargement.update(etape="erreur", erreur=str(e), duree_s=round(time.perf_counter() - debut, 3))
         logger.error(f"❌ Erreur lors du chargement des données : {e}")
         raise HTTPException(status_code=500, detail=f"Erreur de chargement : {str(e)}")
 
-# Chargement des données au démarrage de l'application
-df = load_data()
+# Gestionnaire des versions du dataset : chaque version est un instantané immuable
+# (partitions sur disque + agrégats) publié en une seule affectation
+cache_partitions = CacheLRU(BUDGET_MEMOIRE_MO * 1024 * 1024)
+gestionnaire = GestionnaireDataset(
+    DATA_DIR,
+    lambda repertoire: StockagePartitionne(
+        repertoire, cache_partitions.budget_octets, TAILLE_GROUPE_LIGNES, cache_partitions
+    )
+)
+
+# En mode production, le dataset est chargé une seule fois, dans le processus parent
+if PRECHARGEMENT:
+    gestionnaire.reconstruire(load_data)
+
+# Délai conseillé aux clients (en secondes) tant que les données ne sont pas prêtes
+RETRY_AFTER_CHARGEMENT = 5
+
+async def snapshot_courant(request: Request) -> Snapshot:
+    """
+    Dépendance FastAPI : instantané sur lequel toute la requête est calculée
+    (sa version est renvoyée dans l'en-tête X-Version-Donnees)
+    
+    Tant que le premier chargement n'est pas terminé, répond 503 immédiatement.
+    """
+    snap = gestionnaire.courant()
+    if snap is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Données en cours de chargement",
+            headers={"Retry-After": str(RETRY_AFTER_CHARGEMENT)}
+        )
+    request.state.version_donnees = snap.version
+    return snap
+
+# Pool borné qui exécute les calculs hors de la boucle asynchrone
+executeur = ExecuteurBorne(NB_THREADS_CALCUL, FILE_ATTENTE_MAX, DELAI_CALCUL_S)
+# Requêtes identiques simultanées -> un seul calcul partagé
+vol_unique = VolUnique()
+# Délai conseillé aux clients (en secondes) quand le serveur est saturé
+RETRY_AFTER_SATURATION = 2
+# Réponses déjà calculées (clé de calcul -> réponse sérialisée et ses variantes compressées)
+cache_resultats = CacheResultats(BUDGET_CACHE_RESULTATS_MO * 1024 * 1024)
+# Second niveau, sur disque : survit aux redémarrages (clés liées à l'empreinte des
+# données et à celle du code des calculs)
+cache_disque = CacheDisque(
+    DOSSIER_CACHE, BUDGET_CACHE_DISQUE_MO * 1024 * 1024,
+    # main.py : nettoyage des données et paramètres des calculs ; stockage.py et
+    # versions.py : lecture des lignes et instantanés servis
+    empreinte_code([
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), module)
+        for module in ("main.py", "kpi.py", "agregats.py", "pagination.py", "serialisation.py",
+                       "compression.py", "stockage.py", "versions.py")
+    ])
+) if BUDGET_CACHE_DISQUE_MO > 0 else None
+
+def choisir_format(
+    request: Request,
+    format: Optional[str] = Query(
+        None, pattern="^(lignes|records|colonnes|columns|arrow)$",
+        description="Mise en forme des tables : lignes (défaut), colonnes ({colonne: [valeurs]}) ou arrow"
+    )
+) -> str:
+    """
+    Dépendance FastAPI : format de sortie des tables d'une réponse
+    
+    Arrow est aussi choisi par négociation de contenu
+    (en-tête Accept: application/vnd.apache.arrow.stream).
+    """
+    if format in ("colonnes", "columns"):
+        return "colonnes"
+    if format == "arrow" or (format is None and MEDIA_ARROW in request.headers.get("accept", "")):
+        return "arrow"
+    return "lignes"
+
+def choisir_champs(
+    fields: Optional[str] = Query(
+        None, description="Champs à renvoyer, séparés par des virgules (tous par défaut) ; "
+                          "seuls ces champs sont calculés"
+    )
+) -> Optional[Tuple[str, ...]]:
+    """Dépendance FastAPI : champs demandés (triés, pour une clé de calcul stable), None = tous"""
+    if not fields:
+        return None
+    return tuple(sorted({c.strip() for c in fields.split(",") if c.strip()})) or None
+
+def texte_date(jour: Optional[date]) -> Optional[str]:
+    """
+    Date d'un filtre au format YYYY-MM-DD attendu par les calculs
+    (les paramètres sont typés date : une date invalide est refusée par FastAPI avec une 422)
+    """
+    return jour.isoformat() if jour else None
+
+def valider_champs(champs: Optional[Tuple[str, ...]], disponibles: List[str]) -> None:
+    """Refuse (422) les champs qui n'existent pas dans la réponse de l'endpoint"""
+    inconnus = [c for c in champs or () if c not in disponibles]
+    if inconnus:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Champs inconnus : {', '.join(inconnus)} (disponibles : {', '.join(disponibles)})"
+        )
+
+# === MÉTRIQUES (exposées par /metrics au format Prometheus) ===
+
+# Fonction de calcul derrière chaque endpoint dont les réponses sont mises en cache
+FONCTIONS_ENDPOINTS = {
+    "/kpi/globaux": kpi.calcul_kpi_globaux,
+    "/kpi/produits/top": kpi.calcul_top_produits,
+    "/kpi/categories": kpi.calcul_categories,
+    "/kpi/temporel": kpi.calcul_temporel,
+    "/kpi/geographique": kpi.calcul_geographique,
+    "/kpi/clients": kpi.calcul_clients,
+    "/filters/valeurs": kpi.calcul_valeurs_filtres,
+    "/data/commandes": kpi.calcul_commandes,
+}
+ENDPOINTS_FONCTIONS = {fonction.__name__: endpoint for endpoint, fonction in FONCTIONS_ENDPOINTS.items()}
+
+registre = Registre()
+
+# Requêtes HTTP (la durée s'arrête à l'envoi des en-têtes : pour l'export en
+# flux, le corps est produit ensuite)
+metrique_requetes = registre.compteur(
+    "superstore_requetes_total", "Requêtes HTTP traitées", ("endpoint", "methode", "statut")
+)
+metrique_duree_requetes = registre.histogramme(
+    "superstore_requete_duree_secondes", "Durée des requêtes HTTP", ("endpoint", "methode")
+)
+metrique_requetes_en_cours = registre.jauge("superstore_requetes_en_cours", "Requêtes HTTP en cours de traitement")
+
+# Étapes des calculs : durée propre (hors sous-étapes) de chaque étape, pour
+# les calculs lancés par une requête ou par le préchauffage
+metrique_etapes = registre.histogramme(
+    "superstore_etape_duree_secondes",
+    "Durée des étapes des calculs (filtrage, agregation, serialisation, compression, cache_disque...)",
+    ("endpoint", "etape", "origine")
+)
+
+def etats_caches() -> Dict[str, dict]:
+    etats = {"resultats": cache_resultats.etat(), "partitions": cache_partitions.etat()}
+    if cache_disque:
+        etats["disque"] = cache_disque.etat()
+    return etats
+
+def par_cache(champ: str):
+    return lambda: {(nom,): etat[champ] for nom, etat in etats_caches().items()}
+
+registre.compteur_lu("superstore_cache_succes_total", "Lectures servies par le cache", ("cache",), par_cache("succes"))
+registre.compteur_lu("superstore_cache_echecs_total", "Lectures absentes du cache", ("cache",), par_cache("echecs"))
+registre.jauge("superstore_cache_entrees", "Entrées en cache", ("cache",), par_cache("entrees"))
+registre.jauge("superstore_cache_octets", "Octets occupés par le cache", ("cache",), par_cache("octets"))
+
+registre.jauge("superstore_calculs_en_cours", "Calculs acceptés par le pool (en cours + en attente)",
+               lire=lambda: executeur.en_cours)
+registre.compteur_lu("superstore_calculs_refuses_total", "Calculs refusés (file pleine)", (),
+                     lambda: executeur.nb_refus)
+registre.compteur_lu("superstore_calculs_delais_depasses_total", "Calculs abandonnés après DELAI_CALCUL_S", (),
+                     lambda: executeur.nb_delais_depasses)
+
+def lire_snapshot(attribut: Callable[[Snapshot], float]):
+    def lire():
+        snap = gestionnaire.courant()
+        return attribut(snap) if snap is not None else None
+    return lire
+
+registre.jauge("superstore_dataset_lignes", "Lignes de la version courante du dataset",
+               lire=lire_snapshot(lambda snap: snap.agregats.nb_lignes))
+registre.jauge("superstore_dataset_version", "Numéro de la version courante du dataset",
+               lire=lire_snapshot(lambda snap: snap.version))
+registre.jauge("superstore_chargement_duree_secondes", "Durée du dernier chargement complet du dataset",
+               lire=lambda: etat_chargement["duree_s"])
+registre.jauge("superstore_reconstruction_en_cours", "1 si une reconstruction complète est en cours",
+               lire=lambda: int(gestionnaire.reconstruction_en_cours))
+registre.jauge("superstore_materialisation_duree_secondes", "Durée de la dernière construction de chaque artefact",
+               ("artefact",), lambda: {(nom,): etat["derniere_duree_s"] for nom, etat in planificateur.etat().items()})
+
+# Allocations des calculs (seulement avec SUIVI_ALLOCATIONS=1, voir allocations.py)
+suivi_allocations = SuiviAllocations(SUIVI_ALLOCATIONS)
+
+def par_endpoint_allocations(champ: str):
+    return lambda: {(endpoint,): stats[champ] for endpoint, stats in suivi_allocations.par_endpoint().items()}
+
+registre.compteur_lu("superstore_allocation_calculs_total", "Calculs dont les allocations ont été mesurées",
+                     ("endpoint",), par_endpoint_allocations("nb_calculs"))
+registre.jauge("superstore_allocation_pic_moyen_octets", "Pic moyen des allocations d'un calcul",
+               ("endpoint",), par_endpoint_allocations("pic_moyen_octets"))
+registre.jauge("superstore_allocation_pic_max_octets", "Pic maximal des allocations d'un calcul",
+               ("endpoint",), par_endpoint_allocations("pic_max_octets"))
+registre.jauge("superstore_allocation_nette_moyenne_octets", "Mémoire restant allouée en moyenne après un calcul",
+               ("endpoint",), par_endpoint_allocations("net_moyen_octets"))
+
+def observer_etapes(fonction: str, racine: Etape, origine: str) -> None:
+    """Enregistre la durée de chaque étape d'un calcul mesuré (voir etapes.py)"""
+    endpoint = ENDPOINTS_FONCTIONS.get(fonction, fonction)
+    for sous_etape in racine.descendants():
+        metrique_etapes.observer(sous_etape.duree_propre_s, endpoint=endpoint, etape=sous_etape.nom, origine=origine)
+
+def calculer_et_serialiser(fonction, snap: Snapshot, parametres: Dict[str, Any], format_sortie: str) -> bytes:
+    """Calcul puis sérialisation (étapes agregation et serialisation), sans cache"""
+    with etape("agregation"):
+        resultat = fonction(snap, **parametres)
+    with etape("serialisation"):
+        if format_sortie == "arrow":
+            return serialiser_arrow(resultat)
+        return serialiser(mettre_en_forme(resultat, format_sortie))
+
+def calculer_reponse(
+    cle: Tuple,
+    fonction,
+    snap: Snapshot,
+    parametres: Dict[str, Any],
+    format_sortie: str,
+    origine: str = "requete"
+) -> Tuple[bytes, Etape]:
+    """
+    Calcul + sérialisation, exécutés ensemble dans le pool ; la réponse est mise en cache
+    (relue depuis le cache disque si elle y est déjà). Chaque étape est mesurée.
+
+    Returns:
+        tuple: (réponse sérialisée, mesure des étapes)
+    """
+    with suivre(fonction.__name__) as racine:
+        with etape("cache_disque"):
+            contenu = cache_disque.lire(cle, IDENTITE) if cache_disque else None
+        if contenu is None:
+            with suivi_allocations.mesurer(ENDPOINTS_FONCTIONS.get(fonction.__name__, fonction.__name__)):
+                contenu = calculer_et_serialiser(fonction, snap, parametres, format_sortie)
+            if cache_disque:
+                with etape("cache_disque"):
+                    cache_disque.ajouter(cle, contenu, IDENTITE)
+    cache_resultats.ajouter(cle, contenu)
+    observer_etapes(fonction.__name__, racine, origine)
+    return contenu, racine
+
+def compresser_reponse(cle: Tuple, contenu: bytes, encodage: str) -> Tuple[bytes, Etape]:
+    """
+    Compression d'une réponse (dans le pool) ; la variante compressée est mise en cache
+
+    Returns:
+        tuple: (réponse compressée, mesure des étapes)
+    """
+    with suivre(cle[0]) as racine:
+        with etape("cache_disque"):
+            compresse = cache_disque.lire(cle, encodage) if cache_disque else None
+        if compresse is None:
+            with etape("compression"):
+                compresse = compresser(contenu, encodage)
+            if cache_disque:
+                with etape("cache_disque"):
+                    cache_disque.ajouter(cle, compresse, encodage)
+    cache_resultats.ajouter(cle, compresse, encodage)
+    observer_etapes(cle[0], racine, "requete")
+    return compresse, racine
+
+# === ARTEFACTS MATÉRIALISÉS (construits en arrière-plan, voir planificateur.py) ===
+
+prechauffage = Prechauffage(NB_THREADS_PRECHAUFFAGE)
+
+def prechauffer(snap: Snapshot) -> None:
+    """Calcule à l'avance les réponses des dashboards pour cette version (voir prechauffage.py)"""
+    def calculer_requete(fonction, parametres: Dict[str, Any], format_sortie: str) -> None:
+        cle = kpi.cle_calcul(fonction, snap, {**parametres, "format": format_sortie})
+        if not cache_resultats.contient(cle):
+            calculer_reponse(cle, fonction, snap, parametres, format_sortie, origine="prechauffage")
+    
+    prechauffage.executer(snap, calculer_requete)
+
+def indexer_commandes(snap: Snapshot) -> None:
+    """Index de pagination des commandes brutes (gardé par pagination.py)"""
+    index_pour(snap.version, snap.stockage)
+
+# Construits dans cet ordre à chaque nouvelle version : les tables dérivées,
+# puis le préchauffage (qui s'appuie sur elles), puis l'index des commandes
+planificateur = Planificateur(gestionnaire.courant)
+for nom_table, construire_table in kpi.TABLES_MATERIALISEES.items():
+    planificateur.enregistrer(nom_table, construire_table)
+if PRECHAUFFAGE:
+    if PRECHAUFFAGE_INTERVALLE_S:
+        planificateur.enregistrer("prechauffage", prechauffer, A_INTERVALLE, PRECHAUFFAGE_INTERVALLE_S)
+    else:
+        planificateur.enregistrer("prechauffage", prechauffer, A_CHAQUE_VERSION)
+planificateur.enregistrer("index_commandes", indexer_commandes)
+
+# En mode production, construction dans le processus parent : les workers
+# héritent des tables et du cache en mémoire déjà remplis
+if PRECHARGEMENT:
+    planificateur.executer(gestionnaire.courant())
+
+async def obtenir_reponse(
+    cle: Tuple,
+    fonction,
+    snap: Snapshot,
+    parametres: Dict[str, Any],
+    format_sortie: str,
+    encodage: Optional[str]
+) -> Tuple[bytes, Optional[str], Optional[Etape], Optional[Etape]]:
+    """
+    Réponse sérialisée, depuis le cache si possible, compressée si demandé
+
+    Returns:
+        tuple: (octets, encodage appliqué ou None si la réponse n'est pas compressée,
+                mesure du calcul et mesure de la compression : None si servis par le cache en mémoire)
+    """
+    if encodage:
+        compresse = cache_resultats.lire(cle, encodage)
+        if compresse is not None:
+            return compresse, encodage, None, None
+
+    calcul = None
+    contenu = cache_resultats.lire(cle)
+    if contenu is None:
+        contenu, calcul = await vol_unique.executer(
+            cle, lambda: executeur.executer(calculer_reponse, cle, fonction, snap, parametres, format_sortie)
+        )
+    if not encodage or len(contenu) < SEUIL_COMPRESSION_OCTETS:
+        return contenu, None, calcul, None
+
+    compresse, compression = await vol_unique.executer(
+        (cle, encodage), lambda: executeur.executer(compresser_reponse, cle, contenu, encodage)
+    )
+    return compresse, encodage, calcul, compression
+
+def reponse_non_modifiee(request: Request, snap: Snapshot, entetes: Dict[str, str]) -> Optional[Response]:
+    """Réponse 304 si la requête conditionnelle correspond (None sinon)"""
+    if non_modifiee(request.headers.get("if-none-match"), request.headers.get("if-modified-since"), snap, entetes):
+        return Response(status_code=304, headers=entetes)
+    return None
+
+# === PROFILAGE (à la demande, réservé aux administrateurs) ===
+
+# Valeurs de ?profile= / X-Profil : arbre des étapes seul, ou arbre + piles échantillonnées
+MODES_PROFILAGE = ("1", "flamegraph")
+
+def mode_profilage(request: Request) -> Optional[str]:
+    """
+    Profilage demandé par ?profile= ou l'en-tête X-Profil (None sinon)
+    
+    Réservé aux administrateurs : le jeton X-Token-Admin est exigé.
+    """
+    mode = request.query_params.get("profile") or request.headers.get("x-profil")
+    if not mode or mode == "0":
+        return None
+    if mode not in MODES_PROFILAGE:
+        raise HTTPException(status_code=422, detail=f"Profilage inconnu : {mode} (disponibles : {', '.join(MODES_PROFILAGE)})")
+    verifier_jeton(request.headers.get("x-token-admin"), ADMIN_TOKEN, "ADMIN_TOKEN")
+    return mode
+
+def profiler_reponse(
+    fonction,
+    snap: Snapshot,
+    parametres: Dict[str, Any],
+    format_sortie: str,
+    echantillonner: bool
+) -> Tuple[bytes, Etape, Optional[Echantillonneur]]:
+    """
+    Calcul + sérialisation mesurés, sans aucun cache (dans le pool)
+    
+    Returns:
+        tuple: (réponse, arbre des étapes, échantillonneur ou None)
+    """
+    echantillonneur = Echantillonneur() if echantillonner else None
+    with suivre(fonction.__name__) as racine, echantillonneur or nullcontext():
+        with suivi_allocations.mesurer(ENDPOINTS_FONCTIONS.get(fonction.__name__, fonction.__name__)):
+            contenu = calculer_et_serialiser(fonction, snap, parametres, format_sortie)
+    if echantillonneur is not None:
+        # Calcul trop court pour quelques relevés : relancé, hors de l'arbre des étapes
+        echantillonneur.completer(lambda: calculer_et_serialiser(fonction, snap, parametres, format_sortie))
+    return contenu, racine, echantillonneur
+
+def entetes_profil(racine: Etape) -> Dict[str, str]:
+    """
+    Arbre des étapes en JSON (X-Profil) et durées au format Server-Timing
+    (affichées par les outils de développement des navigateurs)
+    """
+    return {
+        "X-Profil": serialiser(racine.en_dict()).decode(),
+        "Server-Timing": ", ".join(
+            f"{sous_etape.nom};dur={sous_etape.duree_s * 1000:.3f}" for sous_etape in racine.enfants
+        ),
+        "Cache-Control": "no-store"
+    }
+
+async def reponse_profilee(
+    request: Request,
+    fonction,
+    snap: Snapshot,
+    parametres: Dict[str, Any],
+    format_sortie: str,
+    mode: str
+) -> Response:
+    """
+    Réponse recalculée hors cache, avec l'arbre de ses étapes en en-têtes ;
+    en mode flamegraph, le corps est remplacé par les piles échantillonnées
+    (fichier .folded pour flamegraph.pl / speedscope)
+    """
+    contenu, racine, echantillonneur = await executeur.executer(
+        profiler_reponse, fonction, snap, parametres, format_sortie, mode == "flamegraph"
+    )
+    request.state.mesures = (racine, None)
+    entetes = entetes_profil(racine)
+    if echantillonneur is not None:
+        entetes["Content-Disposition"] = f'attachment; filename="{fonction.__name__}.folded"'
+        entetes["X-Profil-Echantillons"] = str(echantillonneur.nb_echantillons)
+        entetes["X-Profil-Repetitions"] = str(echantillonneur.nb_repetitions)
+        return Response(content=echantillonneur.piles_repliees(), media_type="text/plain", headers=entetes)
+    return Response(content=contenu, media_type=MEDIA_ARROW if format_sortie == "arrow" else MEDIA_JSON, headers=entetes)
+
+# === REQUÊTES LENTES (voir journal_lent.py) ===
+
+journal_lent = JournalLent(
+    SEUIL_REQUETE_LENTE_MS / 1000, NB_REQUETES_LENTES, FICHIER_REQUETES_LENTES,
+    int(TAILLE_MAX_REQUETES_LENTES_MO * 1024 * 1024)
+)
+
+def journaliser_requete_lente(
+    cle: Tuple,
+    snap: Snapshot,
+    duree_s: float,
+    calcul: Optional[Etape],
+    compression: Optional[Etape]
+) -> None:
+    """
+    Enregistre une requête lente : paramètres normalisés, chemin suivi, lignes et étapes
+    (attente_ms : temps hors étapes mesurées, surtout l'attente d'une place dans le pool)
+    """
+    mesure_s = sum(racine.duree_s for racine in (calcul, compression) if racine is not None)
+    journal_lent.enregistrer({
+        "horodatage": datetime.now().isoformat(timespec="seconds"),
+        "endpoint": ENDPOINTS_FONCTIONS.get(cle[0], cle[0]),
+        "requete": decrire_cle(cle),
+        "filtres": dict(cle[2]),
+        "version_donnees": snap.version,
+        "duree_ms": round(duree_s * 1000, 3),
+        "attente_ms": round(max(0.0, duree_s - mesure_s) * 1000, 3),
+        **resumer_mesures(calcul, compression)
+    })
+
+async def calculer(request: Request, fonction, snap: Snapshot, format_sortie: str = "lignes", **parametres) -> Response:
+    """
+    Exécute un calcul de KPI dans le pool borné et renvoie la réponse
+    (JSON, ou Arrow IPC si format_sortie vaut "arrow")
+    
+    La réponse porte un ETag dérivé de la version des données et des
+    paramètres normalisés : si le client envoie le même (If-None-Match),
+    la réponse est 304, sans aucun calcul.
+    Une réponse déjà calculée est servie depuis le cache des résultats ;
+    au-delà de SEUIL_COMPRESSION_OCTETS, elle est compressée selon
+    Accept-Encoding (br, zstd ou gzip) une seule fois par encodage.
+    La réponse est sérialisée directement par orjson : FastAPI ne la
+    revalide pas (le response_model éventuel ne sert qu'à la documentation).
+    Les requêtes simultanées de même clé (fonction, version, paramètres
+    normalisés, format) attendent le calcul déjà en cours au lieu d'en lancer un autre.
+    Répond 503 (avec Retry-After) si trop de calculs sont déjà en attente
+    ou si le résultat n'arrive pas dans le délai DELAI_CALCUL_S.
+    Avec ?profile=1 (administrateurs), la réponse est recalculée hors cache
+    et porte l'arbre de ses étapes (voir reponse_profilee).
+    Au-delà de SEUIL_REQUETE_LENTE_MS, la requête est journalisée (/admin/slow).
+    """
+    debut = time.perf_counter()
+    profil = mode_profilage(request)
+    cle = kpi.cle_calcul(fonction, snap, {**parametres, "format": format_sortie})
+    encodage = choisir_encodage(request.headers.get("accept-encoding"), PREFERENCES_REPONSES)
+    entetes = entetes_cache(snap, cle, CACHE_MAX_AGE_S, encodage=encodage)
+    non_modifiee_304 = reponse_non_modifiee(request, snap, entetes)
+    if non_modifiee_304 is not None and profil is None:
+        return non_modifiee_304
+    try:
+        if profil is not None:
+            return await reponse_profilee(request, fonction, snap, parametres, format_sortie, profil)
+        contenu, encodage_applique, calcul, compression = await obtenir_reponse(
+            cle, fonction, snap, parametres, format_sortie, encodage
+        )
+        # Étapes du calcul, rattachées à la trace de la requête (voir tracer_requetes)
+        request.state.mesures = (calcul, compression)
+    except ServeurSature as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Serveur saturé ({e.raison})",
+            headers={"Retry-After": str(RETRY_AFTER_SATURATION)}
+        )
+    except FormatNonDisponible as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    duree_s = time.perf_counter() - debut
+    if journal_lent.est_lente(duree_s):
+        journaliser_requete_lente(cle, snap, duree_s, calcul, compression)
+    media_type = MEDIA_ARROW if format_sortie == "arrow" else MEDIA_JSON
+    if encodage_applique:
+        entetes = {**entetes, "Content-Encoding": encodage_applique}
+    return Response(content=contenu, media_type=media_type, headers=entetes)
+
+@app.middleware("http")
+async def mesurer_requetes(request: Request, call_next):
+    """Compte les requêtes et mesure leur durée par endpoint (métriques /metrics)"""
+    metrique_requetes_en_cours.inc()
+    debut = time.perf_counter()
+    statut = 500
+    try:
+        response = await call_next(request)
+        statut = response.status_code
+        return response
+    finally:
+        metrique_requetes_en_cours.dec()
+        # Modèle de chemin de la route (ex. /admin/materialisations/{nom}) : pas une série par URL
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "inconnu"
+        metrique_requetes.inc(endpoint=endpoint, methode=request.method, statut=str(statut))
+        metrique_duree_requetes.observer(time.perf_counter() - debut, endpoint=endpoint, methode=request.method)
+
+# === TRACES (voir traces.py) ===
+
+journal_traces = JournalTraces(FICHIER_TRACES, int(TAILLE_MAX_TRACES_MO * 1024 * 1024)) if TRACES else None
+
+@app.middleware("http")
+async def tracer_requetes(request: Request, call_next):
+    """
+    Span de la requête (et des étapes de son calcul) quand elle porte un
+    en-tête traceparent, par exemple envoyé par un dashboard
+    """
+    contexte = lire_traceparent(request.headers.get("traceparent")) if journal_traces else None
+    if contexte is None:
+        return await call_next(request)
+    trace_id, parent_id = contexte
+    span_id = nouvel_id_span()
+    debut_ns = time.time_ns()
+    statut = 500
+    try:
+        response = await call_next(request)
+        statut = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        attributs = {
+            "http.method": request.method,
+            "http.route": route.path if route is not None else "inconnu",
+            "http.status_code": statut
+        }
+        spans = []
+        mesures = getattr(request.state, "mesures", None)
+        if mesures is not None:
+            attributs["superstore.chemin"] = resumer_mesures(*mesures)["chemin"]
+            for role, racine in zip(("calcul", "compression"), mesures):
+                if racine is not None:
+                    spans.extend(spans_etapes(racine, trace_id, span_id, f"{role} {racine.nom}"))
+        spans.insert(0, span(
+            trace_id, span_id, parent_id, f"{request.method} {attributs['http.route']}",
+            debut_ns, time.time_ns(), attributs, SPAN_SERVEUR, erreur=statut >= 500
+        ))
+        journal_traces.ecrire(lot_otlp("superstore-api", spans))
+
+@app.middleware("http")
+async def ajouter_version_donnees(request: Request, call_next):
+    """Expose la version des données utilisée pour calculer la réponse"""
+    response = await call_next(request)
+    version = getattr(request.state, "version_donnees", None)
+    if version is not None:
+        response.headers["X-Version-Donnees"] = str(version)
+    return response
+
+def verifier_jeton(fourni: Optional[str], attendu: Optional[str], nom: str) -> None:
+    """Lève 403 si le jeton n'est pas configuré, 401 s'il ne correspond pas"""
+    if not attendu:
+        raise HTTPException(status_code=403, detail=f"Endpoint désactivé ({nom} non configuré)")
+    if not fourni or not secrets.compare_digest(fourni, attendu):
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+
+async def lire_corps_borne(request: Request, taille_max: int) -> bytes:
+    """Corps de la requête, lu morceau par morceau : 413 dès qu'il dépasse taille_max octets"""
+    trop_gros = HTTPException(status_code=413, detail=f"Corps de requête limité à {taille_max} octets")
+    longueur = request.headers.get("content-length", "")
+    if longueur.isdigit() and int(longueur) > taille_max:
+        raise trop_gros
+    morceaux, taille = [], 0
+    async for morceau in request.stream():
+        taille += len(morceau)
+        if taille > taille_max:
+            raise trop_gros
+        morceaux.append(morceau)
+    return b"".join(morceaux)
+
+def verifier_mono_worker() -> None:
+    """
+    Les écritures (ingestion, rechargement) ne touchent que le processus qui les reçoit :
+    avec plusieurs workers, elles rendraient les workers incohérents entre eux
+    """
+    if NB_WORKERS > 1:
+        raise HTTPException(
+            status_code=409,
+            detail="Non disponible avec plusieurs workers : redémarrer le serveur pour recharger les données"
+        )
+
+def verifier_admin(x_token_admin: Optional[str] = Header(None, description="Jeton d'administration")):
+    """Dépendance FastAPI : réserve un endpoint aux administrateurs (ADMIN_TOKEN)"""
+    verifier_jeton(x_token_admin, ADMIN_TOKEN, "ADMIN_TOKEN")
+
+def ingerer_lot(lot: pd.DataFrame) -> Snapshot:
+    """
+    Ajoute un lot de nouvelles commandes sans recharger le dataset
+    
+    Le lot est validé, écrit dans de nouveaux fichiers de partition et intégré
+    aux agrégats de la version courante, puis publié comme nouvelle version.
+    Il est aussi conservé dans DOSSIER_LOTS_INGERES pour les rechargements complets.
+    Les requêtes en cours terminent sur la version précédente.
+    
+    Args:
+        lot: Nouvelles lignes (colonnes du CSV Superstore)
+        
+    Returns:
+        Snapshot: Version publiée
+    """
+    with gestionnaire.verrou_ecriture:
+        base = gestionnaire.courant()
+        
+        # Mêmes colonnes, dans le même ordre et avec les mêmes types que les partitions existantes
+        lot, erreurs = valider_lot(lot, base.stockage.schema())
+        if erreurs:
+            raise HTTPException(status_code=422, detail={"message": "Lot invalide", "erreurs": erreurs})
+        
+        constructeur = ConstructeurAgregats.depuis(base.agregats)
+        constructeur.ajouter(lot)
+        
+        stockage = base.stockage.copie()
+        stockage.ouvrir_ecriture(remplacer=False)
+        stockage.ajouter(lot)
+        stockage.fermer_ecriture()
+        
+        # Conservé pour les rechargements complets, qui ne relisent que le CSV
+        lots_ingeres.ajouter(lot)
+        snap = gestionnaire.publier(stockage, constructeur.finaliser())
+    
+    logger.info(f"📥 {len(lot)} commandes ingérées (version {snap.version})")
+    planificateur.reveiller()
+    return snap
+
+# Surveillance du dossier de dépôt (si DOSSIER_DEPOT est configuré), lancée une fois
+# une version publiée : un fichier déposé pendant le chargement attend son tour
+# au lieu d'être rejeté
+surveillant_depot = SurveillantDepot(DOSSIER_DEPOT, ingerer_lot) if DOSSIER_DEPOT and NB_WORKERS == 1 else None
+
+def apres_publication(snap: Snapshot) -> None:
+    """Après un chargement complet : artefacts matérialisés et dossier de dépôt"""
+    planificateur.reveiller()
+    if surveillant_depot is not None:
+        surveillant_depot.demarrer()
+
+@app.on_event("startup")
+def demarrer_chargement():
+    """
+    Chargement des données en arrière-plan : le serveur répond dès le démarrage
+    (/health), les KPI et l'ingestion renvoient 503 jusqu'à ce que /ready soit OK.
+    Les artefacts matérialisés sont ensuite construits par le planificateur.
+    """
+    planificateur.demarrer()
+    if gestionnaire.courant() is None:
+        gestionnaire.reconstruire_en_arriere_plan(load_data, ensuite=apres_publication)
+    elif surveillant_depot is not None:
+        # Mode production : données déjà chargées avant le démarrage
+        surveillant_depot.demarrer()
 
 # === MODÈLES PYDANTIC (pour la validation des réponses) ===
 
@@ -101,56 +911,10 @@ class CategoriePerf(BaseModel):
     nb_commandes: int
     marge_pct: float
 
-# === FONCTIONS UTILITAIRES ===
-
-def filtrer_dataframe(
-    df: pd.DataFrame,
-    date_debut: Optional[str] = None,
-    date_fin: Optional[str] = None,
-    categorie: Optional[str] = None,
-    region: Optional[str] = None,
-    segment: Optional[str] = None
-) -> pd.DataFrame:
-    """
-    Applique les filtres sur le dataframe
-    
-    Args:
-        df: DataFrame source
-        date_debut: Date de début (YYYY-MM-DD)
-        date_fin: Date de fin (YYYY-MM-DD)
-        categorie: Catégorie de produit
-        region: Région géographique
-        segment: Segment client
-        
-    Returns:
-        pd.DataFrame: DataFrame filtré
-    """
-    df_filtered = df.copy()
-    
-    # Filtre par date
-    if date_debut:
-        df_filtered = df_filtered[df_filtered['Order Date'] >= date_debut]
-    if date_fin:
-        df_filtered = df_filtered[df_filtered['Order Date'] <= date_fin]
-    
-    # Filtre par catégorie
-    if categorie and categorie != "Toutes":
-        df_filtered = df_filtered[df_filtered['Category'] == categorie]
-    
-    # Filtre par région
-    if region and region != "Toutes":
-        df_filtered = df_filtered[df_filtered['Region'] == region]
-    
-    # Filtre par segment
-    if segment and segment != "Tous":
-        df_filtered = df_filtered[df_filtered['Segment'] == segment]
-    
-    return df_filtered
-
 # === ENDPOINTS API ===
 
 @app.get("/", tags=["Info"])
-def root():
+def root(snap: Snapshot = Depends(snapshot_courant)):
     """
     Endpoint racine - Informations sur l'API
     """
@@ -158,13 +922,17 @@ def root():
         "message": "🛒 API Superstore BI",
         "version": "1.0.0",
         "dataset": "Sample Superstore",
-        "nb_lignes": len(df),
+        "version_donnees": snap.version,
+        "nb_lignes": snap.stockage.nb_lignes,
         "periode": {
-            "debut": df['Order Date'].min().strftime('%Y-%m-%d'),
-            "fin": df['Order Date'].max().strftime('%Y-%m-%d')
+            "debut": snap.stockage.date_min,
+            "fin": snap.stockage.date_max
         },
         "endpoints": {
             "documentation": "/docs",
+            "liveness": "/health",
+            "readiness": "/ready",
+            "metriques": "/metrics",
             "kpi_globaux": "/kpi/globaux",
             "top_produits": "/kpi/produits/top",
             "categories": "/kpi/categories",
@@ -174,13 +942,58 @@ def root():
         }
     }
 
+@app.get("/health", tags=["Info"])
+def health():
+    """
+    💓 LIVENESS
+    
+    Répond dès que le processus sert des requêtes (aucun accès aux données)
+    """
+    return {"statut": "ok"}
+
+@app.get("/metrics", tags=["Info"])
+def metrics():
+    """
+    📈 MÉTRIQUES PROMETHEUS
+    
+    Requêtes et latences par endpoint, durée des étapes des calculs, caches,
+    pool de calcul, dataset et artefacts matérialisés (pour le worker qui répond)
+    """
+    return Response(content=registre.exposer(), media_type=MEDIA_PROMETHEUS)
+
+@app.get("/ready", tags=["Info"])
+def ready():
+    """
+    ✅ READINESS
+    
+    200 quand une version des données est publiée, 503 (avec l'avancement
+    du chargement) sinon
+    """
+    snap = gestionnaire.courant()
+    contenu = {
+        "pret": snap is not None,
+        "version_donnees": snap.version if snap else None,
+        "reconstruction_en_cours": gestionnaire.reconstruction_en_cours,
+        "chargement": etat_chargement,
+        "calculs": {**executeur.etat(), **vol_unique.etat()},
+        "cache_resultats": cache_resultats.etat(),
+        "cache_disque": cache_disque.etat() if cache_disque else None,
+        "prechauffage": prechauffage.etat
+    }
+    if snap is None:
+        return JSONResponse(status_code=503, content=contenu, headers={"Retry-After": str(RETRY_AFTER_CHARGEMENT)})
+    return contenu
+
 @app.get("/kpi/globaux", response_model=KPIGlobaux, tags=["KPI"])
-def get_kpi_globaux(
-    date_debut: Optional[str] = Query(None, description="Date début (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
+async def get_kpi_globaux(
+    request: Request,
+    date_debut: Optional[date] = Query(None, description="Date début (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(None, description="Date fin (YYYY-MM-DD)"),
     categorie: Optional[str] = Query(None, description="Catégorie produit"),
     region: Optional[str] = Query(None, description="Région"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    segment: Optional[str] = Query(None, description="Segment client"),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
 ):
     """
     📊 KPI GLOBAUX
@@ -194,32 +1007,19 @@ def get_kpi_globaux(
     - Profit total
     - Marge moyenne (%)
     """
-    # Application des filtres
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-    
-    # Calcul des KPI
-    ca_total = df_filtered['Sales'].sum()
-    nb_commandes = df_filtered['Order ID'].nunique()
-    nb_clients = df_filtered['Customer ID'].nunique()
-    panier_moyen = ca_total / nb_commandes if nb_commandes > 0 else 0
-    quantite_vendue = int(df_filtered['Quantity'].sum())
-    profit_total = df_filtered['Profit'].sum()
-    marge_moyenne = (profit_total / ca_total * 100) if ca_total > 0 else 0
-    
-    return KPIGlobaux(
-        ca_total=round(ca_total, 2),
-        nb_commandes=nb_commandes,
-        nb_clients=nb_clients,
-        panier_moyen=round(panier_moyen, 2),
-        quantite_vendue=quantite_vendue,
-        profit_total=round(profit_total, 2),
-        marge_moyenne=round(marge_moyenne, 2)
-    )
+    valider_champs(champs, kpi.CHAMPS_KPI_GLOBAUX)
+    return await calculer(request, kpi.calcul_kpi_globaux, snap,
+                          date_debut=texte_date(date_debut), date_fin=texte_date(date_fin),
+                          categorie=categorie, region=region, segment=segment, champs=champs)
 
 @app.get("/kpi/produits/top", tags=["KPI"])
-def get_top_produits(
+async def get_top_produits(
+    request: Request,
     limite: int = Query(10, ge=1, le=50, description="Nombre de produits à retourner"),
-    tri_par: str = Query("ca", regex="^(ca|profit|quantite)$", description="Critère de tri")
+    tri_par: str = Query("ca", pattern="^(ca|profit|quantite)$", description="Critère de tri"),
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
 ):
     """
     🏆 TOP PRODUITS
@@ -229,39 +1029,17 @@ def get_top_produits(
     - profit : Profit
     - quantite : Quantité vendue
     """
-    # Agrégation par produit
-    produits = df.groupby(['Product Name', 'Category']).agg({
-        'Sales': 'sum',
-        'Quantity': 'sum',
-        'Profit': 'sum'
-    }).reset_index()
-    
-    # Tri selon le critère
-    if tri_par == "ca":
-        produits = produits.sort_values('Sales', ascending=False)
-    elif tri_par == "profit":
-        produits = produits.sort_values('Profit', ascending=False)
-    else:  # quantite
-        produits = produits.sort_values('Quantity', ascending=False)
-    
-    # Sélection du top
-    top = produits.head(limite)
-    
-    # Formatage de la réponse
-    result = []
-    for _, row in top.iterrows():
-        result.append({
-            "produit": row['Product Name'],
-            "categorie": row['Category'],
-            "ca": round(row['Sales'], 2),
-            "quantite": int(row['Quantity']),
-            "profit": round(row['Profit'], 2)
-        })
-    
-    return result
+    valider_champs(champs, kpi.CHAMPS_TOP_PRODUITS)
+    return await calculer(request, kpi.calcul_top_produits, snap, format_sortie,
+                          limite=limite, tri_par=tri_par, champs=champs)
 
 @app.get("/kpi/categories", tags=["KPI"])
-def get_performance_categories():
+async def get_performance_categories(
+    request: Request,
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
+):
     """
     📦 PERFORMANCE PAR CATÉGORIE
     
@@ -271,27 +1049,16 @@ def get_performance_categories():
     - Nombre de commandes
     - Marge (%)
     """
-    # Agrégation par catégorie
-    categories = df.groupby('Category').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique'
-    }).reset_index()
-    
-    # Calcul de la marge
-    categories['marge_pct'] = (categories['Profit'] / categories['Sales'] * 100).round(2)
-    
-    # Renommage des colonnes
-    categories.columns = ['categorie', 'ca', 'profit', 'nb_commandes', 'marge_pct']
-    
-    # Tri par CA décroissant
-    categories = categories.sort_values('ca', ascending=False)
-    
-    return categories.to_dict('records')
+    valider_champs(champs, kpi.CHAMPS_CATEGORIES)
+    return await calculer(request, kpi.calcul_categories, snap, format_sortie, champs=champs)
 
 @app.get("/kpi/temporel", tags=["KPI"])
-def get_evolution_temporelle(
-    periode: str = Query('mois', regex='^(jour|mois|annee)$', description="Granularité temporelle")
+async def get_evolution_temporelle(
+    request: Request,
+    periode: str = Query('mois', pattern='^(jour|mois|annee)$', description="Granularité temporelle"),
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
 ):
     """
     📈 ÉVOLUTION TEMPORELLE
@@ -299,33 +1066,16 @@ def get_evolution_temporelle(
     Analyse l'évolution du CA, profit et commandes dans le temps
     Granularités disponibles : jour, mois, annee
     """
-    df_temp = df.copy()
-    
-    # Création de la colonne période selon la granularité
-    if periode == 'jour':
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y-%m-%d')
-    elif periode == 'mois':
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y-%m')
-    else:  # annee
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y')
-    
-    # Agrégation
-    temporal = df_temp.groupby('periode').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique',
-        'Quantity': 'sum'
-    }).reset_index()
-    
-    temporal.columns = ['periode', 'ca', 'profit', 'nb_commandes', 'quantite']
-    
-    # Tri chronologique
-    temporal = temporal.sort_values('periode')
-    
-    return temporal.to_dict('records')
+    valider_champs(champs, kpi.CHAMPS_TEMPOREL)
+    return await calculer(request, kpi.calcul_temporel, snap, format_sortie, periode=periode, champs=champs)
 
 @app.get("/kpi/geographique", tags=["KPI"])
-def get_performance_geographique():
+async def get_performance_geographique(
+    request: Request,
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
+):
     """
     🌍 PERFORMANCE GÉOGRAPHIQUE
     
@@ -335,21 +1085,16 @@ def get_performance_geographique():
     - Nombre de clients
     - Nombre de commandes
     """
-    geo = df.groupby('Region').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Customer ID': 'nunique',
-        'Order ID': 'nunique'
-    }).reset_index()
-    
-    geo.columns = ['region', 'ca', 'profit', 'nb_clients', 'nb_commandes']
-    geo = geo.sort_values('ca', ascending=False)
-    
-    return geo.to_dict('records')
+    valider_champs(champs, kpi.CHAMPS_GEOGRAPHIQUE)
+    return await calculer(request, kpi.calcul_geographique, snap, format_sortie, champs=champs)
 
 @app.get("/kpi/clients", tags=["KPI"])
-def get_analyse_clients(
-    limite: int = Query(10, ge=1, le=100, description="Nombre de top clients")
+async def get_analyse_clients(
+    request: Request,
+    limite: int = Query(10, ge=1, le=100, description="Nombre de top clients"),
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
 ):
     """
     👥 ANALYSE CLIENTS
@@ -359,84 +1104,397 @@ def get_analyse_clients(
     - Statistiques de récurrence
     - Analyse par segment
     """
-    # Top clients
-    clients = df.groupby('Customer ID').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique',
-        'Customer Name': 'first'
-    }).reset_index()
-    
-    clients.columns = ['customer_id', 'ca_total', 'profit_total', 'nb_commandes', 'nom']
-    clients['valeur_commande_moy'] = (clients['ca_total'] / clients['nb_commandes']).round(2)
-    
-    top_clients = clients.sort_values('ca_total', ascending=False).head(limite)
-    
-    # Statistiques de récurrence
-    recurrence = {
-        "clients_1_achat": len(clients[clients['nb_commandes'] == 1]),
-        "clients_recurrents": len(clients[clients['nb_commandes'] > 1]),
-        "nb_commandes_moyen": round(clients['nb_commandes'].mean(), 2),
-        "total_clients": len(clients)
+    valider_champs(champs, kpi.CHAMPS_CLIENTS)
+    return await calculer(request, kpi.calcul_clients, snap, format_sortie, limite=limite, champs=champs)
+
+@app.get("/filters/valeurs", tags=["Filtres"])
+async def get_valeurs_filtres(
+    request: Request,
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
+):
+    """
+    🎯 VALEURS POUR LES FILTRES
+    
+    Retourne toutes les valeurs uniques disponibles pour les filtres
+    """
+    valider_champs(champs, kpi.CHAMPS_VALEURS_FILTRES)
+    return await calculer(request, kpi.calcul_valeurs_filtres, snap, champs=champs)
+
+@app.get("/data/commandes", tags=["Données brutes"])
+async def get_commandes(
+    request: Request,
+    limite: int = Query(100, ge=1, le=1000),
+    curseur: Optional[str] = Query(None, description="Curseur de la page suivante (champ curseur_suivant de la page précédente)"),
+    offset: int = Query(0, ge=0, description="Lignes à sauter (préférer curseur pour les pages profondes)"),
+    tri: str = Query(
+        "ligne", pattern="^(ligne|date|ca|profit|quantite)$",
+        description="Clé de tri (ligne = ordre du fichier source)"
+    ),
+    ordre: str = Query("asc", pattern="^(asc|desc)$", description="Ordre de tri"),
+    date_debut: Optional[date] = Query(None, description="Date début (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(None, description="Date fin (YYYY-MM-DD)"),
+    categorie: Optional[str] = Query(None, description="Catégorie produit"),
+    region: Optional[str] = Query(None, description="Région"),
+    segment: Optional[str] = Query(None, description="Segment client"),
+    format_sortie: str = Depends(choisir_format),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    snap: Snapshot = Depends(snapshot_courant)
+):
+    """
+    📋 DONNÉES BRUTES
+    
+    Retourne les commandes brutes filtrées et triées, page par page.
+    Pour la page suivante, renvoyer `curseur_suivant` dans `curseur` (avec
+    les mêmes filtres et le même tri) : chaque page coûte autant que la
+    première, quelle que soit sa profondeur.
+    `fields` limite les colonnes lues et renvoyées.
+    """
+    if champs:
+        # Colonnes dans l'ordre du dataset
+        disponibles = snap.stockage.colonnes()
+        valider_champs(champs, disponibles)
+        champs = tuple(c for c in disponibles if c in champs)
+    apres = None
+    if curseur:
+        try:
+            apres = decoder_curseur(curseur, snap.empreinte, tri, ordre)
+        except CurseurInvalide as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await calculer(
+        request, kpi.calcul_commandes, snap, format_sortie, limite=limite, offset=0 if apres else offset,
+        tri=tri, ordre=ordre, apres=apres, date_debut=texte_date(date_debut), date_fin=texte_date(date_fin),
+        categorie=categorie, region=region, segment=segment, champs=champs
+    )
+
+@app.get("/data/export", tags=["Données brutes"])
+def get_export(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$", description="Format du fichier exporté"),
+    colonnes: Optional[str] = Query(None, description="Colonnes à exporter, séparées par des virgules (toutes par défaut)"),
+    champs: Optional[Tuple[str, ...]] = Depends(choisir_champs),
+    date_debut: Optional[date] = Query(None, description="Date début (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(None, description="Date fin (YYYY-MM-DD)"),
+    categorie: Optional[str] = Query(None, description="Catégorie produit"),
+    region: Optional[str] = Query(None, description="Région"),
+    segment: Optional[str] = Query(None, description="Segment client"),
+    snap: Snapshot = Depends(snapshot_courant)
+):
+    """
+    🚰 EXPORT EN FLUX
+    
+    Exporte les commandes filtrées en NDJSON, CSV ou Parquet, lot par lot :
+    la réponse est envoyée au fur et à mesure de la lecture des partitions,
+    sans jamais garder tout le résultat en mémoire.
+    Compressée en zstd, gzip ou brotli si le client l'accepte (Accept-Encoding).
+    Requête conditionnelle (If-None-Match) : 304 si les données n'ont pas changé.
+    Les paramètres sont tous validés avant l'envoi des en-têtes : une erreur
+    dans le flux ne pourrait plus être signalée par un code HTTP.
+    """
+    date_debut, date_fin = texte_date(date_debut), texte_date(date_fin)
+    disponibles = snap.stockage.colonnes()
+    selection = None
+    if colonnes:
+        selection = [c.strip() for c in colonnes.split(",") if c.strip()]
+        inconnues = [c for c in selection if c not in disponibles]
+        if inconnues:
+            raise HTTPException(status_code=422, detail=f"Colonnes inconnues : {', '.join(inconnues)}")
+    elif champs:
+        # fields= (comme les autres endpoints) : colonnes dans l'ordre du dataset
+        valider_champs(champs, disponibles)
+        selection = [c for c in disponibles if c in champs]
+    
+    encodage = choisir_encodage(request.headers.get("accept-encoding"), PREFERENCES_FLUX)
+    cle = kpi.cle_calcul(get_export, snap, {
+        "format": format, "colonnes": tuple(selection) if selection else None,
+        "date_debut": date_debut, "date_fin": date_fin, "categorie": categorie, "region": region, "segment": segment
+    })
+    entetes = entetes_cache(snap, cle, CACHE_MAX_AGE_S, vary="Accept-Encoding", encodage=encodage)
+    non_modifiee_304 = reponse_non_modifiee(request, snap, entetes)
+    if non_modifiee_304 is not None:
+        return non_modifiee_304
+    
+    lots = lots_filtres(
+        snap.stockage, date_debut, date_fin, kpi.filtres_egalite(categorie, region, segment),
+        selection, TAILLE_LOT_EXPORT
+    )
+    if format == "ndjson":
+        contenu = exporter_ndjson(lots)
+    elif format == "csv":
+        contenu = exporter_csv(lots)
+    else:  # parquet
+        vide = snap.stockage.schema_vide()
+        contenu = exporter_parquet(lots, vide[selection] if selection else vide)
+    
+    media_type, extension = FORMATS_EXPORT[format]
+    headers = {
+        **entetes,
+        "Content-Disposition": f'attachment; filename="commandes-v{snap.version}.{extension}"'
     }
+    if encodage:
+        contenu = compresser_flux(contenu, encodage)
+        headers["Content-Encoding"] = encodage
+    return StreamingResponse(contenu, media_type=media_type, headers=headers)
+
+@app.post("/ingestion/commandes", tags=["Ingestion"])
+def post_ingestion_commandes(
+    request: Request,
+    lignes: List[Dict[str, Any]] = Body(..., description="Nouvelles lignes (colonnes du CSV Superstore)"),
+    x_token_ingestion: Optional[str] = Header(None, description="Jeton d'ingestion (INGEST_TOKEN)"),
+    snap: Snapshot = Depends(snapshot_courant)
+):
+    """
+    📥 INGESTION DE COMMANDES
+    
+    Ajoute un lot de nouvelles commandes sans redémarrer l'API :
+    partitions, agrégats et version des données sont mis à jour
+    (503 tant que le premier chargement n'est pas terminé)
+    """
+    verifier_jeton(x_token_ingestion, INGEST_TOKEN, "INGEST_TOKEN")
+    verifier_mono_worker()
     
-    # Analyse par segment
-    segments = df.groupby('Segment').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Customer ID': 'nunique'
-    }).reset_index()
-    segments.columns = ['segment', 'ca', 'profit', 'nb_clients']
+    if lignes:
+        snap = ingerer_lot(pd.DataFrame(lignes))
+    request.state.version_donnees = snap.version
     
     return {
-        "top_clients": top_clients.to_dict('records'),
-        "recurrence": recurrence,
-        "segments": segments.to_dict('records')
+        "lignes_ajoutees": len(lignes),
+        "version_donnees": snap.version
     }
 
-@app.get("/filters/valeurs", tags=["Filtres"])
-def get_valeurs_filtres():
+@app.post("/admin/rechargement", status_code=202, tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def post_rechargement():
     """
-    🎯 VALEURS POUR LES FILTRES
+    🔄 RECHARGEMENT DU DATASET
     
-    Retourne toutes les valeurs uniques disponibles pour les filtres
+    Reconstruit une nouvelle version complète en arrière-plan puis la publie
+    atomiquement ; les requêtes continuent d'être servies par la version courante.
+    Les artefacts matérialisés (tables dérivées, préchauffage) sont ensuite reconstruits.
+    """
+    verifier_mono_worker()
+    lancee = gestionnaire.reconstruire_en_arriere_plan(load_data, ensuite=apres_publication)
+    snap = gestionnaire.courant()
+    return {
+        "reconstruction": "lancée" if lancee else "déjà en cours",
+        "version_courante": snap.version if snap else None
+    }
+
+@app.get("/admin/materialisations", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_materialisations():
+    """
+    🏗️ ARTEFACTS MATÉRIALISÉS
+    
+    Pour chaque artefact construit en arrière-plan : politique de rafraîchissement,
+    statut, version et âge de la dernière construction, durée, retard sur les données
+    """
+    snap = gestionnaire.courant()
+    return {
+        "version_donnees": snap.version if snap else None,
+        "artefacts": planificateur.etat()
+    }
+
+@app.post("/admin/materialisations/{nom}", status_code=202, tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def post_materialisation(nom: str):
+    """
+    🔁 RECONSTRUCTION D'UN ARTEFACT
+    
+    Demande la reconstruction immédiate d'un artefact, quelle que soit sa
+    politique (dans le worker qui reçoit la requête)
+    """
+    try:
+        planificateur.demander(nom)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": f"Artefact inconnu : {nom}", "disponibles": list(planificateur.artefacts)}
+        )
+    return {"artefact": nom, "reconstruction": "demandée"}
+
+@app.get("/admin/cache", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_cache(top: int = Query(10, ge=0, le=100, description="Nombre de clés les plus lues à afficher par cache")):
+    """
+    🗄️ CONTENU DES CACHES
+    
+    Pour chaque cache (réponses en mémoire, réponses sur disque, partitions
+    chaudes) : entrées, octets, taux de succès et clés les plus lues.
+    Les caches en mémoire sont ceux du worker qui reçoit la requête.
+    """
+    return {
+        "resultats": {**cache_resultats.etat(), "principales": cache_resultats.principales(top)},
+        "disque": {**cache_disque.etat(), "principales": cache_disque.principales(top)} if cache_disque else None,
+        "partitions": {**cache_partitions.etat(), "principales": cache_partitions.principales(top)}
+    }
+
+@app.post("/admin/cache/invalidate", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def post_invalidation_cache(
+    endpoint: Optional[str] = Query(None, description="Endpoint dont les réponses sont supprimées (ex. /kpi/temporel)"),
+    motif: Optional[str] = Query(None, description="Motif de clé, * et ? acceptés (ex. calcul_kpi_globaux?*region=West*)")
+):
+    """
+    🧹 INVALIDATION DES RÉPONSES EN CACHE
+    
+    Supprime les réponses d'un endpoint et/ou dont la clé correspond au motif
+    (forme des clés : voir /admin/cache), en mémoire et sur disque.
+    Elles seront recalculées à la prochaine requête.
     """
+    if endpoint is None and motif is None:
+        raise HTTPException(status_code=422, detail="Préciser endpoint et/ou motif (motif=* pour tout supprimer)")
+    fonction = None
+    if endpoint is not None:
+        if endpoint not in FONCTIONS_ENDPOINTS:
+            raise HTTPException(
+                status_code=404,
+                detail={"message": f"Endpoint sans cache : {endpoint}", "disponibles": list(FONCTIONS_ENDPOINTS)}
+            )
+        fonction = FONCTIONS_ENDPOINTS[endpoint].__name__
     return {
-        "categories": sorted(df['Category'].unique().tolist()),
-        "regions": sorted(df['Region'].unique().tolist()),
-        "segments": sorted(df['Segment'].unique().tolist()),
-        "etats": sorted(df['State'].unique().tolist()),
-        "plage_dates": {
-            "min": df['Order Date'].min().strftime('%Y-%m-%d'),
-            "max": df['Order Date'].max().strftime('%Y-%m-%d')
+        "supprimees": {
+            "resultats": cache_resultats.invalider(fonction, motif),
+            "disque": cache_disque.invalider(fonction, motif) if cache_disque else 0
         }
     }
 
-@app.get("/data/commandes", tags=["Données brutes"])
-def get_commandes(
-    limite: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+@app.get("/admin/memory", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_memoire():
+    """
+    🧠 MÉMOIRE OCCUPÉE
+    
+    Taille profonde (memory_usage(deep=True)) des agrégats, des tables
+    matérialisées, des index de pagination et des caches, et mémoire
+    résidente (RSS) du processus : aide à dimensionner les workers
+    """
+    snap = gestionnaire.courant()
+    agregats, materialises, partitions = {}, {}, 0
+    if snap is not None:
+        agregats = {
+            "cube_commandes": taille_profonde(snap.agregats.commandes),
+            "produits": taille_profonde(snap.agregats.produits),
+            "noms_clients": taille_profonde(snap.agregats.noms_clients),
+            "etats": taille_profonde(snap.agregats.etats)
+        }
+        materialises = {nom: taille_profonde(valeur) for nom, valeur in snap.materialises.items()}
+        # Manifeste des partitions et leurs zone maps
+        partitions = taille_profonde(snap.stockage.partitions)
+    index = memoire_index()
+    caches = {
+        "resultats": cache_resultats.octets,
+        "partitions": cache_partitions.octets
+    }
+    return {
+        "version_donnees": snap.version if snap else None,
+        "processus": memoire_processus(),
+        "agregats": agregats,
+        "materialises": materialises,
+        "index_commandes": {str(version): octets for version, octets in index.items()},
+        "zone_maps": partitions,
+        "caches": caches,
+        "total_mesure_octets": sum(agregats.values()) + sum(materialises.values()) + sum(index.values())
+                               + partitions + sum(caches.values())
+    }
+
+@app.get("/admin/slow", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_requetes_lentes(
+    top: int = Query(20, ge=1, le=500, description="Nombre de requêtes (et de groupes) à afficher"),
+    endpoint: Optional[str] = Query(None, description="Seulement cet endpoint (ex. /kpi/globaux)")
 ):
     """
-    📋 DONNÉES BRUTES
+    🐢 REQUÊTES LENTES
+    
+    Requêtes plus lentes que SEUIL_REQUETE_LENTE_MS parmi les plus récentes :
+    - pires : les plus lentes, avec chemin suivi (cache_memoire, cache_disque,
+      materialisee, cube, index), lignes parcourues / retenues et étapes
+    - par_requete : regroupées par endpoint et filtres normalisés, les plus
+      coûteuses au total d'abord (candidates au précalcul)
+    """
+    if endpoint is not None and endpoint not in FONCTIONS_ENDPOINTS:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": f"Endpoint non journalisé : {endpoint}", "disponibles": list(FONCTIONS_ENDPOINTS)}
+        )
+    return {
+        "journal": journal_lent.etat(),
+        "pires": journal_lent.pires(top, endpoint),
+        "par_requete": journal_lent.par_requete(top, endpoint)
+    }
+
+@app.post("/v1/traces", tags=["Traces"])
+async def post_traces(
+    request: Request,
+    x_token_traces: Optional[str] = Header(None, description="Jeton des dashboards (TRACES_TOKEN)")
+):
+    """
+    🧵 RÉCEPTION DE SPANS (OTLP/HTTP JSON)
+    
+    Les dashboards y envoient les spans de chaque rendu de page (corps :
+    ExportTraceServiceRequest en JSON, TAILLE_MAX_LOT_TRACES_KO au plus) :
+    ils sont rangés avec ceux de l'API (même fichier, voir /admin/traces).
+    """
+    if journal_traces is None:
+        raise HTTPException(status_code=403, detail="Endpoint désactivé (TRACES non configuré)")
+    verifier_jeton(x_token_traces, TRACES_TOKEN, "TRACES_TOKEN")
+    corps = await lire_corps_borne(request, TAILLE_MAX_LOT_TRACES_KO * 1024)
+    try:
+        lot = orjson.loads(corps)
+        verifier_lot_otlp(lot)
+    except ValueError as e:  # JSON illisible (orjson.JSONDecodeError) ou lot mal formé
+        raise HTTPException(status_code=400, detail=str(e))
+    journal_traces.ecrire(lot)
+    return {}
+
+@app.get("/admin/traces", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_traces(top: int = Query(20, ge=1, le=500, description="Nombre de traces à afficher")):
+    """
+    🧵 TRACES RÉCENTES
     
-    Retourne les commandes brutes avec pagination
+    Un rendu de page par trace : span racine, durée totale, nombre de spans et
+    services (dashboard, API)
+    """
+    if journal_traces is None:
+        raise HTTPException(status_code=403, detail="Traces désactivées (TRACES non configuré)")
+    return {"fichier": journal_traces.fichier.etat(), "traces": journal_traces.recentes(top)}
+
+@app.get("/admin/traces/{trace_id}", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_trace(trace_id: str):
     """
-    total = len(df)
-    commandes = df.iloc[offset:offset+limite]
+    🌊 CASCADE D'UNE TRACE
     
-    # Conversion des dates en string pour JSON
-    commandes_dict = commandes.copy()
-    commandes_dict['Order Date'] = commandes_dict['Order Date'].dt.strftime('%Y-%m-%d')
-    commandes_dict['Ship Date'] = commandes_dict['Ship Date'].dt.strftime('%Y-%m-%d')
+    Spans du rendu dans l'ordre chronologique : décalage depuis le début du
+    rendu, durée et profondeur (appel du dashboard > requête API > étapes)
+    """
+    if journal_traces is None:
+        raise HTTPException(status_code=403, detail="Traces désactivées (TRACES non configuré)")
+    cascade = journal_traces.cascade(trace_id.lower())
+    if not cascade:
+        raise HTTPException(status_code=404, detail=f"Trace inconnue : {trace_id}")
+    return {"trace_id": trace_id.lower(), "spans": cascade}
+
+def verifier_suivi_allocations() -> None:
+    if not suivi_allocations.actif:
+        raise HTTPException(status_code=403, detail="Suivi désactivé (SUIVI_ALLOCATIONS non configuré)")
+
+@app.get("/admin/allocations", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def get_allocations(sites: int = Query(10, ge=0, le=100, description="Lignes de code retenant le plus de mémoire")):
+    """
+    🧪 ALLOCATIONS DES CALCULS (SUIVI_ALLOCATIONS=1)
     
+    Par endpoint : pic d'allocations d'un calcul (copies temporaires comprises)
+    et mémoire qui reste allouée après (net, réponse mise en cache comprise).
+    Avec sites > 0 : lignes de code qui retiennent le plus de mémoire en ce moment.
+    """
+    verifier_suivi_allocations()
     return {
-        "total": total,
-        "limite": limite,
-        "offset": offset,
-        "data": commandes_dict.to_dict('records')
+        "suivi": suivi_allocations.etat(),
+        "endpoints": suivi_allocations.par_endpoint(),
+        "sites": suivi_allocations.principaux_sites(sites)
     }
 
+@app.post("/admin/allocations/reset", tags=["Administration"], dependencies=[Depends(verifier_admin)])
+def post_reinitialisation_allocations():
+    """🧪 Remet à zéro les statistiques d'allocations (ex. avant de mesurer une optimisation)"""
+    verifier_suivi_allocations()
+    suivi_allocations.reinitialiser()
+    return {"reinitialise": True}
+
 # === DÉMARRAGE DU SERVEUR ===
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+"""
+Mesure de la mémoire occupée
+📏 Taille profonde des objets servant les KPI (DataFrames, tableaux NumPy,
+   chaînes comprises) : aide à dimensionner les conteneurs des workers
+🖥️ Mémoire résidente (RSS) du processus
+"""
+
+from typing import Any, Dict, Optional
+import resource
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def taille_profonde(objet: Any) -> int:
+    """
+    Mémoire (octets) d'un objet et de son contenu
+
+    DataFrame et Series : memory_usage(deep=True), qui compte aussi les chaînes
+    des colonnes objet ; dictionnaires, listes et tuples : somme de leur contenu.
+    """
+    if isinstance(objet, pd.DataFrame):
+        return int(objet.memory_usage(deep=True).sum())
+    if isinstance(objet, pd.Series):
+        return int(objet.memory_usage(deep=True))
+    if isinstance(objet, np.ndarray):
+        return int(objet.nbytes)
+    if isinstance(objet, dict):
+        return sys.getsizeof(objet) + sum(taille_profonde(cle) + taille_profonde(valeur) for cle, valeur in objet.items())
+    if isinstance(objet, (list, tuple, set)):
+        return sys.getsizeof(objet) + sum(taille_profonde(element) for element in objet)
+    return sys.getsizeof(objet)
+
+
+def memoire_processus() -> Dict[str, Optional[int]]:
+    """
+    Mémoire résidente actuelle et maximale du processus (octets)
+
+    Lue dans /proc/self/status (Linux) ; ailleurs, seul le maximum est connu.
+    """
+    valeurs = {}
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                nom, _, valeur = ligne.partition(":")
+                if nom in ("VmRSS", "VmHWM"):
+                    valeurs[nom] = int(valeur.split()[0]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "rss_octets": valeurs.get("VmRSS"),
+        "rss_max_octets": valeurs.get("VmHWM", maximum * 1024 if sys.platform != "darwin" else maximum)
+    }
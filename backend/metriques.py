@@ -0,0 +1,188 @@
+"""
+Métriques au format Prometheus (exposition texte)
+📈 Compteurs, jauges et histogrammes avec étiquettes, exposés par /metrics
+🧮 Les valeurs déjà tenues ailleurs (caches, dataset...) sont lues au moment
+   de la collecte, sans double comptage
+🏹 Format texte 0.0.4 écrit directement : aucune dépendance supplémentaire
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+
+# Bornes (en secondes) des histogrammes de latence
+BORNES_LATENCE_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Type MIME de l'exposition texte Prometheus (Starlette ajoute charset=utf-8)
+MEDIA_PROMETHEUS = "text/plain; version=0.0.4"
+
+# Valeurs d'une métrique : {valeurs des étiquettes: valeur}
+Valeurs = Dict[Tuple[str, ...], float]
+
+
+def _echapper(valeur: str) -> str:
+    return str(valeur).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _nombre(valeur: float) -> str:
+    if math.isinf(valeur):
+        return "+Inf" if valeur > 0 else "-Inf"
+    return repr(float(valeur)) if not float(valeur).is_integer() else str(int(valeur))
+
+
+def _serie(nom: str, etiquettes: Tuple[str, ...], valeurs: Tuple[str, ...], valeur: float) -> str:
+    if etiquettes:
+        texte = ",".join(f'{etiquette}="{_echapper(v)}"' for etiquette, v in zip(etiquettes, valeurs))
+        return f"{nom}{{{texte}}} {_nombre(valeur)}"
+    return f"{nom} {_nombre(valeur)}"
+
+
+class Metrique:
+    """Base commune : nom, aide, type Prometheus et noms des étiquettes"""
+
+    type_prometheus = "untyped"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Iterable[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._verrou = threading.Lock()
+
+    def _cle(self, etiquettes: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(etiquettes[nom]) for nom in self.etiquettes)
+
+    def lignes(self) -> List[str]:
+        return [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type_prometheus}"] + self._series()
+
+    def _series(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Compteur(Metrique):
+    """Valeur qui ne fait qu'augmenter (ex. nombre de requêtes)"""
+
+    type_prometheus = "counter"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Iterable[str] = ()):
+        super().__init__(nom, aide, etiquettes)
+        self._valeurs: Valeurs = {}
+
+    def inc(self, valeur: float = 1.0, **etiquettes: str) -> None:
+        cle = self._cle(etiquettes)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0.0) + valeur
+
+    def _series(self) -> List[str]:
+        with self._verrou:
+            valeurs = dict(self._valeurs)
+        return [_serie(self.nom, self.etiquettes, cle, v) for cle, v in sorted(valeurs.items())]
+
+
+class Jauge(Metrique):
+    """
+    Valeur qui monte et descend (ex. requêtes en cours)
+
+    Avec `lire`, la valeur est obtenue au moment de la collecte : lire()
+    retourne un nombre (sans étiquette) ou {valeurs des étiquettes: nombre}.
+    """
+
+    type_prometheus = "gauge"
+
+    def __init__(
+        self,
+        nom: str,
+        aide: str,
+        etiquettes: Iterable[str] = (),
+        lire: Optional[Callable[[], object]] = None
+    ):
+        super().__init__(nom, aide, etiquettes)
+        self._valeurs: Valeurs = {}
+        self.lire = lire
+
+    def inc(self, valeur: float = 1.0, **etiquettes: str) -> None:
+        cle = self._cle(etiquettes)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0.0) + valeur
+
+    def dec(self, valeur: float = 1.0, **etiquettes: str) -> None:
+        self.inc(-valeur, **etiquettes)
+
+    def _series(self) -> List[str]:
+        if self.lire is not None:
+            valeurs = self.lire()
+            if not isinstance(valeurs, dict):
+                valeurs = {} if valeurs is None else {(): valeurs}
+        else:
+            with self._verrou:
+                valeurs = dict(self._valeurs)
+        return [
+            _serie(self.nom, self.etiquettes, cle, v)
+            for cle, v in sorted(valeurs.items()) if v is not None
+        ]
+
+
+class CompteurLu(Jauge):
+    """Compteur tenu ailleurs (ex. succès d'un cache), lu au moment de la collecte"""
+
+    type_prometheus = "counter"
+
+
+class Histogramme(Metrique):
+    """Répartition de valeurs observées (ex. latences) dans des intervalles cumulés"""
+
+    type_prometheus = "histogram"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Iterable[str] = (), bornes: Iterable[float] = BORNES_LATENCE_S):
+        super().__init__(nom, aide, etiquettes)
+        self.bornes = tuple(sorted(bornes))
+        # {étiquettes: [effectif par intervalle..., somme, nombre]}
+        self._valeurs: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observer(self, valeur: float, **etiquettes: str) -> None:
+        cle = self._cle(etiquettes)
+        with self._verrou:
+            cumuls = self._valeurs.setdefault(cle, [0.0] * (len(self.bornes) + 2))
+            for i, borne in enumerate(self.bornes):
+                if valeur <= borne:
+                    cumuls[i] += 1
+            cumuls[-2] += valeur
+            cumuls[-1] += 1
+
+    def _series(self) -> List[str]:
+        with self._verrou:
+            valeurs = {cle: list(cumuls) for cle, cumuls in self._valeurs.items()}
+        etiquettes = self.etiquettes + ("le",)
+        lignes = []
+        for cle, cumuls in sorted(valeurs.items()):
+            for borne, effectif in zip(self.bornes + (math.inf,), cumuls[:len(self.bornes)] + [cumuls[-1]]):
+                lignes.append(_serie(f"{self.nom}_bucket", etiquettes, cle + (_nombre(borne),), effectif))
+            lignes.append(_serie(f"{self.nom}_sum", self.etiquettes, cle, cumuls[-2]))
+            lignes.append(_serie(f"{self.nom}_count", self.etiquettes, cle, cumuls[-1]))
+        return lignes
+
+
+class Registre:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self.metriques: List[Metrique] = []
+
+    def ajouter(self, metrique: Metrique) -> Metrique:
+        self.metriques.append(metrique)
+        return metrique
+
+    def compteur(self, nom: str, aide: str, etiquettes: Iterable[str] = ()) -> Compteur:
+        return self.ajouter(Compteur(nom, aide, etiquettes))
+
+    def jauge(self, nom: str, aide: str, etiquettes: Iterable[str] = (), lire: Optional[Callable[[], object]] = None) -> Jauge:
+        return self.ajouter(Jauge(nom, aide, etiquettes, lire))
+
+    def compteur_lu(self, nom: str, aide: str, etiquettes: Iterable[str], lire: Callable[[], object]) -> CompteurLu:
+        return self.ajouter(CompteurLu(nom, aide, etiquettes, lire))
+
+    def histogramme(self, nom: str, aide: str, etiquettes: Iterable[str] = (), bornes: Iterable[float] = BORNES_LATENCE_S) -> Histogramme:
+        return self.ajouter(Histogramme(nom, aide, etiquettes, bornes))
+
+    def exposer(self) -> str:
+        """Toutes les métriques au format texte Prometheus"""
+        return "\n".join(ligne for metrique in self.metriques for ligne in metrique.lignes()) + "\n"
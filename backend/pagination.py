@@ -0,0 +1,272 @@
+"""
+Pagination par curseur (keyset) des commandes brutes
+🔑 Index trié par clé de tri : une page se retrouve par recherche dichotomique
+   à partir de la dernière ligne de la page précédente, jamais en sautant
+   `offset` lignes - la page N coûte autant que la page 1
+🎯 Les filtres sont évalués sur les colonnes compactes de l'index
+"""
+
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple, Any
+import base64
+import threading
+import numpy as np
+import orjson
+import pandas as pd
+
+from stockage import StockagePartitionne
+
+# Clé de tri (paramètre "tri") -> colonne du dataset
+# ("ligne" : ordre du fichier source, tri par défaut comme avant la pagination par curseur)
+COLONNES_TRI = {
+    "ligne": "Row ID",
+    "date": "Order Date",
+    "ca": "Sales",
+    "profit": "Profit",
+    "quantite": "Quantity",
+}
+
+# Colonnes des filtres d'égalité, gardées en codes entiers dans l'index
+COLONNES_FILTRES = ['Category', 'Region', 'Segment']
+
+# Nombre de totaux (par combinaison de filtres) gardés en mémoire
+MAX_TOTAUX = 256
+
+
+class CurseurInvalide(ValueError):
+    """Curseur illisible, ou créé sur d'autres données / un autre tri"""
+
+
+def encoder_curseur(empreinte: str, tri: str, ordre: str, valeur: float, numero: int) -> str:
+    """
+    Curseur opaque désignant la dernière ligne d'une page
+
+    Args:
+        empreinte: Empreinte des données (le curseur reste valable tant qu'elles ne changent pas)
+    """
+    brut = orjson.dumps([empreinte, tri, ordre, valeur, numero])
+    return base64.urlsafe_b64encode(brut).rstrip(b"=").decode()
+
+
+def decoder_curseur(curseur: str, empreinte: str, tri: str, ordre: str) -> Tuple[float, int]:
+    """
+    Returns:
+        tuple: (valeur de tri, numéro de ligne) de la dernière ligne déjà renvoyée
+
+    Raises:
+        CurseurInvalide: Curseur illisible ou incompatible avec la requête
+    """
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4))
+        empreinte_c, tri_c, ordre_c, valeur, numero = orjson.loads(brut)
+    except Exception:
+        raise CurseurInvalide("Curseur illisible")
+    if (tri_c, ordre_c) != (tri, ordre):
+        raise CurseurInvalide("Curseur créé pour un autre tri")
+    if empreinte_c != empreinte:
+        raise CurseurInvalide("Curseur créé sur une version précédente des données")
+    return float(valeur), int(numero)
+
+
+class IndexCommandes:
+    """
+    Index des lignes d'une version du dataset
+
+    Chaque ligne a un numéro (sa position dans l'ordre des partitions). L'index
+    garde, pour ces numéros, les colonnes de tri et de filtre sous forme de
+    tableaux NumPy compacts, et construit à la demande l'ordre trié de chaque
+    clé de tri (départage des ex aequo par numéro de ligne).
+    """
+
+    def __init__(self, stockage: StockagePartitionne):
+        self.stockage = stockage
+        colonnes = list(COLONNES_TRI.values()) + COLONNES_FILTRES
+        lots = list(stockage.parcourir(colonnes=colonnes))
+        df = pd.concat(lots, ignore_index=True) if lots else pd.DataFrame(columns=colonnes)
+
+        self.nb_lignes = len(df)
+        # Premier numéro de ligne de chaque partition (recherche de la partition d'une ligne)
+        self.debuts_partitions = np.cumsum([0] + [p['nb_lignes'] for p in stockage.partitions])[:-1]
+
+        self.valeurs: Dict[str, np.ndarray] = {}
+        for tri, colonne in COLONNES_TRI.items():
+            serie = df[colonne]
+            if tri == "date":
+                serie = pd.to_datetime(serie).astype('int64')
+            elif tri == "ligne":
+                # Lignes ingérées sans Row ID : après celles du fichier, dans l'ordre de l'index
+                serie = pd.to_numeric(serie).astype('float64')
+                manquants = serie.isna().to_numpy()
+                if manquants.any():
+                    maximum = serie.max() if not manquants.all() else 0.0
+                    serie = serie.fillna(pd.Series(maximum + 1 + np.arange(len(serie)), index=serie.index))
+            self.valeurs[tri] = serie.to_numpy(dtype=np.float64)
+
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, Dict[str, int]] = {}
+        for colonne in COLONNES_FILTRES:
+            categorielle = df[colonne].astype('category')
+            self.codes[colonne] = categorielle.cat.codes.to_numpy()
+            self.categories[colonne] = {v: i for i, v in enumerate(categorielle.cat.categories)}
+
+        self._ordres: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._totaux: "OrderedDict[Tuple, int]" = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def octets(self) -> int:
+        """Mémoire des tableaux de l'index (colonnes, codes et ordres de tri déjà construits)"""
+        with self._verrou:
+            ordres = [tableau for paire in self._ordres.values() for tableau in paire]
+        tableaux = list(self.valeurs.values()) + list(self.codes.values()) + ordres + [self.debuts_partitions]
+        return int(sum(tableau.nbytes for tableau in tableaux))
+
+    def ordre(self, tri: str, ordre: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Numéros de ligne dans l'ordre de tri, et clés de tri correspondantes
+        (valeurs négées pour l'ordre décroissant : les clés restent croissantes)
+        """
+        cle = (tri, ordre)
+        if cle not in self._ordres:
+            signe = -1.0 if ordre == "desc" else 1.0
+            cles = self.valeurs[tri] * signe
+            numeros = np.lexsort((np.arange(self.nb_lignes), cles))
+            with self._verrou:
+                self._ordres[cle] = (numeros, cles[numeros])
+        return self._ordres[cle]
+
+    def masque(
+        self,
+        numeros: np.ndarray,
+        date_debut: Optional[str],
+        date_fin: Optional[str],
+        egalites: Dict[str, str]
+    ) -> np.ndarray:
+        """Lignes (parmi `numeros`) qui satisfont les filtres"""
+        masque = np.ones(len(numeros), dtype=bool)
+        dates = self.valeurs["date"]
+        if date_debut:
+            masque &= dates[numeros] >= pd.Timestamp(date_debut).value
+        if date_fin:
+            masque &= dates[numeros] <= pd.Timestamp(date_fin).value
+        for colonne, valeur in egalites.items():
+            code = self.categories[colonne].get(valeur)
+            if code is None:
+                return np.zeros(len(numeros), dtype=bool)
+            masque &= self.codes[colonne][numeros] == code
+        return masque
+
+    def total(self, date_debut: Optional[str], date_fin: Optional[str], egalites: Dict[str, str]) -> int:
+        """Nombre de lignes satisfaisant les filtres (mémorisé par combinaison de filtres)"""
+        if not (date_debut or date_fin or egalites):
+            return self.nb_lignes
+        cle = (date_debut, date_fin, tuple(sorted(egalites.items())))
+        with self._verrou:
+            if cle in self._totaux:
+                self._totaux.move_to_end(cle)
+                return self._totaux[cle]
+        total = int(self.masque(np.arange(self.nb_lignes), date_debut, date_fin, egalites).sum())
+        with self._verrou:
+            self._totaux[cle] = total
+            while len(self._totaux) > MAX_TOTAUX:
+                self._totaux.popitem(last=False)
+        return total
+
+    def page(
+        self,
+        tri: str,
+        ordre: str,
+        limite: int,
+        apres: Optional[Tuple[float, int]] = None,
+        offset: int = 0,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
+        egalites: Optional[Dict[str, str]] = None
+    ) -> Tuple[np.ndarray, Optional[Tuple[float, int]]]:
+        """
+        Numéros des lignes d'une page
+
+        Args:
+            apres: (valeur de tri, numéro) de la dernière ligne de la page précédente
+            offset: Nombre de lignes filtrées à sauter (si pas de curseur)
+
+        Returns:
+            tuple: (numéros de ligne de la page, position de la dernière ligne
+                pour le curseur suivant, None s'il n'y a plus de lignes)
+        """
+        egalites = egalites or {}
+        filtre = bool(date_debut or date_fin or egalites)
+        numeros, cles = self.ordre(tri, ordre)
+        signe = -1.0 if ordre == "desc" else 1.0
+
+        if apres is not None:
+            # Première ligne strictement après (valeur, numéro) dans l'ordre (clé, numéro)
+            cle, numero = apres[0] * signe, apres[1]
+            debut = int(np.searchsorted(cles, cle, side='left'))
+            fin_egales = int(np.searchsorted(cles, cle, side='right'))
+            egales = numeros[debut:fin_egales]
+            position = debut + int(np.searchsorted(egales, numero, side='right'))
+        elif filtre and offset:
+            # Compatibilité : sauter `offset` lignes filtrées (coût proportionnel à offset)
+            correspondances = np.flatnonzero(self.masque(numeros, date_debut, date_fin, egalites))
+            position = int(correspondances[offset]) if offset < len(correspondances) else self.nb_lignes
+        else:
+            position = offset
+
+        # Parcours par tranches croissantes jusqu'à avoir `limite` lignes filtrées
+        retenus: List[np.ndarray] = []
+        nb_retenus = 0
+        tranche = max(limite, 256)
+        while position < self.nb_lignes and nb_retenus < limite:
+            candidats = numeros[position:position + tranche]
+            if filtre:
+                candidats = candidats[self.masque(candidats, date_debut, date_fin, egalites)]
+            candidats = candidats[:limite - nb_retenus]
+            retenus.append(candidats)
+            nb_retenus += len(candidats)
+            position += tranche
+            tranche *= 2
+
+        page = np.concatenate(retenus) if retenus else np.array([], dtype=np.int64)
+        if len(page) < limite:
+            return page, None
+        dernier = int(page[-1])
+        return page, (float(self.valeurs[tri][dernier]), dernier)
+
+    def lire(self, numeros: np.ndarray, colonnes: Optional[List[str]] = None) -> pd.DataFrame:
+        """Lignes pour des numéros de ligne (ordre conservé), réduites aux colonnes demandées"""
+        if len(numeros) == 0:
+            vide = self.stockage.schema_vide()
+            return vide[colonnes] if colonnes else vide
+        indices = np.searchsorted(self.debuts_partitions, numeros, side='right') - 1
+        blocs, ordre_blocs = [], []
+        for indice in np.unique(indices):
+            selection = np.flatnonzero(indices == indice)
+            partition = self.stockage.partitions[indice]
+            lignes = self.stockage.lire_lignes(partition, numeros[selection] - self.debuts_partitions[indice])
+            blocs.append(lignes[colonnes] if colonnes else lignes)
+            ordre_blocs.append(selection)
+        df = pd.concat(blocs, ignore_index=True) if len(blocs) > 1 else blocs[0].reset_index(drop=True)
+        # Remise dans l'ordre de la page
+        return df.iloc[np.argsort(np.concatenate(ordre_blocs), kind='stable')].reset_index(drop=True)
+
+
+# Index par version du dataset (construits à la première requête)
+_index: "OrderedDict[int, IndexCommandes]" = OrderedDict()
+_verrou_index = threading.Lock()
+
+
+def index_pour(version: int, stockage: StockagePartitionne) -> IndexCommandes:
+    """Index de la version demandée (les deux versions les plus récentes sont gardées)"""
+    with _verrou_index:
+        if version not in _index:
+            _index[version] = IndexCommandes(stockage)
+            while len(_index) > 2:
+                _index.popitem(last=False)
+        return _index[version]
+
+
+def memoire_index() -> Dict[int, int]:
+    """Mémoire (octets) de l'index de chaque version gardée"""
+    with _verrou_index:
+        index = dict(_index)
+    return {version: index_version.octets() for version, index_version in index.items()}
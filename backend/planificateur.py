@@ -0,0 +1,210 @@
+"""
+Planificateur des artefacts matérialisés
+🏗️ Les tables dérivées (cumuls par client, par période, classements...) et le
+   préchauffage du cache sont construits en arrière-plan, hors des requêtes
+🔁 Politique de rafraîchissement par artefact : à chaque nouvelle version des
+   données, à intervalle régulier, ou seulement à la demande
+📋 État de chaque artefact (dernière construction, durée, retard) pour l'administration
+"""
+
+from typing import Callable, Dict, Any, List, Optional
+import logging
+import threading
+import time
+
+from versions import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Politiques de rafraîchissement
+A_CHAQUE_VERSION = "version"      # reconstruit dès qu'une nouvelle version est publiée
+A_INTERVALLE = "intervalle"       # idem, et en plus toutes les intervalle_s secondes
+A_LA_DEMANDE = "demande"          # construit uniquement sur demande (endpoint d'administration)
+POLITIQUES = (A_CHAQUE_VERSION, A_INTERVALLE, A_LA_DEMANDE)
+
+
+class Artefact:
+    """
+    Un artefact matérialisé et l'historique de sa dernière construction
+
+    Attributes:
+        nom: Nom de l'artefact (clé dans Snapshot.materialises)
+        construire: Construit l'artefact pour une version ; la valeur retournée
+            (si elle n'est pas None) est rangée dans snap.materialises[nom]
+        politique: A_CHAQUE_VERSION, A_INTERVALLE ou A_LA_DEMANDE
+        intervalle_s: Période de reconstruction (politique A_INTERVALLE)
+        version: Version des données de la dernière construction réussie
+        version_tentee: Version des données de la dernière tentative (réussie ou non)
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        construire: Callable[[Snapshot], Any],
+        politique: str = A_CHAQUE_VERSION,
+        intervalle_s: Optional[float] = None
+    ):
+        if politique not in POLITIQUES:
+            raise ValueError(f"Politique inconnue : {politique}")
+        if politique == A_INTERVALLE and not intervalle_s:
+            raise ValueError("La politique 'intervalle' demande intervalle_s")
+        self.nom = nom
+        self.construire = construire
+        self.politique = politique
+        self.intervalle_s = intervalle_s
+        self.version: Optional[int] = None
+        self.version_tentee: Optional[int] = None
+        self.construit_le: Optional[float] = None
+        self.tente_le: Optional[float] = None
+        self.duree_s: Optional[float] = None
+        self.nb_constructions = 0
+        self.erreur: Optional[str] = None
+        self.en_cours = False
+        self.demande = False
+
+    def raison_construction(self, snap: Snapshot) -> Optional[str]:
+        """Pourquoi l'artefact doit être (re)construit pour cette version, None s'il est à jour"""
+        if self.demande:
+            return "demande"
+        if self.politique == A_LA_DEMANDE:
+            return None
+        if self.version_tentee != snap.version:
+            return "nouvelle version"
+        if self.politique == A_INTERVALLE and time.time() - self.tente_le >= self.intervalle_s:
+            return "intervalle"
+        return None
+
+    def etat(self, snap: Optional[Snapshot]) -> Dict[str, Any]:
+        """Statut, dernière construction et retard par rapport aux données courantes"""
+        if self.en_cours:
+            statut = "en cours"
+        elif self.erreur:
+            statut = "erreur"
+        elif self.version is None:
+            statut = "jamais construit"
+        elif snap is not None and self.version != snap.version:
+            statut = "obsolete"
+        else:
+            statut = "a jour"
+        return {
+            "politique": self.politique,
+            "intervalle_s": self.intervalle_s,
+            "statut": statut,
+            "version": self.version,
+            # Nombre de versions publiées depuis la dernière construction
+            "retard_versions": snap.version - self.version if snap is not None and self.version is not None else None,
+            "age_s": round(time.time() - self.construit_le, 1) if self.construit_le else None,
+            "derniere_duree_s": self.duree_s,
+            "nb_constructions": self.nb_constructions,
+            "erreur": self.erreur,
+            "demande_en_attente": self.demande
+        }
+
+
+class Planificateur:
+    """
+    Construit les artefacts en attente dans un thread unique, dans l'ordre
+    d'enregistrement (un artefact peut donc s'appuyer sur les précédents)
+
+    Le thread vérifie les artefacts toutes les periode_s secondes, ou
+    immédiatement après reveiller() (nouvelle version, demande).
+    """
+
+    def __init__(self, courant: Callable[[], Optional[Snapshot]], periode_s: float = 1.0):
+        """
+        Args:
+            courant: Retourne l'instantané courant (GestionnaireDataset.courant)
+            periode_s: Délai maximal entre deux vérifications
+        """
+        self.courant = courant
+        self.periode_s = periode_s
+        self.artefacts: Dict[str, Artefact] = {}
+        self._reveil = threading.Event()
+        # Une seule série de constructions à la fois (thread ou appel direct)
+        self._verrou = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def enregistrer(
+        self,
+        nom: str,
+        construire: Callable[[Snapshot], Any],
+        politique: str = A_CHAQUE_VERSION,
+        intervalle_s: Optional[float] = None
+    ) -> Artefact:
+        """Ajoute un artefact (construit à la prochaine vérification s'il n'est pas à la demande)"""
+        artefact = Artefact(nom, construire, politique, intervalle_s)
+        self.artefacts[nom] = artefact
+        return artefact
+
+    def reveiller(self) -> None:
+        """Déclenche une vérification immédiate (ex. après la publication d'une version)"""
+        self._reveil.set()
+
+    def demander(self, nom: str) -> None:
+        """
+        Demande la reconstruction d'un artefact, quelle que soit sa politique
+
+        Raises:
+            KeyError: Artefact inconnu
+        """
+        self.artefacts[nom].demande = True
+        self.reveiller()
+
+    def executer(self, snap: Snapshot) -> List[str]:
+        """
+        Construit, dans l'ordre, les artefacts en attente pour cette version
+
+        Returns:
+            list: Noms des artefacts construits avec succès
+        """
+        construits = []
+        with self._verrou:
+            for artefact in self.artefacts.values():
+                raison = artefact.raison_construction(snap)
+                if raison is not None and self._construire(artefact, snap, raison):
+                    construits.append(artefact.nom)
+        return construits
+
+    def _construire(self, artefact: Artefact, snap: Snapshot, raison: str) -> bool:
+        artefact.demande = False
+        artefact.en_cours = True
+        artefact.tente_le = time.time()
+        artefact.version_tentee = snap.version
+        debut = time.perf_counter()
+        try:
+            valeur = artefact.construire(snap)
+            if valeur is not None:
+                snap.ajouter_materialise(artefact.nom, valeur)
+        except Exception as e:
+            # Nouvelle tentative à la prochaine version, au prochain intervalle ou sur demande
+            artefact.erreur = str(e)
+            logger.error(f"❌ Construction de '{artefact.nom}' impossible (version {snap.version}) : {e}")
+            return False
+        finally:
+            artefact.en_cours = False
+            artefact.duree_s = round(time.perf_counter() - debut, 3)
+        artefact.version = snap.version
+        artefact.construit_le = time.time()
+        artefact.nb_constructions += 1
+        artefact.erreur = None
+        logger.info(f"🏗️ '{artefact.nom}' construit en {artefact.duree_s}s ({raison}, version {snap.version})")
+        return True
+
+    def demarrer(self) -> None:
+        """Lance le thread de construction (une seule fois par processus)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._boucle, name="planificateur", daemon=True)
+        self._thread.start()
+
+    def _boucle(self) -> None:
+        while True:
+            self._reveil.wait(self.periode_s)
+            self._reveil.clear()
+            snap = self.courant()
+            if snap is not None:
+                self.executer(snap)
+
+    def etat(self) -> Dict[str, Any]:
+        snap = self.courant()
+        return {nom: artefact.etat(snap) for nom, artefact in self.artefacts.items()}
@@ -0,0 +1,135 @@
+"""
+Préchauffage du cache des réponses
+🔥 Après le chargement, toutes les requêtes que les dashboards peuvent envoyer
+   (combinaisons de filtres, périodes prédéfinies du dashboard CEO, tables)
+   sont calculées à l'avance : le premier utilisateur ne paie aucun calcul
+🧵 Parallélisme borné, pour laisser de la place aux vraies requêtes
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Callable, Dict, Any, List, Tuple, Optional
+import logging
+import time
+
+import kpi
+from versions import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Périodes prédéfinies du dashboard CEO : nombre de jours avant la dernière date
+PERIODES_CEO = {
+    "Dernière année complète": 365,
+    "6 derniers mois": 180,
+    "Trimestre actuel": 90,
+    "Mois actuel": 30,
+}
+
+# Paramètres des tables demandées par les dashboards (et valeurs par défaut de l'API)
+LIMITES_TOP_PRODUITS = (5, 8, 10)
+TRIS_TOP_PRODUITS = ("ca", "profit", "quantite")
+LIMITES_CLIENTS = (5, 10)
+PERIODES_TEMPOREL = ("jour", "mois", "annee")
+FORMATS_TABLES = ("lignes", "colonnes")
+
+# Requête à préchauffer : (fonction de calcul, paramètres de l'endpoint, format de sortie)
+Requete = Tuple[Callable, Dict[str, Any], str]
+
+
+def periodes(plage_dates: Dict[str, Optional[str]]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Périodes (date_debut, date_fin) envoyées par les dashboards : aucune, toute la
+    plage du dataset, puis chaque période prédéfinie du dashboard CEO
+    """
+    resultat = [(None, None)]
+    if plage_dates.get("min") and plage_dates.get("max"):
+        date_max = datetime.strptime(plage_dates["max"], "%Y-%m-%d")
+        resultat.append((plage_dates["min"], plage_dates["max"]))
+        for jours in PERIODES_CEO.values():
+            resultat.append(((date_max - timedelta(days=jours)).strftime("%Y-%m-%d"), plage_dates["max"]))
+    return resultat
+
+
+def requetes_dashboards(snap: Snapshot) -> List[Requete]:
+    """
+    Énumère les requêtes à préchauffer à partir des valeurs des filtres
+    (mêmes données que /filters/valeurs)
+
+    Les paramètres sont ceux que chaque endpoint transmet au calcul, pour que
+    les clés (kpi.cle_calcul) soient identiques à celles des vraies requêtes.
+    """
+    valeurs = kpi.calcul_valeurs_filtres(snap)
+    requetes: List[Requete] = [(kpi.calcul_valeurs_filtres, {}, "lignes")]
+
+    # KPI globaux : catégorie × région × segment (avec "Toutes"/"Tous") × période
+    for (date_debut, date_fin), categorie, region, segment in product(
+        periodes(valeurs["plage_dates"]),
+        ["Toutes"] + valeurs["categories"],
+        ["Toutes"] + valeurs["regions"],
+        ["Tous"] + valeurs["segments"],
+    ):
+        requetes.append((kpi.calcul_kpi_globaux, {
+            "date_debut": date_debut, "date_fin": date_fin,
+            "categorie": categorie, "region": region, "segment": segment
+        }, "lignes"))
+
+    # Tables (sans filtre) dans les deux formats JSON
+    for format_sortie in FORMATS_TABLES:
+        requetes.append((kpi.calcul_categories, {}, format_sortie))
+        requetes.append((kpi.calcul_geographique, {}, format_sortie))
+        for periode in PERIODES_TEMPOREL:
+            requetes.append((kpi.calcul_temporel, {"periode": periode}, format_sortie))
+        for limite in LIMITES_CLIENTS:
+            requetes.append((kpi.calcul_clients, {"limite": limite}, format_sortie))
+        for limite, tri_par in product(LIMITES_TOP_PRODUITS, TRIS_TOP_PRODUITS):
+            requetes.append((kpi.calcul_top_produits, {"limite": limite, "tri_par": tri_par}, format_sortie))
+    return requetes
+
+
+class Prechauffage:
+    """
+    Exécute le préchauffage d'une version et expose son avancement
+
+    Attributes:
+        etat: Étape, version, requêtes faites / total, erreurs et durée (affiché par /ready)
+    """
+
+    def __init__(self, nb_threads: int):
+        self.nb_threads = nb_threads
+        self.etat: Dict[str, Any] = {
+            "etape": "en attente",
+            "version": None,
+            "faites": 0,
+            "total": 0,
+            "erreurs": 0,
+            "duree_s": None
+        }
+
+    def executer(self, snap: Snapshot, calculer: Callable[[Callable, Dict[str, Any], str], None]) -> None:
+        """
+        Calcule toutes les requêtes des dashboards pour une version
+
+        Args:
+            calculer: Calcule une requête (fonction, paramètres, format) et
+                range la réponse dans le cache
+        """
+        debut = time.perf_counter()
+        requetes = requetes_dashboards(snap)
+        self.etat.update(etape="en cours", version=snap.version, faites=0, total=len(requetes),
+                         erreurs=0, duree_s=None)
+        logger.info(f"🔥 Préchauffage de {len(requetes)} requêtes (version {snap.version}, {self.nb_threads} threads)")
+
+        palier = max(1, len(requetes) // 10)
+        with ThreadPoolExecutor(max_workers=self.nb_threads, thread_name_prefix="prechauffage") as pool:
+            futures = [pool.submit(calculer, *requete) for requete in requetes]
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    self.etat["erreurs"] += 1
+                    logger.warning(f"⚠️ Préchauffage : {future.exception()}")
+                self.etat["faites"] += 1
+                if self.etat["faites"] % palier == 0:
+                    logger.info(f"🔥 Préchauffage : {self.etat['faites']}/{len(requetes)}")
+
+        self.etat.update(etape="termine", duree_s=round(time.perf_counter() - debut, 3))
+        logger.info(f"✅ Préchauffage terminé : {len(requetes)} requêtes en {self.etat['duree_s']}s")
@@ -0,0 +1,96 @@
+"""
+Profilage d'un calcul par échantillonnage
+🔬 La pile d'appels du thread de calcul est relevée à intervalle régulier
+   par un second thread : le code mesuré n'est pas instrumenté
+🔥 Résultat au format « piles repliées » (une ligne par pile + nombre
+   d'échantillons), lu par flamegraph.pl, speedscope ou inferno
+🔁 Un calcul trop court pour être échantillonné est relancé jusqu'à avoir
+   assez de relevés (voir Echantillonneur.completer)
+🪶 Rien n'est lancé hors profilage
+"""
+
+from collections import Counter
+from typing import Any, Callable, Optional
+import os
+import sys
+import threading
+import time
+
+# Intervalle entre deux relevés de pile (secondes)
+INTERVALLE_ECHANTILLONNAGE_S = 0.001
+
+# Relevés visés pour un calcul court, et temps maximal passé à le relancer
+NB_MIN_ECHANTILLONS = 50
+DUREE_MAX_REPETITIONS_S = 1.0
+
+
+def _nom_cadre(cadre) -> str:
+    code = cadre.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Echantillonneur:
+    """
+    Relève la pile du thread qui entre dans le bloc `with`, jusqu'à sa sortie
+
+    Usage :
+        with Echantillonneur() as echantillonneur:
+            calcul()
+        texte = echantillonneur.piles_repliees()
+    """
+
+    def __init__(self, intervalle_s: float = INTERVALLE_ECHANTILLONNAGE_S):
+        self.intervalle_s = intervalle_s
+        self.piles: Counter = Counter()
+        self._cible: Optional[int] = None
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.nb_echantillons = 0
+        self.nb_repetitions = 0
+
+    def __enter__(self) -> "Echantillonneur":
+        self._cible = threading.get_ident()
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._echantillonner, name="profilage", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._arret.set()
+        self._thread.join()
+
+    def _echantillonner(self) -> None:
+        while not self._arret.wait(self.intervalle_s):
+            cadre = sys._current_frames().get(self._cible)
+            pile = []
+            while cadre is not None:
+                pile.append(_nom_cadre(cadre))
+                cadre = cadre.f_back
+            if pile:
+                # De la racine vers l'appel le plus profond
+                self.piles[";".join(reversed(pile))] += 1
+                self.nb_echantillons += 1
+
+    def completer(
+        self,
+        calcul: Callable[[], Any],
+        nb_min: int = NB_MIN_ECHANTILLONS,
+        duree_max_s: float = DUREE_MAX_REPETITIONS_S
+    ) -> None:
+        """
+        Relance calcul sous échantillonnage tant qu'il y a moins de nb_min relevés
+        (au plus duree_max_s) : un calcul plus rapide que l'intervalle entre deux
+        relevés donnerait sinon un fichier vide. Les piles des relances s'ajoutent
+        à celles du premier calcul (nb_repetitions les compte).
+        """
+        if self.nb_echantillons >= nb_min:
+            return
+        fin = time.perf_counter() + duree_max_s
+        with self:
+            while self.nb_echantillons < nb_min and time.perf_counter() < fin:
+                calcul()
+                self.nb_repetitions += 1
+
+    def piles_repliees(self) -> str:
+        """Piles échantillonnées au format replié (« racine;...;fonction nombre »)"""
+        return "".join(f"{pile} {nombre}\n" for pile, nombre in self.piles.most_common())
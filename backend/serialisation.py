@@ -0,0 +1,105 @@
+"""
+Sérialisation rapide des réponses
+⚡ orjson : NaN -> null, dates et scalaires NumPy gérés nativement
+📋 Tables en lignes ({col: val} par ligne) ou en colonnes ({col: [valeurs]}),
+   construites colonne par colonne (ni to_dict('records') ni iterrows)
+🏹 Tables en Apache Arrow (format IPC "stream") pour les clients qui le demandent
+"""
+
+from typing import List, Dict, Any
+import orjson
+import pandas as pd
+import pyarrow as pa
+
+# Scalaires/tableaux NumPy acceptés tels quels, clés non-texte converties
+OPTIONS_JSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Formats de sortie des tables et types MIME correspondants
+FORMATS = ("lignes", "colonnes", "arrow")
+MEDIA_JSON = "application/json"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+
+
+class FormatNonDisponible(Exception):
+    """La réponse ne peut pas être produite dans le format demandé"""
+
+
+def serialiser(contenu: Any) -> bytes:
+    """Encode une réponse en JSON (octets UTF-8)"""
+    return orjson.dumps(contenu, option=OPTIONS_JSON)
+
+
+def valeurs_colonne(serie: pd.Series) -> list:
+    """
+    Valeurs d'une colonne en objets Python directement sérialisables
+
+    Les dates deviennent des datetime.date (écrites "YYYY-MM-DD" par orjson),
+    les valeurs manquantes None ou NaN (écrites null).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return serie.dt.date.astype(object).where(serie.notna(), None).tolist()
+    if pd.api.types.is_extension_array_dtype(serie.dtype) and serie.hasnans:
+        # Entiers "nullables" (ex. colonne optionnelle absente d'un lot ingéré) : pd.NA -> None
+        return serie.astype(object).where(serie.notna(), None).tolist()
+    return serie.tolist()
+
+
+def enregistrements(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Équivalent rapide de df.to_dict('records')
+
+    Chaque colonne est convertie en une fois (tolist vectoriel), puis les
+    lignes sont assemblées par zip : aucune conversion valeur par valeur.
+    """
+    noms = [str(nom) for nom in df.columns]
+    colonnes = [valeurs_colonne(df[nom]) for nom in df.columns]
+    return [dict(zip(noms, ligne)) for ligne in zip(*colonnes)]
+
+
+def colonnes(df: pd.DataFrame) -> Dict[str, list]:
+    """Table au format colonnes : {colonne: [valeurs]} (clés écrites une seule fois)"""
+    return {str(nom): valeurs_colonne(df[nom]) for nom in df.columns}
+
+
+def mettre_en_forme(resultat: Any, format_sortie: str = "lignes") -> Any:
+    """
+    Convertit les DataFrame d'un résultat (éventuellement imbriqués dans un
+    dictionnaire) en lignes ou en colonnes ; le reste est laissé tel quel
+    """
+    if isinstance(resultat, pd.DataFrame):
+        return colonnes(resultat) if format_sortie == "colonnes" else enregistrements(resultat)
+    if isinstance(resultat, dict):
+        return {cle: mettre_en_forme(valeur, format_sortie) for cle, valeur in resultat.items()}
+    return resultat
+
+
+def serialiser_arrow(resultat: Any) -> bytes:
+    """
+    Encode la table d'un résultat en Arrow IPC (stream)
+
+    Pour une réponse {champ: valeur, ..., table: DataFrame}, les champs hors
+    table sont encodés en JSON dans les métadonnées du schéma (clé "reponse").
+
+    Raises:
+        FormatNonDisponible: Le résultat ne contient pas exactement une table
+    """
+    metadonnees = {}
+    if isinstance(resultat, pd.DataFrame):
+        df = resultat
+    else:
+        tables = [cle for cle, valeur in resultat.items() if isinstance(valeur, pd.DataFrame)] \
+            if isinstance(resultat, dict) else []
+        if len(tables) != 1:
+            raise FormatNonDisponible("Arrow n'est disponible que pour les réponses contenant une seule table")
+        df = resultat[tables[0]]
+        autres = {cle: valeur for cle, valeur in resultat.items() if cle != tables[0]}
+        metadonnees[b"reponse"] = serialiser({"table": tables[0], **autres})
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadonnees:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadonnees})
+
+    puits = pa.BufferOutputStream()
+    with pa.ipc.new_stream(puits, table.schema) as ecrivain:
+        ecrivain.write_table(table)
+    return puits.getvalue().to_pybytes()
@@ -0,0 +1,63 @@
+"""
+Lancement de l'API en production (plusieurs workers)
+🏭 Gunicorn + workers Uvicorn, application préchargée dans le processus parent
+🧠 Le dataset est chargé une seule fois puis partagé en copy-on-write par les workers
+⚠️ Mode en lecture seule, sur demande : le port n'est ouvert qu'une fois les
+   données chargées, et l'ingestion, le rechargement à chaud et le dossier de
+   dépôt sont désactivés (chaque worker a sa copie des données). Par défaut,
+   l'API tourne avec un seul worker Uvicorn (voir Dockerfile)
+
+Usage :
+    python serveur.py --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+class ServeurProduction(BaseApplication):
+    """Application Gunicorn qui importe main.py avant de forker les workers"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for cle, valeur in self.options.items():
+            self.cfg.set(cle, valeur)
+
+    def load(self):
+        # Chargement synchrone du dataset à l'import (voir PRECHARGEMENT dans main.py)
+        os.environ["PRECHARGEMENT"] = "1"
+        os.environ["NB_WORKERS"] = str(self.options["workers"])
+        import main
+
+        # Les objets déjà chargés sont exclus du ramasse-miettes : celui-ci ne
+        # réécrit donc plus leurs en-têtes, et les pages restent partagées après le fork
+        gc.freeze()
+        return main.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API Superstore BI en mode production")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("NB_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--timeout", type=int, default=120, help="Délai max d'une requête (s)")
+    args = parser.parse_args()
+
+    print(f"🚀 Démarrage de l'API Superstore BI ({args.workers} workers) sur http://{args.host}:{args.port}")
+    ServeurProduction({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Stockage partitionné du dataset Superstore
+📁 Une partition Parquet par mois de commande (annee=YYYY/mois=MM)
+✂️ Les filtres de dates éliminent les partitions avant toute lecture disque
+🗺️ Des zone maps (min/max/valeurs distinctes par groupe de lignes) évitent
+   de parcourir les blocs qui ne peuvent pas correspondre aux filtres
+"""
+
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Iterator
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nom du fichier décrivant les partitions présentes sur disque
+NOM_MANIFESTE = "manifeste.json"
+
+# Colonnes pour lesquelles on calcule des zone maps
+COLONNES_ZONES = ['Order Date', 'Region', 'Category', 'Segment', 'State']
+
+# Au-delà de ce nombre de valeurs distinctes, seuls min/max sont conservés
+MAX_VALEURS_DISTINCTES = 64
+
+
+# === ZONE MAPS ===
+
+def calculer_zones(bloc: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcule les statistiques d'un groupe de lignes : min, max et,
+    pour les colonnes peu variées, l'ensemble des valeurs distinctes
+
+    Args:
+        bloc: Groupe de lignes
+
+    Returns:
+        dict: {colonne: {"min": ..., "max": ..., "valeurs": [...] ou None}}
+    """
+    zones = {}
+    for colonne in COLONNES_ZONES:
+        serie = bloc[colonne]
+        if colonne == 'Order Date':
+            zones[colonne] = {
+                "min": serie.min().strftime('%Y-%m-%d'),
+                "max": serie.max().strftime('%Y-%m-%d'),
+                "valeurs": None
+            }
+            continue
+        valeurs = sorted(serie.dropna().astype(str).unique().tolist())
+        zones[colonne] = {
+            "min": valeurs[0] if valeurs else None,
+            "max": valeurs[-1] if valeurs else None,
+            "valeurs": valeurs if len(valeurs) <= MAX_VALEURS_DISTINCTES else None
+        }
+    return zones
+
+
+def zone_compatible(
+    zones: Dict[str, Dict[str, Any]],
+    debut: Optional[pd.Timestamp],
+    fin: Optional[pd.Timestamp],
+    egalites: Dict[str, str]
+) -> bool:
+    """
+    Indique si un groupe de lignes PEUT contenir des lignes satisfaisant les filtres
+    (False = le groupe est ignoré sans être lu ni parcouru)
+    """
+    dates = zones['Order Date']
+    if debut is not None and pd.Timestamp(dates['max']) < debut:
+        return False
+    if fin is not None and pd.Timestamp(dates['min']) > fin:
+        return False
+    for colonne, valeur in egalites.items():
+        zone = zones.get(colonne)
+        if zone is None or zone['min'] is None:
+            continue
+        if valeur < zone['min'] or valeur > zone['max']:
+            return False
+        if zone['valeurs'] is not None and valeur not in zone['valeurs']:
+            return False
+    return True
+
+
+class CacheLRU:
+    """
+    Cache LRU des partitions lues, borné par un budget mémoire (en octets)
+    Seules les partitions "chaudes" restent résidentes
+    """
+
+    def __init__(self, budget_octets: int):
+        self.budget_octets = budget_octets
+        self.octets = 0
+        self._entrees: "OrderedDict[str, tuple]" = OrderedDict()
+        # Nombre de lectures réussies de chaque partition en cache
+        self._lectures: Dict[str, int] = {}
+        self._verrou = threading.Lock()
+        self.nb_succes = 0
+        self.nb_echecs = 0
+
+    def lire(self, cle: str) -> Optional[pd.DataFrame]:
+        """Retourne la partition en cache (et la marque comme récente) ou None"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.nb_echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._lectures[cle] = self._lectures.get(cle, 0) + 1
+            self.nb_succes += 1
+            return entree[0]
+
+    def ajouter(self, cle: str, df: pd.DataFrame) -> None:
+        """Ajoute une partition puis évince les moins récentes si le budget est dépassé"""
+        taille = int(df.memory_usage(deep=True).sum())
+        if taille > self.budget_octets:
+            # Une partition plus grosse que le budget n'est jamais conservée
+            return
+        with self._verrou:
+            if cle in self._entrees:
+                self.octets -= self._entrees.pop(cle)[1]
+            self._entrees[cle] = (df, taille)
+            self.octets += taille
+            while self.octets > self.budget_octets:
+                evincee, (_, taille_evincee) = self._entrees.popitem(last=False)
+                self.octets -= taille_evincee
+                self._lectures.pop(evincee, None)
+
+    def evincer(self, prefixe: str) -> None:
+        """Retire du cache les partitions dont le fichier est sous le répertoire donné"""
+        with self._verrou:
+            for cle in [c for c in self._entrees if c.startswith(prefixe)]:
+                self.octets -= self._entrees.pop(cle)[1]
+                self._lectures.pop(cle, None)
+
+    def vider(self) -> None:
+        """Vide complètement le cache"""
+        with self._verrou:
+            self._entrees.clear()
+            self._lectures.clear()
+            self.octets = 0
+
+    def principales(self, nombre: int = 10) -> List[Dict[str, Any]]:
+        """Partitions les plus lues, avec leur taille en mémoire"""
+        with self._verrou:
+            cles = sorted(self._entrees, key=lambda cle: self._lectures.get(cle, 0), reverse=True)[:nombre]
+            return [
+                {"cle": cle, "lectures": self._lectures.get(cle, 0), "octets": self._entrees[cle][1]}
+                for cle in cles
+            ]
+
+    def etat(self) -> dict:
+        total = self.nb_succes + self.nb_echecs
+        return {
+            "entrees": len(self._entrees),
+            "octets": self.octets,
+            "budget_octets": self.budget_octets,
+            "succes": self.nb_succes,
+            "echecs": self.nb_echecs,
+            "taux_succes": round(self.nb_succes / total, 4) if total else None
+        }
+
+
+class StockagePartitionne:
+    """
+    Dataset stocké sur disque en partitions année/mois (fichiers Parquet)
+
+    Les partitions sont lues à la demande : seules celles qui recoupent
+    la plage de dates demandée sont ouvertes, et les plus utilisées
+    restent en mémoire dans un cache LRU.
+    """
+
+    def __init__(
+        self,
+        repertoire: str,
+        budget_memoire_octets: int,
+        taille_groupe: int = 128,
+        cache: Optional[CacheLRU] = None
+    ):
+        self.repertoire = os.path.abspath(repertoire)
+        # Le cache peut être partagé entre plusieurs versions du dataset (budget global)
+        self.cache = cache or CacheLRU(budget_memoire_octets)
+        # Nombre maximal de lignes par groupe (= row group Parquet) couvert par une zone map
+        self.taille_groupe = taille_groupe
+        # Description des partitions : cle, fichier, nb_lignes, date_min, date_max, groupes
+        self.partitions: List[Dict[str, Any]] = []
+        # Partitions en cours d'écriture (écriture en flux)
+        self._ecrivains: Dict[str, pq.ParquetWriter] = {}
+        self._en_cours: Dict[str, Dict[str, Any]] = {}
+
+    # === ÉCRITURE ===
+
+    def ouvrir_ecriture(self, remplacer: bool = True) -> None:
+        """
+        Prépare l'écriture en flux (voir ajouter())
+
+        Args:
+            remplacer: True pour repartir d'un répertoire vide, False pour ajouter
+                de nouveaux fichiers à côté des partitions existantes
+        """
+        if remplacer:
+            if os.path.isdir(self.repertoire):
+                shutil.rmtree(self.repertoire)
+            self.cache.evincer(os.path.abspath(self.repertoire))
+            self.partitions = []
+        os.makedirs(self.repertoire, exist_ok=True)
+        self._ecrivains = {}
+        self._en_cours = {}
+
+    def ajouter(self, df: pd.DataFrame) -> None:
+        """
+        Ajoute un bloc de lignes aux partitions année/mois en cours d'écriture
+
+        Dans chaque bloc, les lignes sont regroupées par région, catégorie et
+        segment pour que les zone maps des groupes de lignes soient sélectives.
+        Chaque tranche de taille_groupe lignes devient un row group Parquet.
+
+        Args:
+            df: Bloc de lignes nettoyées (colonne 'Order Date' au format datetime)
+        """
+        dates = df['Order Date']
+        for (annee, mois), bloc in df.groupby([dates.dt.year, dates.dt.month], sort=True):
+            cle = f"{annee:04d}-{mois:02d}"
+            bloc = bloc.sort_values(['Region', 'Category', 'Segment', 'Order Date'], kind='stable')
+            partition = self._en_cours.get(cle)
+            if partition is None:
+                dossier = os.path.join(self.repertoire, f"annee={annee:04d}", f"mois={mois:02d}")
+                os.makedirs(dossier, exist_ok=True)
+                # Les fichiers existants ne sont jamais modifiés : un ajout crée un nouveau fichier
+                numero = len([f for f in os.listdir(dossier) if f.endswith(".parquet")])
+                partition = {
+                    "cle": cle,
+                    "fichier": os.path.join(dossier, f"part-{numero:05d}.parquet"),
+                    "nb_lignes": 0,
+                    "date_min": None,
+                    "date_max": None,
+                    "groupes": []
+                }
+                self._en_cours[cle] = partition
+
+            for debut in range(0, len(bloc), self.taille_groupe):
+                tranche = bloc.iloc[debut:debut + self.taille_groupe]
+                table = pa.Table.from_pandas(tranche, preserve_index=False)
+                ecrivain = self._ecrivains.get(cle)
+                if ecrivain is None:
+                    ecrivain = pq.ParquetWriter(partition['fichier'], table.schema)
+                    self._ecrivains[cle] = ecrivain
+                elif not table.schema.equals(ecrivain.schema):
+                    # Ex. : colonne entière dans un bloc, avec valeurs manquantes dans un autre
+                    table = table.cast(ecrivain.schema)
+                ecrivain.write_table(table)
+
+                zones = calculer_zones(tranche)
+                partition['groupes'].append({
+                    "debut": partition['nb_lignes'],
+                    "nb_lignes": len(tranche),
+                    "zones": zones
+                })
+                partition['nb_lignes'] += len(tranche)
+                dates_zone = zones['Order Date']
+                if partition['date_min'] is None or dates_zone['min'] < partition['date_min']:
+                    partition['date_min'] = dates_zone['min']
+                if partition['date_max'] is None or dates_zone['max'] > partition['date_max']:
+                    partition['date_max'] = dates_zone['max']
+
+    def fermer_ecriture(self) -> None:
+        """
+        Ferme les fichiers Parquet et publie le manifeste des partitions
+
+        La liste des partitions est remplacée en une seule affectation :
+        les lectures en cours continuent sur l'ancienne liste sans verrou.
+        """
+        for ecrivain in self._ecrivains.values():
+            ecrivain.close()
+        nouvelles = [self._en_cours[cle] for cle in sorted(self._en_cours)]
+        self.partitions = sorted(self.partitions + nouvelles, key=lambda p: p['cle'])
+        self._ecrivains, self._en_cours = {}, {}
+        with open(os.path.join(self.repertoire, NOM_MANIFESTE), "w") as f:
+            json.dump({"partitions": self.partitions}, f, indent=2)
+        logger.info(f"💾 {len(self.partitions)} partitions écrites dans {self.repertoire}")
+
+    # === LECTURE ===
+
+    def copie(self) -> "StockagePartitionne":
+        """
+        Copie partageant le répertoire et le cache mais avec sa propre liste de partitions :
+        les ajouts faits sur la copie (ingestion) n'affectent pas l'original
+        """
+        copie = StockagePartitionne(self.repertoire, self.cache.budget_octets, self.taille_groupe, self.cache)
+        copie.partitions = list(self.partitions)
+        return copie
+
+    def schema(self) -> Optional[pa.Schema]:
+        """Schéma Arrow du dataset (lu dans le fichier Parquet, sans charger de données), None s'il est vide"""
+        if not self.partitions:
+            return None
+        return pq.read_schema(self.partitions[0]['fichier'])
+
+    def colonnes(self) -> List[str]:
+        """Colonnes du dataset (lues dans le schéma Parquet, sans charger de données)"""
+        schema = self.schema()
+        return schema.names if schema is not None else []
+
+    @property
+    def nb_lignes(self) -> int:
+        """Nombre total de lignes, sans lecture disque"""
+        return sum(p['nb_lignes'] for p in self.partitions)
+
+    @property
+    def date_min(self) -> Optional[str]:
+        return min((p['date_min'] for p in self.partitions), default=None)
+
+    @property
+    def date_max(self) -> Optional[str]:
+        return max((p['date_max'] for p in self.partitions), default=None)
+
+    def plan(
+        self,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
+        egalites: Optional[Dict[str, str]] = None
+    ) -> List[tuple]:
+        """
+        Plan de lecture : partitions retenues et, pour chacune, les groupes
+        de lignes dont les zone maps sont compatibles avec les filtres
+
+        Args:
+            date_debut: Date de début (YYYY-MM-DD)
+            date_fin: Date de fin (YYYY-MM-DD)
+            egalites: Filtres d'égalité {colonne: valeur}
+
+        Returns:
+            list: [(partition, [indices des groupes à lire]), ...]
+        """
+        debut = pd.Timestamp(date_debut) if date_debut else None
+        fin = pd.Timestamp(date_fin) if date_fin else None
+        egalites = egalites or {}
+        plan = []
+        for p in self.partitions:
+            # Élagage des partitions qui ne recoupent pas [date_debut, date_fin]
+            if debut is not None and pd.Timestamp(p['date_max']) < debut:
+                continue
+            if fin is not None and pd.Timestamp(p['date_min']) > fin:
+                continue
+            groupes = [
+                i for i, groupe in enumerate(p['groupes'])
+                if zone_compatible(groupe['zones'], debut, fin, egalites)
+            ]
+            if groupes:
+                plan.append((p, groupes))
+        return plan
+
+    def lire_lignes(self, partition: Dict[str, Any], positions: np.ndarray) -> pd.DataFrame:
+        """
+        Lit des lignes d'une partition par position (ordre conservé)
+
+        La partition entière est chargée dans le cache LRU : les pages suivantes
+        d'un même tri retombent le plus souvent sur des partitions déjà chaudes.
+        """
+        return self.lire_partition(partition).iloc[positions]
+
+    def lire_partition(self, partition: Dict[str, Any]) -> pd.DataFrame:
+        """Lit une partition (depuis le cache LRU si elle est chaude)"""
+        df = self.cache.lire(partition['fichier'])
+        if df is None:
+            df = pd.read_parquet(partition['fichier'])
+            self.cache.ajouter(partition['fichier'], df)
+        return df
+
+    def parcourir(
+        self,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
+        egalites: Optional[Dict[str, str]] = None,
+        colonnes: Optional[List[str]] = None,
+        taille_lot: int = 50000
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Parcourt les groupes de lignes retenus par le plan, par lots d'environ
+        taille_lot lignes : la mémoire utilisée ne dépend pas de la taille du dataset
+
+        Les partitions froides sont lues sans passer par le cache LRU (un export
+        complet n'évince donc pas les partitions chaudes).
+
+        Args:
+            colonnes: Colonnes à lire (toutes si None)
+
+        Yields:
+            pd.DataFrame: Lots de lignes (le filtre ligne à ligne reste à appliquer)
+        """
+        for partition, groupes in self.plan(date_debut, date_fin, egalites):
+            # Regroupement des row groups retenus en lots d'environ taille_lot lignes
+            lots, lot, nb_lignes = [], [], 0
+            for i in groupes:
+                lot.append(i)
+                nb_lignes += partition['groupes'][i]['nb_lignes']
+                if nb_lignes >= taille_lot:
+                    lots.append(lot)
+                    lot, nb_lignes = [], 0
+            if lot:
+                lots.append(lot)
+
+            df = self.cache.lire(partition['fichier'])
+            fichier = pq.ParquetFile(partition['fichier']) if df is None else None
+            for lot in lots:
+                if fichier is not None:
+                    yield fichier.read_row_groups(lot, columns=colonnes).to_pandas()
+                    continue
+                bloc = pd.concat([
+                    df.iloc[partition['groupes'][i]['debut']:partition['groupes'][i]['debut'] + partition['groupes'][i]['nb_lignes']]
+                    for i in lot
+                ], ignore_index=True)
+                yield bloc[colonnes] if colonnes else bloc
+
+    def schema_vide(self) -> pd.DataFrame:
+        """
+        DataFrame sans ligne ayant les colonnes et les types du dataset (ex. schéma
+        d'un export ou d'une page vide), lu dans le schéma Parquet sans charger de données
+        """
+        schema = self.schema()
+        if schema is None:
+            return pd.DataFrame()
+        return schema.empty_table().to_pandas()
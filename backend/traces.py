@@ -0,0 +1,253 @@
+"""
+Traces de bout en bout, des pages Streamlit jusqu'aux étapes des calculs
+🧵 Contexte reçu dans l'en-tête W3C traceparent (un identifiant de trace par
+   rendu de page, voir frontend/traces.py)
+⏱️ Span de chaque requête tracée et de chaque étape de son calcul (voir etapes.py)
+📁 Format OTLP/JSON, une ligne par lot dans un fichier qui reçoit aussi les
+   spans des dashboards : cascade complète d'un rendu, rejouable dans un
+   collecteur OpenTelemetry
+🪶 Écriture en arrière-plan et fichier à taille bornée (voir fichiers_jsonl.py) ;
+   les vues d'administration ne relisent que la fin du fichier
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import re
+import secrets
+import time
+
+from etapes import Etape
+from fichiers_jsonl import FichierJsonl
+
+# Types de span OTLP
+SPAN_INTERNE = 1
+SPAN_SERVEUR = 2
+SPAN_CLIENT = 3
+
+# Statut OTLP d'un span en erreur
+STATUT_ERREUR = 2
+
+# Octets relus au plus (fin du fichier) pour les vues d'administration
+MAX_OCTETS_LUS = 16 * 1024 * 1024
+
+# traceparent : version-trace_id-span_id-options (https://www.w3.org/TR/trace-context/)
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def lire_traceparent(valeur: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, span_id parent) de l'en-tête traceparent, None s'il est absent ou invalide"""
+    correspondance = _TRACEPARENT.match(valeur.strip().lower()) if valeur else None
+    if correspondance is None or set(correspondance.group(1)) == {"0"}:
+        return None
+    return correspondance.group(1), correspondance.group(2)
+
+
+def nouvel_id_span() -> str:
+    return secrets.token_hex(8)
+
+
+def _valeur_otlp(valeur: Any) -> Dict[str, Any]:
+    if isinstance(valeur, bool):
+        return {"boolValue": valeur}
+    if isinstance(valeur, int):
+        return {"intValue": str(valeur)}
+    if isinstance(valeur, float):
+        return {"doubleValue": valeur}
+    return {"stringValue": str(valeur)}
+
+
+def _valeur_lisible(valeur: Dict[str, Any]) -> Any:
+    if "intValue" in valeur:
+        return int(valeur["intValue"])
+    return next(iter(valeur.values()), None)
+
+
+def span(
+    trace_id: str,
+    span_id: str,
+    parent_id: Optional[str],
+    nom: str,
+    debut_ns: int,
+    fin_ns: int,
+    attributs: Optional[Dict[str, Any]] = None,
+    type_span: int = SPAN_INTERNE,
+    erreur: bool = False
+) -> Dict[str, Any]:
+    """Un span au format OTLP/JSON"""
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        **({"parentSpanId": parent_id} if parent_id else {}),
+        "name": nom,
+        "kind": type_span,
+        "startTimeUnixNano": str(debut_ns),
+        "endTimeUnixNano": str(fin_ns),
+        "attributes": [{"key": cle, "value": _valeur_otlp(valeur)} for cle, valeur in (attributs or {}).items()],
+        **({"status": {"code": STATUT_ERREUR}} if erreur else {})
+    }
+
+
+def spans_etapes(racine: Etape, trace_id: str, parent_id: str, nom: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Spans d'un calcul mesuré et de ses sous-étapes (instants perf_counter
+    convertis en heure Unix) ; nom remplace celui de la racine
+    """
+    decalage_ns = time.time_ns() - int(time.perf_counter() * 1e9)
+
+    def convertir(etape: Etape, parent: str, nom_span: str) -> Iterator[Dict[str, Any]]:
+        span_id = nouvel_id_span()
+        debut_ns = decalage_ns + int(etape.debut_s * 1e9)
+        yield span(trace_id, span_id, parent, nom_span, debut_ns, debut_ns + int(etape.duree_s * 1e9), etape.infos)
+        for enfant in etape.enfants:
+            yield from convertir(enfant, span_id, enfant.nom)
+
+    return list(convertir(racine, parent_id, nom or racine.nom))
+
+
+def lot_otlp(service: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Lot de spans d'un service (corps d'un export OTLP/HTTP JSON)"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+            "scopeSpans": [{"scope": {"name": service}, "spans": spans}]
+        }]
+    }
+
+
+_ID_TRACE = re.compile(r"^[0-9a-f]{32}$")
+_ID_SPAN = re.compile(r"^[0-9a-f]{16}$")
+
+
+def _attributs_valides(attributs: Any) -> bool:
+    return isinstance(attributs, list) and all(
+        isinstance(a, dict) and isinstance(a.get("key"), str) and isinstance(a.get("value"), dict)
+        for a in attributs
+    )
+
+
+def _span_valide(un_span: Any) -> bool:
+    if not isinstance(un_span, dict):
+        return False
+    if not _ID_TRACE.match(str(un_span.get("traceId"))) or not _ID_SPAN.match(str(un_span.get("spanId"))):
+        return False
+    parent = un_span.get("parentSpanId")
+    if parent and not _ID_SPAN.match(str(parent)):
+        return False
+    instants = (un_span.get("startTimeUnixNano"), un_span.get("endTimeUnixNano"))
+    if not all(isinstance(t, (str, int)) and str(t).isdigit() for t in instants):
+        return False
+    return _attributs_valides(un_span.get("attributes", []))
+
+
+def verifier_lot_otlp(lot: Any) -> None:
+    """
+    Vérifie la structure d'un lot reçu (ExportTraceServiceRequest en JSON) :
+    seuls des lots lisibles par les vues d'administration sont écrits
+
+    Raises:
+        ValueError: Lot mal formé (message pour l'appelant)
+    """
+    if not isinstance(lot, dict) or not isinstance(lot.get("resourceSpans"), list):
+        raise ValueError("Lot OTLP/JSON attendu (champ resourceSpans)")
+    for ressource in lot["resourceSpans"]:
+        if not isinstance(ressource, dict) or not isinstance(ressource.get("scopeSpans", []), list):
+            raise ValueError("resourceSpans : objets avec une liste scopeSpans attendus")
+        ressource_otlp = ressource.get("resource") or {}
+        if not isinstance(ressource_otlp, dict) or not _attributs_valides(ressource_otlp.get("attributes", [])):
+            raise ValueError("resource.attributes : liste de {key, value} attendue")
+        for portee in ressource.get("scopeSpans", []):
+            if not isinstance(portee, dict) or not isinstance(portee.get("spans", []), list):
+                raise ValueError("scopeSpans : objets avec une liste spans attendus")
+            if not all(_span_valide(un_span) for un_span in portee.get("spans", [])):
+                raise ValueError("Span invalide (traceId, spanId, startTimeUnixNano, endTimeUnixNano, attributes)")
+
+
+def _spans_du_lot(lot: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for ressource in lot.get("resourceSpans") or []:
+        attributs = (ressource.get("resource") or {}).get("attributes") or []
+        service = next(
+            (_valeur_lisible(a["value"]) for a in attributs if a.get("key") == "service.name"), "inconnu"
+        )
+        for portee in ressource.get("scopeSpans") or []:
+            for un_span in portee.get("spans") or []:
+                yield service, un_span
+
+
+class JournalTraces:
+    """
+    Fichier JSON lines de lots OTLP/JSON (tous services confondus)
+
+    Attributes:
+        fichier: Fichier écrit en arrière-plan, renommé en .1 au-delà de taille_max_octets
+        max_octets_lus: Octets relus au plus par les vues (les traces plus anciennes sont ignorées)
+    """
+
+    def __init__(self, fichier: str, taille_max_octets: int = 0, max_octets_lus: int = MAX_OCTETS_LUS):
+        self.fichier = FichierJsonl(fichier, taille_max_octets)
+        self.max_octets_lus = max_octets_lus
+
+    def ecrire(self, lot: Dict[str, Any]) -> None:
+        """Ajoute un lot (une ligne) au fichier, sans attendre l'écriture"""
+        self.fichier.ajouter(lot)
+
+    def _spans(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for lot in self.fichier.lire_fin(self.max_octets_lus):
+            if isinstance(lot, dict):
+                yield from _spans_du_lot(lot)
+
+    def cascade(self, trace_id: str) -> List[Dict[str, Any]]:
+        """
+        Spans d'une trace dans l'ordre chronologique, avec leur décalage depuis
+        le début de la trace et leur profondeur (vue en cascade)
+        """
+        spans = [(service, s) for service, s in self._spans() if s.get("traceId") == trace_id]
+        if not spans:
+            return []
+        debut_trace = min(int(s["startTimeUnixNano"]) for _, s in spans)
+        parents = {s["spanId"]: s.get("parentSpanId") for _, s in spans}
+
+        def profondeur(span_id: str) -> int:
+            niveau, parent = 0, parents.get(span_id)
+            while parent in parents and niveau < len(parents):
+                niveau, parent = niveau + 1, parents[parent]
+            return niveau
+
+        lignes = []
+        for service, s in sorted(spans, key=lambda e: int(e[1]["startTimeUnixNano"])):
+            debut, fin = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+            lignes.append({
+                "service": service,
+                "nom": s.get("name"),
+                "profondeur": profondeur(s["spanId"]),
+                "decalage_ms": round((debut - debut_trace) / 1e6, 3),
+                "duree_ms": round((fin - debut) / 1e6, 3),
+                "attributs": {a["key"]: _valeur_lisible(a["value"]) for a in s.get("attributes") or []},
+                "span_id": s["spanId"],
+                "parent_id": s.get("parentSpanId")
+            })
+        return lignes
+
+    def recentes(self, nombre: int) -> List[Dict[str, Any]]:
+        """Traces les plus récentes : span racine (rendu de page), durée et nombre de spans"""
+        traces: Dict[str, Dict[str, Any]] = {}
+        for service, s in self._spans():
+            trace = traces.setdefault(s["traceId"], {
+                "trace_id": s["traceId"], "racine": None, "debut_ns": None, "fin_ns": 0, "nb_spans": 0, "services": []
+            })
+            debut, fin = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+            if trace["debut_ns"] is None or debut < trace["debut_ns"]:
+                trace["debut_ns"] = debut
+            trace["fin_ns"] = max(trace["fin_ns"], fin)
+            trace["nb_spans"] += 1
+            if not s.get("parentSpanId"):
+                trace["racine"] = s.get("name")
+            if service not in trace["services"]:
+                trace["services"].append(service)
+        recentes = sorted(traces.values(), key=lambda t: t["debut_ns"], reverse=True)[:nombre]
+        return [{
+            "trace_id": t["trace_id"],
+            "racine": t["racine"],
+            "debut": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t["debut_ns"] / 1e9)),
+            "duree_ms": round((t["fin_ns"] - t["debut_ns"]) / 1e6, 3),
+            "nb_spans": t["nb_spans"],
+            "services": t["services"]
+        } for t in recentes]
@@ -0,0 +1,179 @@
+"""
+Gestion des versions du dataset
+📸 Chaque version est un instantané immuable (partitions + agrégats)
+🔄 La version suivante est construite à part puis publiée en une affectation atomique
+"""
+
+from datetime import datetime
+from typing import Callable, Optional, Dict, Any
+import os
+import shutil
+import threading
+import logging
+
+from stockage import StockagePartitionne
+from agregats import Agregats
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """
+    Instantané d'une version du dataset
+
+    Une requête récupère l'instantané courant une seule fois, au début du
+    traitement : elle termine donc sur cette version même si une nouvelle
+    version est publiée entre-temps.
+
+    Ses données (partitions, agrégats) ne changent plus après la publication ;
+    seules les tables dérivées s'ajoutent ensuite, par remplacement du
+    dictionnaire (voir ajouter_materialise).
+
+    Attributes:
+        version: Numéro de version (croissant)
+        stockage: Vue figée des partitions sur disque
+        agregats: Agrégats servant les KPI
+        cree_le: Date de publication
+        empreinte: Empreinte du contenu des données
+        materialises: Tables dérivées de cette version, construites en arrière-plan
+            (voir planificateur.py) ; vide à la publication, jamais modifié en place
+    """
+
+    def __init__(self, version: int, stockage: StockagePartitionne, agregats: Agregats):
+        self.version = version
+        self.stockage = stockage
+        self.agregats = agregats
+        self.cree_le = datetime.now()
+        self.materialises: Dict[str, Any] = {}
+        self._verrou = threading.Lock()
+
+    def ajouter_materialise(self, nom: str, valeur: Any) -> None:
+        """
+        Range une table dérivée dans une copie du dictionnaire, publiée en une
+        affectation : une requête ou /admin/memory qui parcourt materialises
+        au même moment garde l'ancien dictionnaire, intact
+        """
+        with self._verrou:
+            self.materialises = {**self.materialises, nom: valeur}
+
+    @property
+    def empreinte(self) -> str:
+        """Empreinte du contenu : deux versions de mêmes données ont la même (même après un redémarrage)"""
+        return self.agregats.empreinte
+
+
+class GestionnaireDataset:
+    """
+    Détient l'instantané courant et publie les nouvelles versions
+
+    Chaque reconstruction complète écrit dans son propre répertoire (v00001,
+    v00002, ...) ; le répertoire de la version précédente est conservé pour
+    les requêtes encore en cours, les plus anciens sont supprimés.
+    """
+
+    def __init__(self, repertoire: str, fabrique_stockage: Callable[[str], StockagePartitionne]):
+        self.repertoire = repertoire
+        self.fabrique_stockage = fabrique_stockage
+        self._courant: Optional[Snapshot] = None
+        self._verrou_publication = threading.Lock()
+        # Sérialise les écritures (reconstructions et ingestions) ; les lectures ne le prennent jamais
+        self.verrou_ecriture = threading.Lock()
+        # Une seule reconstruction complète à la fois
+        self._verrou_reconstruction = threading.Lock()
+
+    @property
+    def reconstruction_en_cours(self) -> bool:
+        return self._verrou_reconstruction.locked()
+
+    def courant(self) -> Optional[Snapshot]:
+        """Instantané courant (None tant qu'aucune version n'est publiée)"""
+        return self._courant
+
+    def publier(self, stockage: StockagePartitionne, agregats: Agregats) -> Snapshot:
+        """
+        Publie une nouvelle version
+
+        Args:
+            stockage: Partitions de la nouvelle version (une copie figée est conservée)
+            agregats: Agrégats de la nouvelle version
+
+        Returns:
+            Snapshot: Instantané publié
+        """
+        with self._verrou_publication:
+            precedent = self._courant
+            version = precedent.version + 1 if precedent else 1
+            snapshot = Snapshot(version, stockage.copie(), agregats)
+            self._courant = snapshot
+        logger.info(f"📸 Version {version} du dataset publiée")
+        self._nettoyer(snapshot, precedent)
+        return snapshot
+
+    def nouveau_stockage(self) -> StockagePartitionne:
+        """Stockage vide dans un nouveau répertoire de version"""
+        os.makedirs(self.repertoire, exist_ok=True)
+        numeros = [int(nom[1:]) for nom in os.listdir(self.repertoire) if nom.startswith("v") and nom[1:].isdigit()]
+        numero = max(numeros, default=0) + 1
+        return self.fabrique_stockage(os.path.join(self.repertoire, f"v{numero:05d}"))
+
+    def reconstruire(self, construire: Callable[[StockagePartitionne], Agregats]) -> Snapshot:
+        """
+        Construit une version complète puis la publie
+
+        Args:
+            construire: Remplit le stockage fourni et retourne les agrégats (ex. load_data)
+        """
+        with self._verrou_reconstruction:
+            return self._reconstruire(construire)
+
+    def _reconstruire(self, construire: Callable[[StockagePartitionne], Agregats]) -> Snapshot:
+        with self.verrou_ecriture:
+            stockage = self.nouveau_stockage()
+            agregats = construire(stockage)
+            return self.publier(stockage, agregats)
+
+    def reconstruire_en_arriere_plan(
+        self,
+        construire: Callable[[StockagePartitionne], Agregats],
+        ensuite: Optional[Callable[[Snapshot], None]] = None
+    ) -> bool:
+        """
+        Lance reconstruire() dans un thread ; les requêtes continuent d'être
+        servies par la version courante jusqu'à la publication
+
+        Args:
+            ensuite: Appelée dans le même thread avec la version publiée (ex. préchauffage)
+
+        Returns:
+            bool: False si une reconstruction est déjà en cours
+        """
+        if not self._verrou_reconstruction.acquire(blocking=False):
+            return False
+
+        def executer():
+            try:
+                snapshot = self._reconstruire(construire)
+            except Exception as e:
+                logger.error(f"❌ Échec de la reconstruction du dataset : {e}")
+                return
+            finally:
+                self._verrou_reconstruction.release()
+            if ensuite is not None:
+                try:
+                    ensuite(snapshot)
+                except Exception as e:
+                    logger.error(f"❌ Échec après la publication de la version {snapshot.version} : {e}")
+
+        threading.Thread(target=executer, name="reconstruction-dataset", daemon=True).start()
+        return True
+
+    def _nettoyer(self, courant: Snapshot, precedent: Optional[Snapshot]) -> None:
+        """Supprime les répertoires des versions plus anciennes que la précédente"""
+        a_garder = {os.path.abspath(courant.stockage.repertoire)}
+        if precedent is not None:
+            a_garder.add(os.path.abspath(precedent.stockage.repertoire))
+        for nom in os.listdir(self.repertoire):
+            chemin = os.path.abspath(os.path.join(self.repertoire, nom))
+            if nom.startswith("v") and os.path.isdir(chemin) and chemin not in a_garder:
+                shutil.rmtree(chemin, ignore_errors=True)
+                courant.stockage.cache.evincer(chemin)
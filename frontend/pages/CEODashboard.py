@@ -15,6 +15,9 @@ import time
 import os
 import numpy as np
 
+# Traces de bout en bout jusqu'à l'API (TRACES=1, voir traces.py)
+from traces import demarrer_rendu, tracer_appel, terminer_rendu
+
 # === CONFIGURATION PAGE ===
 st.set_page_config(
     page_title="🎯 CEO Dashboard - Superstore",
@@ -23,6 +26,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"  # Sidebar réduite pour focus sur les KPI
 )
 
+# Une trace par exécution de la page (chaque interaction relance le script)
+demarrer_rendu("CEODashboard")
+
 # === STYLES CSS EXÉCUTIFS ===
 st.markdown("""
 <style>
@@ -110,6 +116,17 @@ API_URL = os.getenv("API_URL", "http://localhost:8000")
 
 # === FONCTIONS HELPERS ===
 
+@st.cache_resource
+def reponses_connues() -> dict:
+    """
+    Dernière réponse reçue pour chaque appel, avec son ETag (partagée entre les sessions)
+    
+    Quand le cache de appeler_api expire, la requête part avec If-None-Match :
+    si les données n'ont pas changé, l'API répond 304 (sans recalcul ni contenu)
+    et la réponse déjà connue est réutilisée.
+    """
+    return {}
+
 @st.cache_data(ttl=300)  # Cache de 5 minutes
 def appeler_api(endpoint: str, params: dict = None):
     """
@@ -125,9 +142,24 @@ def appeler_api(endpoint: str, params: dict = None):
     """
     try:
         url = f"{API_URL}{endpoint}"
-        response = requests.get(url, params=params, timeout=10)
+        # Requête conditionnelle si une réponse de cet appel est déjà connue
+        cle = (endpoint, tuple(sorted((params or {}).items())))
+        connue = reponses_connues().get(cle)
+        entetes = {'If-None-Match': connue[0]} if connue else {}
+        with tracer_appel(endpoint, params) as appel:
+            response = requests.get(url, params=params, headers={**entetes, **appel.entetes}, timeout=10)
+            appel.statut = response.status_code
+        if response.status_code == 304:
+            return connue[1]  # Données inchangées côté API
+        if response.status_code == 503:
+            # L'API démarre : les données sont en cours de chargement
+            st.warning("⏳ **Chargement des données en cours côté API** — réessayez dans quelques secondes")
+            st.stop()
         response.raise_for_status()  # Lève une exception si erreur HTTP
-        return response.json()
+        donnees = response.json()
+        if 'ETag' in response.headers:
+            reponses_connues()[cle] = (response.headers['ETag'], donnees)
+        return donnees
     except requests.exceptions.ConnectionError:
         st.error("❌ **Impossible de se connecter à l'API**")
         st.info(f"💡 Vérifiez que l'API est démarrée sur: {API_URL}")
@@ -466,7 +498,7 @@ with col_left:
     
     # Évolution temporelle (par mois pour vision CEO)
     try:
-        temporal = appeler_api("/kpi/temporel", params={'periode': 'mois'})
+        temporal = appeler_api("/kpi/temporel", params={'periode': 'mois', 'format': 'colonnes'})
     except:
         st.error("❌ Impossible de charger les données temporelles")
         temporal = {'mois': [], 'ca': [], 'profit': []}
@@ -573,7 +605,7 @@ col_cat, col_reg = st.columns(2)
 with col_cat:
     st.markdown("#### 📦 Catégories")
     try:
-        categories = appeler_api("/kpi/categories")
+        categories = appeler_api("/kpi/categories", params={'format': 'colonnes'})
     except:
         st.error("❌ Impossible de charger les données de catégories")
         categories = []
@@ -623,7 +655,7 @@ with col_cat:
 with col_reg:
     st.markdown("#### 🌍 Régions")
     try:
-        geo = appeler_api("/kpi/geographique")
+        geo = appeler_api("/kpi/geographique", params={'format': 'colonnes'})
     except:
         st.error("❌ Impossible de charger les données géographiques")
         geo = {'regions': [], 'ca': [], 'profit': []}
@@ -667,7 +699,7 @@ col_client, col_product = st.columns(2)
 with col_client:
     st.markdown("#### 👑 Clients VIP (Top 5)")
     try:
-        clients_data = appeler_api("/kpi/clients", params={'limite': 5})
+        clients_data = appeler_api("/kpi/clients", params={'limite': 5, 'format': 'colonnes'})
     except:
         st.error("❌ Impossible de charger les données clients")
         clients_data = []
@@ -694,7 +726,7 @@ with col_client:
 with col_product:
     st.markdown("#### 🎯 Produits Star (Top 5)")
     try:
-        top_produits = appeler_api("/kpi/produits/top", params={'limite': 5, 'tri_par': 'profit'})
+        top_produits = appeler_api("/kpi/produits/top", params={'limite': 5, 'tri_par': 'profit', 'format': 'colonnes'})
     except:
         st.error("❌ Impossible de charger les top produits")
         top_produits = []
@@ -726,7 +758,7 @@ st.markdown("## 🎯 SYNTHÈSE STRATÉGIQUE")
 
 # === ANALYSE CLIENT STRATÉGIQUE ===
 try:
-    clients_data = appeler_api("/kpi/clients", params={'limite': 5})
+    clients_data = appeler_api("/kpi/clients", params={'limite': 5, 'format': 'colonnes'})
 except:
     st.error("❌ Impossible de charger les données clients pour la synthèse")
     clients_data = {'recurrence': {'clients_fideles': 0, 'total_clients': 0}}
@@ -804,7 +836,7 @@ with col_performance:
     st.markdown("### 📊 Indicateurs Clés")
     
     # Concentration client (part des top 5)
-    top_5_ca = sum(client['ca_total'] for client in clients_data['top_clients'])
+    top_5_ca = sum(clients_data['top_clients']['ca_total'])
     concentration = (top_5_ca / kpi_data['ca_total'] * 100) if kpi_data['ca_total'] > 0 else 0
     
     st.metric(
@@ -976,3 +1008,6 @@ st.markdown("""
     <p>🔒 Dashboard confidentiel • 📈 Données temps réel • 🎯 Vision stratégique</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Fin du rendu : envoi de ses spans (si les traces sont activées)
+terminer_rendu()
@@ -11,6 +11,9 @@ import pandas as pd
 from datetime import datetime, timedelta
 import os
 
+# Traces de bout en bout jusqu'à l'API (TRACES=1, voir traces.py)
+from traces import demarrer_rendu, tracer_appel, terminer_rendu
+
 st.set_page_config(
     page_title="Dashboard Commercial",
     page_icon="",
@@ -18,6 +21,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Une trace par exécution de la page (chaque interaction relance le script)
+demarrer_rendu("Dashboard-Commercial")
+
 # Couleurs du thème
 COLORS = {
     'primary': '#1E3A5F',      # Bleu marine
@@ -190,13 +196,39 @@ st.markdown(f"""
 
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 
+@st.cache_resource
+def reponses_connues() -> dict:
+    """
+    Dernière réponse reçue pour chaque appel, avec son ETag (partagée entre les sessions)
+    
+    Quand le cache de appeler_api expire, la requête part avec If-None-Match :
+    si les données n'ont pas changé, l'API répond 304 (sans recalcul ni contenu)
+    et la réponse déjà connue est réutilisée.
+    """
+    return {}
+
 @st.cache_data(ttl=300)
 def appeler_api(endpoint: str, params: dict = None):
     """Appel API avec gestion d'erreurs"""
     try:
-        response = requests.get(f"{API_URL}{endpoint}", params=params, timeout=10)
+        # Requête conditionnelle si une réponse de cet appel est déjà connue
+        cle = (endpoint, tuple(sorted((params or {}).items())))
+        connue = reponses_connues().get(cle)
+        entetes = {'If-None-Match': connue[0]} if connue else {}
+        with tracer_appel(endpoint, params) as appel:
+            response = requests.get(f"{API_URL}{endpoint}", params=params, headers={**entetes, **appel.entetes}, timeout=10)
+            appel.statut = response.status_code
+        if response.status_code == 304:
+            return connue[1]  # Données inchangées côté API
+        if response.status_code == 503:
+            # L'API démarre : les données sont en cours de chargement
+            st.warning("⏳ **Chargement des données en cours côté API** — réessayez dans quelques secondes")
+            st.stop()
         response.raise_for_status()
-        return response.json()
+        donnees = response.json()
+        if 'ETag' in response.headers:
+            reponses_connues()[cle] = (response.headers['ETag'], donnees)
+        return donnees
     except requests.exceptions.ConnectionError:
         st.error("🔌 **Connexion impossible** — Vérifiez que l'API est démarrée")
         st.stop()
@@ -383,7 +415,7 @@ col_left, col_right = st.columns([3, 2])
 with col_left:
     st.markdown('<p class="section-title">Évolution des Ventes</p>', unsafe_allow_html=True)
     
-    temporal = appeler_api("/kpi/temporel", params={'periode': 'mois'})
+    temporal = appeler_api("/kpi/temporel", params={'periode': 'mois', 'format': 'colonnes'})
     df_temporal = pd.DataFrame(temporal)
     
     fig_evolution = go.Figure()
@@ -434,7 +466,7 @@ with col_left:
 with col_right:
     st.markdown('<p class="section-title">Performance Régionale</p>', unsafe_allow_html=True)
     
-    geo = appeler_api("/kpi/geographique")
+    geo = appeler_api("/kpi/geographique", params={'format': 'colonnes'})
     df_geo = pd.DataFrame(geo)
     
     fig_geo = go.Figure()
@@ -481,7 +513,7 @@ col_produits, col_categories = st.columns([3, 2])
 with col_produits:
     st.markdown('<p class="section-title">Produits les Plus Vendus</p>', unsafe_allow_html=True)
     
-    top_produits = appeler_api("/kpi/produits/top", params={'limite': 8, 'tri_par': 'ca'})
+    top_produits = appeler_api("/kpi/produits/top", params={'limite': 8, 'tri_par': 'ca', 'format': 'colonnes'})
     df_produits = pd.DataFrame(top_produits)
     
     # Tronquer les noms trop longs
@@ -515,7 +547,7 @@ with col_produits:
 with col_categories:
     st.markdown('<p class="section-title">Répartition par Catégorie</p>', unsafe_allow_html=True)
     
-    categories = appeler_api("/kpi/categories")
+    categories = appeler_api("/kpi/categories", params={'format': 'colonnes'})
     df_cat = pd.DataFrame(categories)
     
     fig_cat = go.Figure()
@@ -558,7 +590,7 @@ st.markdown("<br>", unsafe_allow_html=True)
 
 st.markdown('<p class="section-title">Performance Clients</p>', unsafe_allow_html=True)
 
-clients_data = appeler_api("/kpi/clients", params={'limite': 5})
+clients_data = appeler_api("/kpi/clients", params={'limite': 5, 'format': 'colonnes'})
 
 col_c1, col_c2 = st.columns(2)
 
@@ -632,3 +664,6 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Fin du rendu : envoi de ses spans (si les traces sont activées)
+terminer_rendu()
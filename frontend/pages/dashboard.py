@@ -14,6 +14,9 @@ from datetime import datetime, timedelta
 import time
 import os
 
+# Traces de bout en bout jusqu'à l'API (TRACES=1, voir traces.py)
+from traces import demarrer_rendu, tracer_appel, terminer_rendu
+
 # === CONFIGURATION PAGE ===
 st.set_page_config(
     page_title="Superstore BI Dashboard",
@@ -22,6 +25,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Une trace par exécution de la page (chaque interaction relance le script)
+demarrer_rendu("dashboard")
+
 # === STYLES CSS PERSONNALISÉS ===
 st.markdown("""
 <style>
@@ -68,6 +74,17 @@ API_URL = os.getenv("API_URL", "http://localhost:8000")
 
 # === FONCTIONS HELPERS ===
 
+@st.cache_resource
+def reponses_connues() -> dict:
+    """
+    Dernière réponse reçue pour chaque appel, avec son ETag (partagée entre les sessions)
+    
+    Quand le cache de appeler_api expire, la requête part avec If-None-Match :
+    si les données n'ont pas changé, l'API répond 304 (sans recalcul ni contenu)
+    et la réponse déjà connue est réutilisée.
+    """
+    return {}
+
 @st.cache_data(ttl=300)  # Cache de 5 minutes
 def appeler_api(endpoint: str, params: dict = None):
     """
@@ -83,9 +100,24 @@ def appeler_api(endpoint: str, params: dict = None):
     """
     try:
         url = f"{API_URL}{endpoint}"
-        response = requests.get(url, params=params, timeout=10)
+        # Requête conditionnelle si une réponse de cet appel est déjà connue
+        cle = (endpoint, tuple(sorted((params or {}).items())))
+        connue = reponses_connues().get(cle)
+        entetes = {'If-None-Match': connue[0]} if connue else {}
+        with tracer_appel(endpoint, params) as appel:
+            response = requests.get(url, params=params, headers={**entetes, **appel.entetes}, timeout=10)
+            appel.statut = response.status_code
+        if response.status_code == 304:
+            return connue[1]  # Données inchangées côté API
+        if response.status_code == 503:
+            # L'API démarre : les données sont en cours de chargement
+            st.warning("⏳ **Chargement des données en cours côté API** — réessayez dans quelques secondes")
+            st.stop()
         response.raise_for_status()  # Lève une exception si erreur HTTP
-        return response.json()
+        donnees = response.json()
+        if 'ETag' in response.headers:
+            reponses_connues()[cle] = (response.headers['ETag'], donnees)
+        return donnees
     except requests.exceptions.ConnectionError:
         st.error("❌ **Impossible de se connecter à l'API**")
         st.info(f"💡 Vérifiez que l'API est démarrée sur: {API_URL}")
@@ -282,7 +314,7 @@ with tab1:
         nb_produits = st.number_input("Afficher", min_value=5, max_value=50, value=10, step=5)
     
     # Récupération des données
-    top_produits = appeler_api("/kpi/produits/top", params={'limite': nb_produits, 'tri_par': critere_tri})
+    top_produits = appeler_api("/kpi/produits/top", params={'limite': nb_produits, 'tri_par': critere_tri, 'format': 'colonnes'})
     df_produits = pd.DataFrame(top_produits)
     
     # Dictionnaire des labels pour le titre du graphique
@@ -335,7 +367,7 @@ with tab1:
 with tab2:
     st.subheader("Performance par Catégorie")
     
-    categories = appeler_api("/kpi/categories")
+    categories = appeler_api("/kpi/categories", params={'format': 'colonnes'})
     df_cat = pd.DataFrame(categories)
     
     # Graphiques côte à côte
@@ -412,7 +444,7 @@ with tab3:
         horizontal=True
     )
     
-    temporal = appeler_api("/kpi/temporel", params={'periode': granularite})
+    temporal = appeler_api("/kpi/temporel", params={'periode': granularite, 'format': 'colonnes'})
     df_temporal = pd.DataFrame(temporal)
     
     # Graphique d'évolution
@@ -479,7 +511,7 @@ with tab3:
 with tab4:
     st.subheader("Performance Géographique")
     
-    geo = appeler_api("/kpi/geographique")
+    geo = appeler_api("/kpi/geographique", params={'format': 'colonnes'})
     df_geo = pd.DataFrame(geo)
     
     col_geo1, col_geo2 = st.columns(2)
@@ -532,7 +564,7 @@ st.divider()
 # === SECTION 3 : ANALYSE CLIENTS ===
 st.header("👥 Analyse Clients")
 
-clients_data = appeler_api("/kpi/clients", params={'limite': 10})
+clients_data = appeler_api("/kpi/clients", params={'limite': 10, 'format': 'colonnes'})
 
 col_client1, col_client2 = st.columns([2, 1])
 
@@ -602,3 +634,6 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Fin du rendu : envoi de ses spans (si les traces sont activées)
+terminer_rendu()
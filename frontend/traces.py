@@ -0,0 +1,130 @@
+"""
+Traces des rendus de pages (suivi de bout en bout jusqu'à l'API)
+🧵 Un identifiant de trace par exécution de la page (chaque rerun Streamlit),
+   transmis à l'API dans l'en-tête W3C traceparent : ses étapes s'y rattachent
+⏱️ Un span par rendu et par appel à l'API, au format OTLP/JSON (le même que
+   backend/traces.py), envoyés à TRACES_URL à la fin du rendu
+🪶 Désactivé par défaut (TRACES=1 pour activer) : aucun coût sinon
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import os
+import secrets
+import time
+
+import requests
+import streamlit as st
+
+# Traces activées (1) et destination des spans (par défaut l'API, qui les range
+# avec les siens ; tout collecteur OTLP/HTTP JSON convient)
+TRACES = os.getenv("TRACES") == "1"
+TRACES_URL = os.getenv("TRACES_URL") or f"{os.getenv('API_URL', 'http://localhost:8000')}/v1/traces"
+# Jeton attendu par l'API pour recevoir les spans (TRACES_TOKEN, le même des deux côtés)
+TRACES_TOKEN = os.getenv("TRACES_TOKEN")
+
+# Types de span OTLP
+SPAN_INTERNE = 1
+SPAN_CLIENT = 3
+
+# Clé du rendu en cours dans st.session_state
+CLE_RENDU = "trace_rendu"
+
+
+class AppelTrace:
+    """
+    Appel à l'API en cours de traçage
+
+    Attributes:
+        entetes: En-têtes à ajouter à la requête (traceparent), vides hors traçage
+        statut: Code HTTP de la réponse, à renseigner par l'appelant
+    """
+
+    def __init__(self, entetes: Dict[str, str]):
+        self.entetes = entetes
+        self.statut: Optional[int] = None
+
+
+def _span(trace_id: str, span_id: str, parent_id: Optional[str], nom: str,
+          debut_ns: int, fin_ns: int, attributs: dict, type_span: int) -> dict:
+    """Un span au format OTLP/JSON"""
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        **({"parentSpanId": parent_id} if parent_id else {}),
+        "name": nom,
+        "kind": type_span,
+        "startTimeUnixNano": str(debut_ns),
+        "endTimeUnixNano": str(fin_ns),
+        "attributes": [
+            {"key": cle, "value": {"intValue": str(valeur)} if isinstance(valeur, int) else {"stringValue": str(valeur)}}
+            for cle, valeur in attributs.items()
+        ]
+    }
+
+
+def demarrer_rendu(page: str) -> None:
+    """Ouvre la trace du rendu de la page (à appeler en haut de la page)"""
+    if not TRACES:
+        return
+    st.session_state[CLE_RENDU] = {
+        "trace_id": secrets.token_hex(16),
+        "span_id": secrets.token_hex(8),
+        "page": page,
+        "debut_ns": time.time_ns(),
+        "spans": []
+    }
+
+
+@contextmanager
+def tracer_appel(endpoint: str, params: Optional[dict] = None) -> Iterator[AppelTrace]:
+    """
+    Span d'un appel à l'API pendant le rendu en cours
+
+    Usage :
+        with tracer_appel("/kpi/globaux", params) as appel:
+            response = requests.get(url, params=params, headers={**entetes, **appel.entetes})
+            appel.statut = response.status_code
+    """
+    rendu = st.session_state.get(CLE_RENDU) if TRACES else None
+    if rendu is None:
+        yield AppelTrace({})
+        return
+    span_id = secrets.token_hex(8)
+    appel = AppelTrace({"traceparent": f"00-{rendu['trace_id']}-{span_id}-01"})
+    debut_ns = time.time_ns()
+    try:
+        yield appel
+    finally:
+        attributs = {"http.method": "GET", "http.route": endpoint}
+        if params:
+            attributs["http.params"] = "&".join(f"{cle}={valeur}" for cle, valeur in sorted(params.items()))
+        if appel.statut is not None:
+            attributs["http.status_code"] = appel.statut
+        rendu["spans"].append(_span(
+            rendu["trace_id"], span_id, rendu["span_id"], f"GET {endpoint}",
+            debut_ns, time.time_ns(), attributs, SPAN_CLIENT
+        ))
+
+
+def terminer_rendu() -> None:
+    """Ferme la trace du rendu et envoie ses spans (à appeler en bas de la page)"""
+    rendu = st.session_state.pop(CLE_RENDU, None) if TRACES else None
+    if rendu is None:
+        return
+    racine = _span(
+        rendu["trace_id"], rendu["span_id"], None, f"rendu {rendu['page']}",
+        rendu["debut_ns"], time.time_ns(), {"streamlit.page": rendu["page"], "appels_api": len(rendu["spans"])},
+        SPAN_INTERNE
+    )
+    lot = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "superstore-dashboard"}}]},
+            "scopeSpans": [{"scope": {"name": "superstore-dashboard"}, "spans": [racine] + rendu["spans"]}]
+        }]
+    }
+    try:
+        entetes = {"X-Token-Traces": TRACES_TOKEN} if TRACES_TOKEN else {}
+        requests.post(TRACES_URL, json=lot, headers=entetes, timeout=2)
+    except requests.exceptions.RequestException:
+        pass  # Les traces ne doivent jamais gêner l'affichage du dashboard
@@ -0,0 +1,120 @@
+"""
+Fixtures communes des tests
+🧪 Petit dataset Superstore synthétique (quelques centaines de lignes sur deux
+   ans, beaucoup d'ex aequo sur le chiffre d'affaires) écrit dans un dossier temporaire
+🚀 L'API est importée une seule fois (sa configuration est lue à l'import) puis
+   démarrée avec TestClient : les tests attendent que /ready réponde 200
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+# Les modules de l'API s'importent entre eux par leur nom (from stockage import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+JETON_ADMIN = "jeton-admin-test"
+JETON_INGESTION = "jeton-ingestion-test"
+
+# Nombre de lignes du dataset synthétique
+NB_LIGNES = 400
+
+
+def generer_dataset(chemin: str, nb_lignes: int = NB_LIGNES) -> pd.DataFrame:
+    """Écrit un CSV au format Superstore (mêmes colonnes, dates M/D/YYYY) et le retourne"""
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, nb_lignes), unit="D")
+    regions = np.array(["West", "East", "Central", "South"])[rng.integers(0, 4, nb_lignes)]
+    categories = np.array(["Furniture", "Office Supplies", "Technology"])[rng.integers(0, 3, nb_lignes)]
+    clients = rng.integers(0, 60, nb_lignes)
+    produits = rng.integers(0, 80, nb_lignes)
+    df = pd.DataFrame({
+        "Row ID": np.arange(1, nb_lignes + 1),
+        "Order ID": [f"CA-{d.year}-{100000 + i // 2}" for i, d in enumerate(dates)],
+        "Order Date": dates.strftime("%-m/%-d/%Y"),
+        "Ship Date": (dates + pd.Timedelta(days=4)).strftime("%-m/%-d/%Y"),
+        "Ship Mode": "Standard Class",
+        "Customer ID": [f"CU-{c:05d}" for c in clients],
+        "Customer Name": [f"Client {c}" for c in clients],
+        "Segment": np.array(["Consumer", "Corporate", "Home Office"])[rng.integers(0, 3, nb_lignes)],
+        "Country": "United States",
+        "City": "Springfield",
+        "State": np.where(regions == "West", "California", "Texas"),
+        "Postal Code": rng.integers(10000, 99999, nb_lignes),
+        "Region": regions,
+        "Product ID": [f"P-{p}" for p in produits],
+        "Category": categories,
+        "Sub-Category": "Misc",
+        "Product Name": [f"Produit {p}" for p in produits],
+        # Peu de montants distincts : beaucoup d'ex aequo pour les tris par CA
+        "Sales": rng.choice([10.0, 25.5, 99.99, 150.0, 420.0], nb_lignes),
+        "Quantity": rng.integers(1, 10, nb_lignes),
+        "Discount": rng.choice([0.0, 0.2, 0.5], nb_lignes),
+        "Profit": rng.normal(20, 50, nb_lignes).round(4),
+    })
+    df.to_csv(chemin, index=False, encoding="latin-1")
+    return df
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Dataset synthétique nettoyé (dates converties), comme après la lecture du CSV"""
+    df = generer_dataset(str(tmp_path / "superstore.csv"))
+    df["Order Date"] = pd.to_datetime(df["Order Date"])
+    df["Ship Date"] = pd.to_datetime(df["Ship Date"])
+    return df
+
+
+@pytest.fixture
+def stockage(dataset, tmp_path):
+    """Stockage partitionné du dataset synthétique (groupes de 8 lignes : zone maps fines)"""
+    from stockage import StockagePartitionne
+    stockage = StockagePartitionne(str(tmp_path / "partitions"), 64 * 1024 * 1024, taille_groupe=8)
+    stockage.ouvrir_ecriture()
+    stockage.ajouter(dataset)
+    stockage.fermer_ecriture()
+    return stockage
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """Module main de l'API, configuré sur le dataset synthétique"""
+    dossier = tmp_path_factory.mktemp("superstore")
+    chemin_csv = str(dossier / "superstore.csv")
+    generer_dataset(chemin_csv)
+    os.environ.update({
+        "DATASET_URL": chemin_csv,
+        "DATA_DIR": str(dossier / "donnees"),
+        "ADMIN_TOKEN": JETON_ADMIN,
+        "INGEST_TOKEN": JETON_INGESTION,
+        "TAILLE_GROUPE_LIGNES": "8",
+        "PRECHAUFFAGE": "0",
+    })
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(api):
+    """Client HTTP de l'API, une fois la première version des données publiée"""
+    with TestClient(api.app) as client:
+        limite = time.monotonic() + 30
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < limite, "données non chargées après 30 s"
+            time.sleep(0.05)
+        yield client
+
+
+@pytest.fixture
+def admin():
+    return {"X-Token-Admin": JETON_ADMIN}
+
+
+@pytest.fixture
+def ingestion():
+    return {"X-Token-Ingestion": JETON_INGESTION}
@@ -0,0 +1,50 @@
+"""
+Tests des endpoints d'administration des caches et de la mémoire
+"""
+
+from cache_resultats import CacheResultats, decrire_cle
+
+
+def test_cache_resultats_invalider_par_motif():
+    cache = CacheResultats(1024 * 1024)
+    cache.ajouter(("calcul_kpi_globaux", "e1", (("region", "West"),)), b"a")
+    cache.ajouter(("calcul_kpi_globaux", "e1", (("region", "East"),)), b"b", "gzip")
+    cache.ajouter(("calcul_temporel", "e1", (("periode", "mois"),)), b"c")
+    assert decrire_cle(("calcul_kpi_globaux", "e1", (("region", "West"),))) == "calcul_kpi_globaux?region=West"
+    assert cache.invalider(motif="*region=West*") == 1
+    assert cache.invalider(fonction="calcul_kpi_globaux") == 1
+    assert cache.etat()["entrees"] == 1 and cache.octets == 1
+
+
+def test_endpoints_admin_proteges(client):
+    for methode, url in [("GET", "/admin/cache"), ("POST", "/admin/cache/invalidate?motif=*"), ("GET", "/admin/memory")]:
+        assert client.request(methode, url).status_code == 401
+        assert client.request(methode, url, headers={"X-Token-Admin": "mauvais"}).status_code == 401
+
+
+def test_cache_puis_invalidation(client, admin):
+    params = {"region": "South", "segment": "Corporate"}
+    client.get("/kpi/globaux", params=params)
+    client.get("/kpi/globaux", params=params)
+
+    contenu = client.get("/admin/cache", headers=admin).json()
+    assert set(contenu) == {"resultats", "disque", "partitions"}
+    cles = [entree["cle"] for entree in contenu["resultats"]["principales"]]
+    assert any("region=South" in cle and "segment=Corporate" in cle for cle in cles)
+
+    assert client.post("/admin/cache/invalidate", headers=admin).status_code == 422
+    assert client.post("/admin/cache/invalidate", params={"endpoint": "/inconnu"}, headers=admin).status_code == 404
+    reponse = client.post(
+        "/admin/cache/invalidate", params={"endpoint": "/kpi/globaux", "motif": "*region=South*"}, headers=admin
+    )
+    assert reponse.status_code == 200
+    assert reponse.json()["supprimees"]["resultats"] >= 1
+    cles = [entree["cle"] for entree in client.get("/admin/cache", headers=admin).json()["resultats"]["principales"]]
+    assert not any("region=South" in cle for cle in cles)
+
+
+def test_memoire(client, admin):
+    memoire = client.get("/admin/memory", headers=admin).json()
+    assert memoire["version_donnees"] >= 1
+    assert memoire["agregats"]["cube_commandes"] > 0
+    assert memoire["total_mesure_octets"] >= sum(memoire["agregats"].values())
@@ -0,0 +1,55 @@
+"""
+Tests du suivi des allocations des calculs (allocations.py, /admin/allocations)
+"""
+
+import tracemalloc
+
+import pytest
+
+from allocations import SuiviAllocations
+
+
+@pytest.fixture
+def suivi():
+    """Suivi actif ; tracemalloc arrêté ensuite (il ralentit toutes les allocations)"""
+    yield SuiviAllocations(True)
+    tracemalloc.stop()
+
+
+def test_pic_et_net_par_endpoint(suivi):
+    with suivi.mesurer("/kpi/test"):
+        temporaire = bytearray(4 * 1024 * 1024)
+        del temporaire
+        garde = bytearray(1024 * 1024)
+    stats = suivi.par_endpoint()["/kpi/test"]
+    assert stats["nb_calculs"] == 1
+    assert stats["pic_max_octets"] >= 4 * 1024 * 1024
+    assert 1024 * 1024 <= stats["net_moyen_octets"] < 4 * 1024 * 1024
+    assert len(garde) == 1024 * 1024
+    suivi.reinitialiser()
+    assert suivi.par_endpoint() == {}
+
+
+def test_suivi_inactif():
+    suivi = SuiviAllocations(False)
+    with suivi.mesurer("/kpi/test"):
+        pass
+    assert suivi.par_endpoint() == {} and suivi.principaux_sites(5) == []
+    assert suivi.etat() == {"actif": False}
+
+
+def test_admin_allocations(api, client, admin, monkeypatch, suivi):
+    assert client.get("/admin/allocations").status_code == 401
+    assert client.get("/admin/allocations", headers=admin).status_code == 403
+
+    monkeypatch.setattr(api, "suivi_allocations", suivi)
+    # Filtres propres à ce test : calcul effectué (pas déjà dans le cache des résultats)
+    assert client.get("/kpi/globaux", params={"region": "South", "date_fin": "2023-04-30"}).status_code == 200
+    reponse = client.get("/admin/allocations", params={"sites": 3}, headers=admin).json()
+    assert reponse["suivi"]["actif"] is True
+    assert reponse["endpoints"]["/kpi/globaux"]["nb_calculs"] == 1
+    assert reponse["endpoints"]["/kpi/globaux"]["pic_max_octets"] > 0
+    assert len(reponse["sites"]) == 3
+
+    assert client.post("/admin/allocations/reset", headers=admin).json() == {"reinitialise": True}
+    assert client.get("/admin/allocations", headers=admin).json()["endpoints"] == {}
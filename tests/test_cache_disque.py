@@ -0,0 +1,67 @@
+"""
+Tests du cache des réponses sur disque (cache_disque.py)
+"""
+
+from cache_disque import CacheDisque, empreinte_code
+from cache_resultats import CacheResultats
+
+CLE = ("calcul_categories", "e1", (("format", "lignes"),))
+
+
+def cle(numero: int) -> tuple:
+    return ("calcul_temporel", "e1", (("numero", numero),))
+
+
+def test_reponses_reprises_apres_redemarrage(tmp_path):
+    cache = CacheDisque(str(tmp_path), 1024, "code1")
+    cache.ajouter(CLE, b"reponse", "identity")
+    cache.ajouter(CLE, b"compressee", "gzip")
+
+    # Nouveau processus, même code : réponses resservies
+    redemarre = CacheDisque(str(tmp_path), 1024, "code1")
+    assert redemarre.lire(CLE, "identity") == b"reponse"
+    assert redemarre.lire(CLE, "gzip") == b"compressee"
+    assert redemarre.lire(cle(1), "identity") is None
+    assert (redemarre.nb_succes, redemarre.nb_echecs) == (2, 1)
+
+    # Code des calculs modifié : anciennes réponses supprimées
+    nouveau_code = CacheDisque(str(tmp_path), 1024, "code2")
+    assert nouveau_code.lire(CLE, "identity") is None
+    assert nouveau_code.etat()["entrees"] == 0
+
+
+def test_eviction_des_moins_recemment_lues(tmp_path):
+    cache = CacheDisque(str(tmp_path), 100, "code1")
+    cache.ajouter(cle(1), b"a" * 40, "identity")
+    cache.ajouter(cle(2), b"b" * 40, "identity")
+    assert cache.lire(cle(1), "identity") is not None
+    # 120 octets : la réponse 2, la moins récemment lue, est supprimée
+    cache.ajouter(cle(3), b"c" * 40, "identity")
+    assert cache.lire(cle(2), "identity") is None
+    assert cache.lire(cle(1), "identity") == b"a" * 40
+    assert cache.lire(cle(3), "identity") == b"c" * 40
+    assert cache.etat()["octets"] == 80
+    # Plus grande que le budget : jamais enregistrée
+    cache.ajouter(cle(4), b"d" * 101, "identity")
+    assert cache.lire(cle(4), "identity") is None
+
+
+def test_empreinte_du_code(tmp_path):
+    module = tmp_path / "kpi.py"
+    module.write_text("A = 1\n")
+    avant = empreinte_code([str(module)])
+    assert empreinte_code([str(module)]) == avant
+    module.write_text("A = 2\n")
+    assert empreinte_code([str(module)]) != avant
+
+
+def test_api_servie_depuis_le_disque_apres_redemarrage(api, client, monkeypatch):
+    params = {"fields": "ca,profit"}
+    premiere = client.get("/kpi/geographique", params=params)
+    # Redémarrage : cache mémoire vide, nouvelle connexion au même fichier
+    monkeypatch.setattr(api, "cache_resultats", CacheResultats(api.cache_resultats.budget_octets))
+    disque = CacheDisque(api.DOSSIER_CACHE, api.cache_disque.budget_octets, api.cache_disque.version_code)
+    monkeypatch.setattr(api, "cache_disque", disque)
+    seconde = client.get("/kpi/geographique", params=params)
+    assert seconde.content == premiere.content
+    assert disque.nb_succes == 1
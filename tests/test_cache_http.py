@@ -0,0 +1,48 @@
+"""
+Tests du cache HTTP (cache_http.py) : ETag, Last-Modified et réponses 304
+"""
+
+from test_ingestion import nouvelle_ligne
+
+PARAMS = {"categorie": "Technology", "date_debut": "2023-02-01"}
+
+
+def test_etag_puis_304(client):
+    reponse = client.get("/kpi/globaux", params=PARAMS)
+    assert reponse.status_code == 200
+    etag = reponse.headers["etag"]
+    assert "must-revalidate" in reponse.headers["cache-control"]
+
+    revalidee = client.get("/kpi/globaux", params=PARAMS, headers={"If-None-Match": etag})
+    assert revalidee.status_code == 304
+    assert revalidee.content == b""
+    assert revalidee.headers["etag"] == etag
+    # Comparaison faible, liste d'ETags
+    assert client.get("/kpi/globaux", params=PARAMS, headers={"If-None-Match": f'"autre", W/{etag}'}).status_code == 304
+    assert client.get("/kpi/globaux", params=PARAMS, headers={"If-None-Match": '"autre"'}).status_code == 200
+
+
+def test_etag_depend_des_parametres_normalises(client):
+    etag = client.get("/kpi/globaux", params=PARAMS).headers["etag"]
+    # Ordre des paramètres et filtre "Toutes" explicite : même calcul, même ETag
+    equivalent = client.get("/kpi/globaux", params={"date_debut": "2023-02-01", "region": "Toutes", "categorie": "Technology"})
+    assert equivalent.headers["etag"] == etag
+    assert client.get("/kpi/globaux", params={**PARAMS, "region": "West"}).headers["etag"] != etag
+
+
+def test_if_modified_since(client):
+    reponse = client.get("/kpi/globaux", params=PARAMS)
+    derniere_modification = reponse.headers["last-modified"]
+    assert client.get("/kpi/globaux", params=PARAMS, headers={"If-Modified-Since": derniere_modification}).status_code == 304
+    assert client.get(
+        "/kpi/globaux", params=PARAMS, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    ).status_code == 200
+
+
+def test_nouvelle_version_nouvel_etag(client, ingestion):
+    etag = client.get("/kpi/globaux", params=PARAMS).headers["etag"]
+    # Commande Technology ajoutée : le résultat change, l'ancien ETag ne correspond plus
+    assert client.post("/ingestion/commandes", headers=ingestion, json=[nouvelle_ligne(40)]).status_code == 200
+    reponse = client.get("/kpi/globaux", params=PARAMS, headers={"If-None-Match": etag})
+    assert reponse.status_code == 200
+    assert reponse.headers["etag"] != etag
@@ -0,0 +1,41 @@
+"""
+Tests du chargement en arrière-plan (/health, /ready)
+"""
+
+import threading
+import time
+
+from versions import GestionnaireDataset
+
+
+def test_ready_503_pendant_le_chargement_puis_200(api, client, monkeypatch, tmp_path):
+    debloquer = threading.Event()
+    charger = api.load_data
+
+    def charger_lentement(stockage):
+        debloquer.wait(10)
+        return charger(stockage)
+
+    # Nouveau gestionnaire sans version publiée : comme au démarrage du serveur
+    gestionnaire = GestionnaireDataset(str(tmp_path / "versions"), api.gestionnaire.fabrique_stockage)
+    monkeypatch.setattr(api, "gestionnaire", gestionnaire)
+    monkeypatch.setattr(api, "load_data", charger_lentement)
+    api.demarrer_chargement()
+    try:
+        assert client.get("/health").status_code == 200
+        ready = client.get("/ready")
+        assert ready.status_code == 503
+        assert ready.headers["retry-after"] == str(api.RETRY_AFTER_CHARGEMENT)
+        assert ready.json()["pret"] is False and ready.json()["reconstruction_en_cours"] is True
+        kpi = client.get("/kpi/globaux")
+        assert kpi.status_code == 503 and "retry-after" in kpi.headers
+    finally:
+        debloquer.set()
+
+    limite = time.monotonic() + 30
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < limite, "données non chargées après 30 s"
+        time.sleep(0.05)
+    assert client.get("/ready").json()["version_donnees"] == 1
+    assert client.get("/health").status_code == 200
+    assert client.get("/kpi/globaux").status_code == 200
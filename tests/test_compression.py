@@ -0,0 +1,58 @@
+"""
+Tests de la compression négociée (compression.py)
+"""
+
+import gzip
+
+import orjson
+import pytest
+
+from compression import choisir_encodage, PREFERENCES_REPONSES, PREFERENCES_FLUX
+
+URL_VOLUMINEUSE = "/kpi/temporel?periode=jour"
+
+
+@pytest.mark.parametrize("accept_encoding, preferences, attendu", [
+    (None, PREFERENCES_REPONSES, None),
+    ("identity", PREFERENCES_REPONSES, None),
+    ("gzip, deflate", PREFERENCES_REPONSES, "gzip"),
+    ("gzip, br, zstd", PREFERENCES_REPONSES, "br"),
+    ("gzip, br, zstd", PREFERENCES_FLUX, "zstd"),
+    ("br;q=0.5, gzip", PREFERENCES_REPONSES, "gzip"),
+    ("*", PREFERENCES_REPONSES, "br"),
+    ("*, br;q=0", PREFERENCES_REPONSES, "zstd"),
+    ("gzip;q=abc", PREFERENCES_REPONSES, None),
+])
+def test_choisir_encodage(accept_encoding, preferences, attendu):
+    assert choisir_encodage(accept_encoding, preferences) == attendu
+
+
+def corps_brut(client, url: str, accept_encoding: str):
+    """Réponse sans décompression automatique par le client HTTP"""
+    with client.stream("GET", url, headers={"Accept-Encoding": accept_encoding}) as reponse:
+        return reponse.headers, b"".join(reponse.iter_raw())
+
+
+def test_reponse_compressee_selon_accept_encoding(client):
+    entetes, identite = corps_brut(client, URL_VOLUMINEUSE, "identity")
+    assert "content-encoding" not in entetes
+
+    entetes, compresse = corps_brut(client, URL_VOLUMINEUSE, "gzip")
+    assert entetes["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in entetes["vary"]
+    assert len(compresse) < len(identite)
+    assert orjson.loads(gzip.decompress(compresse)) == orjson.loads(identite)
+
+    entetes, _ = corps_brut(client, URL_VOLUMINEUSE, "gzip, br, zstd")
+    assert entetes["content-encoding"] == "br"
+
+
+def test_variantes_avec_etag_distinct(client):
+    entetes_gzip, _ = corps_brut(client, URL_VOLUMINEUSE, "gzip")
+    entetes_identite, _ = corps_brut(client, URL_VOLUMINEUSE, "identity")
+    assert entetes_gzip["etag"] != entetes_identite["etag"]
+
+
+def test_petite_reponse_non_compressee(client):
+    entetes, _ = corps_brut(client, "/kpi/globaux", "gzip")
+    assert "content-encoding" not in entetes
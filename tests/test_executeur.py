@@ -0,0 +1,119 @@
+"""
+Tests de l'exécution bornée et de la fusion des calculs identiques simultanés (executeur.py)
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from executeur import ExecuteurBorne, ServeurSature, VolUnique
+
+
+def calcul_compte(appels: list, resultat="resultat", erreur=None):
+    """Calcul lent qui note chacun de ses lancements"""
+    async def lancer():
+        appels.append(1)
+        await asyncio.sleep(0.05)
+        if erreur is not None:
+            raise erreur
+        return resultat
+    return lancer
+
+
+def test_calculs_identiques_fusionnes():
+    async def scenario():
+        vol, appels = VolUnique(), []
+        resultats = await asyncio.gather(*(vol.executer(("globaux", 1), calcul_compte(appels)) for _ in range(10)))
+        return vol, appels, resultats
+
+    vol, appels, resultats = asyncio.run(scenario())
+    assert resultats == ["resultat"] * 10
+    assert len(appels) == 1
+    assert (vol.nb_calculs, vol.nb_fusionnees) == (1, 9)
+
+
+def test_cles_differentes_et_oubli_apres_calcul():
+    async def scenario():
+        vol, appels = VolUnique(), []
+        await asyncio.gather(vol.executer("a", calcul_compte(appels)), vol.executer("b", calcul_compte(appels)))
+        # Ce n'est pas un cache : la même clé, une fois le calcul terminé, est recalculée
+        await vol.executer("a", calcul_compte(appels))
+        return appels
+
+    assert len(asyncio.run(scenario())) == 3
+
+
+def test_erreur_partagee():
+    async def scenario():
+        vol, appels = VolUnique(), []
+        lancer = calcul_compte(appels, erreur=ValueError("échec"))
+        resultats = await asyncio.gather(*(vol.executer("a", lancer) for _ in range(3)), return_exceptions=True)
+        return appels, resultats
+
+    appels, resultats = asyncio.run(scenario())
+    assert len(appels) == 1
+    assert all(isinstance(r, ValueError) for r in resultats)
+
+
+def test_abandon_d_un_client_n_annule_pas_le_calcul():
+    async def scenario():
+        vol, appels = VolUnique(), []
+        premier = asyncio.ensure_future(vol.executer("a", calcul_compte(appels)))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(vol.executer("a", calcul_compte(appels)))
+        await asyncio.sleep(0.01)
+        premier.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await premier
+        return appels, await second
+
+    appels, resultat = asyncio.run(scenario())
+    assert resultat == "resultat" and len(appels) == 1
+
+
+def test_file_pleine_refusee():
+    debloquer = threading.Event()
+
+    async def scenario():
+        executeur = ExecuteurBorne(nb_threads=1, profondeur_max=2, delai_s=5)
+        taches = [asyncio.ensure_future(executeur.executer(debloquer.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ServeurSature, match="file d'attente pleine"):
+            await executeur.executer(sum, [1, 2])
+        debloquer.set()
+        await asyncio.gather(*taches)
+        return executeur
+
+    executeur = asyncio.run(scenario())
+    assert executeur.nb_refus == 1
+    # Places libérées à la fin des calculs
+    assert executeur.en_cours == 0
+
+
+def test_delai_depasse():
+    debloquer = threading.Event()
+
+    async def scenario():
+        executeur = ExecuteurBorne(nb_threads=1, profondeur_max=2, delai_s=0.05)
+        with pytest.raises(ServeurSature, match="délai"):
+            await executeur.executer(debloquer.wait, 5)
+        return executeur
+
+    executeur = asyncio.run(scenario())
+    assert executeur.nb_delais_depasses == 1
+    # Le thread ne peut pas être interrompu : la place reste prise jusqu'à la fin du calcul
+    assert executeur.en_cours == 1
+    debloquer.set()
+
+
+@pytest.mark.parametrize("profondeur_max, delai_s, raison", [(0, 5, "file d'attente pleine"), (2, 0, "délai")])
+def test_503_avec_retry_after(api, client, monkeypatch, profondeur_max, delai_s, raison):
+    monkeypatch.setattr(api, "executeur", ExecuteurBorne(1, profondeur_max, delai_s))
+    # Filtres propres à ce test : la réponse n'est pas déjà dans le cache des résultats
+    reponse = client.get("/kpi/globaux", params={
+        "region": "East", "segment": "Home Office", "date_debut": f"2023-02-0{profondeur_max + 1}"
+    })
+    assert reponse.status_code == 503
+    assert reponse.headers["retry-after"] == str(api.RETRY_AFTER_SATURATION)
+    assert raison in reponse.json()["detail"]
@@ -0,0 +1,55 @@
+"""
+Tests de l'export en flux (GET /data/export, export.py)
+"""
+
+import io
+
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def source(api) -> pd.DataFrame:
+    """Lignes du CSV synthétique (les lignes ingérées par d'autres tests sont en région Central)"""
+    df = pd.read_csv(api.DATASET_URL, encoding="latin-1")
+    df["Order Date"] = pd.to_datetime(df["Order Date"])
+    return df
+
+
+def test_export_filtre_ndjson_et_csv(api, client):
+    df = source(api)
+    attendues = df[(df["Region"] == "West") & (df["Order Date"] >= "2023-07-01") & (df["Order Date"] <= "2024-03-31")]
+    params = {"region": "West", "date_debut": "2023-07-01", "date_fin": "2024-03-31"}
+
+    ndjson = client.get("/data/export", params={**params, "format": "ndjson"})
+    assert ndjson.status_code == 200
+    lignes = [orjson.loads(l) for l in ndjson.content.splitlines()]
+    assert sorted(l["Row ID"] for l in lignes) == sorted(attendues["Row ID"])
+
+    csv = client.get("/data/export", params={**params, "format": "csv", "colonnes": "Row ID,Sales"})
+    relu = pd.read_csv(io.BytesIO(csv.content))
+    assert list(relu.columns) == ["Row ID", "Sales"]
+    assert sorted(relu["Row ID"]) == sorted(attendues["Row ID"])
+
+
+def test_export_parquet_vide_garde_le_schema(client):
+    reponse = client.get("/data/export", params={"format": "parquet", "region": "Nulle part"})
+    assert reponse.status_code == 200
+    table = pq.read_table(io.BytesIO(reponse.content))
+    assert table.num_rows == 0
+    assert table.schema.field("Row ID").type == pa.int64()
+    assert table.schema.field("Order Date").type == pa.timestamp("ns")
+
+
+def test_export_colonnes_inconnues(client):
+    assert client.get("/data/export", params={"colonnes": "Row ID,Inconnue"}).status_code == 422
+
+
+def test_export_dates_invalides_refusees_avant_le_flux(client):
+    for params in ({"date_debut": "abc"}, {"date_fin": "2024-02-30"}):
+        reponse = client.get("/data/export", params=params)
+        assert reponse.status_code == 422
+    assert client.get("/kpi/globaux", params={"date_debut": "abc"}).status_code == 422
+    # Format attendu par les dashboards
+    assert client.get("/kpi/globaux", params={"date_debut": "2023-02-01", "date_fin": "2023-12-31"}).status_code == 200
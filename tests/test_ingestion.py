@@ -0,0 +1,171 @@
+"""
+Tests de l'ingestion incrémentale (POST /ingestion/commandes, ingestion.py)
+"""
+
+import io
+import time
+
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingestion import valider_lot, SurveillantDepot
+
+
+def nouvelle_ligne(numero: int, **valeurs) -> dict:
+    """Ligne complète et valide au format du CSV Superstore"""
+    ligne = {
+        "Row ID": 90000 + numero, "Order ID": f"CA-2024-9{numero:05d}", "Order Date": "2024-06-15",
+        "Ship Date": "2024-06-19", "Ship Mode": "First Class", "Customer ID": "CU-09999",
+        "Customer Name": "Client test", "Segment": "Consumer", "Country": "United States",
+        "City": "Springfield", "State": "Texas", "Postal Code": 75001, "Region": "Central",
+        "Product ID": "P-1", "Category": "Technology", "Sub-Category": "Misc",
+        "Product Name": "Produit test", "Sales": 12.5, "Quantity": 2, "Discount": 0.0, "Profit": 3.25
+    }
+    ligne.update(valeurs)
+    return ligne
+
+
+def exporter(client, format_export: str) -> bytes:
+    reponse = client.get("/data/export", params={"format": format_export})
+    assert reponse.status_code == 200
+    return reponse.content
+
+
+def ligne_exportee(client, order_id: str) -> dict:
+    lignes = [orjson.loads(l) for l in exporter(client, "ndjson").splitlines()]
+    return next(l for l in lignes if l["Order ID"] == order_id)
+
+
+# === VALIDATION (ingestion.py) ===
+
+SCHEMA = pa.schema([
+    ("Row ID", pa.int64()), ("Order ID", pa.string()), ("Order Date", pa.timestamp("ns")),
+    ("Ship Date", pa.timestamp("ns")), ("Customer ID", pa.string()), ("Customer Name", pa.string()),
+    ("Segment", pa.string()), ("State", pa.string()), ("Postal Code", pa.int64()), ("Region", pa.string()),
+    ("Product Name", pa.string()), ("Category", pa.string()), ("Sales", pa.float64()),
+    ("Quantity", pa.int64()), ("Profit", pa.float64())
+])
+
+
+def lot(*lignes: dict) -> pd.DataFrame:
+    return pd.DataFrame([{c: v for c, v in l.items() if c in SCHEMA.names} for l in lignes])
+
+
+def test_valider_lot_convertit_dans_le_type_stocke():
+    converti, erreurs = valider_lot(lot(nouvelle_ligne(1, **{"Postal Code": "75001"})), SCHEMA)
+    assert erreurs == []
+    assert list(converti.columns) == SCHEMA.names
+    assert converti["Postal Code"].dtype == "int64"
+    assert converti["Order Date"].dtype == "datetime64[ns]"
+
+
+def test_valider_lot_refuse_une_valeur_non_entiere():
+    _, erreurs = valider_lot(lot(nouvelle_ligne(1), nouvelle_ligne(2, **{"Postal Code": "AB12"})), SCHEMA)
+    assert [(e["ligne"], e["colonne"]) for e in erreurs] == [(1, "Postal Code")]
+    _, erreurs = valider_lot(lot(nouvelle_ligne(1, Quantity=2.5)), SCHEMA)
+    assert [e["colonne"] for e in erreurs] == ["Quantity"]
+
+
+def test_valider_lot_signale_colonnes_manquantes_et_inconnues():
+    brut = lot(nouvelle_ligne(1)).drop(columns=["Sales"]).assign(Remise=1)
+    _, erreurs = valider_lot(brut, SCHEMA)
+    assert {(e["colonne"], e["erreur"]) for e in erreurs} == {("Sales", "colonne manquante"), ("Remise", "colonne inconnue")}
+
+
+def test_valider_lot_complete_les_colonnes_optionnelles_dans_leur_type():
+    brut = lot(nouvelle_ligne(1)).drop(columns=["Row ID", "Postal Code"])
+    converti, erreurs = valider_lot(brut, SCHEMA)
+    assert erreurs == []
+    assert str(converti["Row ID"].dtype) == "Int64" and converti["Row ID"].isna().all()
+
+
+# === ENDPOINT ===
+
+def test_ingestion_refuse_un_type_invalide_et_l_export_reste_lisible(client, ingestion):
+    version = client.get("/ready").json()["version_donnees"]
+    reponse = client.post(
+        "/ingestion/commandes", headers=ingestion, json=[nouvelle_ligne(10, **{"Postal Code": "AB12"})]
+    )
+    assert reponse.status_code == 422
+    assert reponse.json()["detail"]["erreurs"][0]["colonne"] == "Postal Code"
+    assert client.get("/ready").json()["version_donnees"] == version
+    assert pq.read_table(io.BytesIO(exporter(client, "parquet"))).num_rows > 0
+
+
+def test_ingestion_sans_colonnes_optionnelles(client, ingestion):
+    ligne = nouvelle_ligne(11)
+    for colonne in ("Row ID", "Postal Code", "City"):
+        del ligne[colonne]
+    reponse = client.post("/ingestion/commandes", headers=ingestion, json=[ligne])
+    assert reponse.status_code == 200
+
+    relue = ligne_exportee(client, ligne["Order ID"])
+    assert relue["Row ID"] is None and relue["Postal Code"] is None and relue["City"] is None
+    assert relue["Quantity"] == 2 and isinstance(relue["Quantity"], int)
+    # Le Parquet exporté garde les types des partitions d'origine
+    schema = pq.read_table(io.BytesIO(exporter(client, "parquet"))).schema
+    assert schema.field("Row ID").type == pa.int64()
+    assert schema.field("Postal Code").type == pa.int64()
+
+
+def test_ingestion_conserve_les_entiers(client, ingestion):
+    ligne = nouvelle_ligne(12, **{"Row ID": 2, "Postal Code": "10024"})
+    assert client.post("/ingestion/commandes", headers=ingestion, json=[ligne]).status_code == 200
+    relue = ligne_exportee(client, ligne["Order ID"])
+    assert relue["Row ID"] == 2 and isinstance(relue["Row ID"], int)
+    assert relue["Postal Code"] == 10024
+
+
+def test_ingestion_exige_le_jeton(client):
+    assert client.post("/ingestion/commandes", json=[nouvelle_ligne(13)]).status_code == 401
+
+
+def test_ingestion_avant_le_premier_chargement(api, client, ingestion, monkeypatch):
+    monkeypatch.setattr(api.gestionnaire, "courant", lambda: None)
+    reponse = client.post("/ingestion/commandes", headers=ingestion, json=[nouvelle_ligne(14)])
+    assert reponse.status_code == 503
+    assert reponse.headers["Retry-After"] == str(api.RETRY_AFTER_CHARGEMENT)
+
+
+def test_dossier_de_depot(api, client, tmp_path):
+    version = client.get("/ready").json()["version_donnees"]
+    pd.DataFrame([nouvelle_ligne(15), nouvelle_ligne(16)]).to_csv(tmp_path / "lot.csv", index=False)
+    surveillant = SurveillantDepot(str(tmp_path), api.ingerer_lot, intervalle=0.05)
+    surveillant.demarrer()
+    try:
+        limite = time.monotonic() + 10
+        while not (tmp_path / "traites" / "lot.csv").exists():
+            assert not (tmp_path / "rejetes" / "lot.csv").exists(), "fichier rejeté"
+            assert time.monotonic() < limite, "fichier non traité après 10 s"
+            time.sleep(0.05)
+    finally:
+        surveillant.arreter()
+    assert client.get("/ready").json()["version_donnees"] == version + 1
+    assert ligne_exportee(client, nouvelle_ligne(16)["Order ID"])["Row ID"] == 90016
+
+
+def test_rechargement_complet_conserve_les_lots_ingeres(api, client, ingestion, admin):
+    ligne = nouvelle_ligne(17)
+    assert client.post("/ingestion/commandes", headers=ingestion, json=[ligne]).status_code == 200
+    avant = client.get("/ready").json()
+    nb_lignes = client.get("/").json()["nb_lignes"]
+
+    assert client.post("/admin/rechargement", headers=admin).status_code == 202
+    limite = time.monotonic() + 30
+    while (etat := client.get("/ready").json())["version_donnees"] == avant["version_donnees"] \
+            or etat["reconstruction_en_cours"]:
+        assert time.monotonic() < limite, "rechargement non terminé après 30 s"
+        time.sleep(0.05)
+
+    # Nouveau répertoire de version, mêmes lignes (CSV + lots rejoués)
+    assert client.get("/").json()["nb_lignes"] == nb_lignes
+    assert ligne_exportee(client, ligne["Order ID"])["Row ID"] == ligne["Row ID"]
+    assert api.lots_ingeres.nb_lots >= 1
+
+
+def test_ecritures_refusees_avec_plusieurs_workers(api, client, ingestion, admin, monkeypatch):
+    monkeypatch.setattr(api, "NB_WORKERS", 4)
+    assert client.post("/ingestion/commandes", headers=ingestion, json=[nouvelle_ligne(18)]).status_code == 409
+    assert client.post("/admin/rechargement", headers=admin).status_code == 409
@@ -0,0 +1,81 @@
+"""
+Tests des journaux écrits en arrière-plan (fichiers_jsonl.py, journal_lent.py, /admin/slow)
+"""
+
+import os
+
+import orjson
+
+from fichiers_jsonl import FichierJsonl
+from journal_lent import JournalLent
+
+
+def lignes(chemin) -> list:
+    return [orjson.loads(l) for l in chemin.read_bytes().splitlines()]
+
+
+def test_fichier_jsonl_ecrit_par_le_thread(tmp_path):
+    fichier = FichierJsonl(str(tmp_path / "journal.jsonl"))
+    for i in range(100):
+        fichier.ajouter({"numero": i})
+    fichier.fermer()
+    assert [l["numero"] for l in lignes(tmp_path / "journal.jsonl")] == list(range(100))
+
+
+def test_fichier_jsonl_rotation(tmp_path):
+    fichier = FichierJsonl(str(tmp_path / "journal.jsonl"), taille_max_octets=1000)
+    for i in range(200):
+        fichier.ajouter({"numero": i, "texte": "x" * 20})
+    fichier.fermer()
+    assert (tmp_path / "journal.jsonl").stat().st_size <= 1000
+    assert (tmp_path / "journal.jsonl.1").stat().st_size <= 1000
+    # Les lignes les plus récentes sont dans le fichier courant
+    assert lignes(tmp_path / "journal.jsonl")[-1]["numero"] == 199
+
+
+def test_fichier_jsonl_file_pleine_ne_bloque_pas(tmp_path):
+    fichier = FichierJsonl(str(tmp_path / "journal.jsonl"), nb_max_en_attente=1)
+    fichier.ajouter({"numero": 0})
+    fichier.fermer()  # thread d'écriture arrêté : la file se remplit
+    for i in range(10):
+        fichier.ajouter({"numero": i})
+    assert fichier.nb_perdues == 9
+
+
+def test_fichier_jsonl_ecrit_apres_fork(tmp_path):
+    # Thread démarré dans le parent, comme après le préchargement de serveur.py
+    fichier = FichierJsonl(str(tmp_path / "journal.jsonl"))
+    fichier.ajouter({"processus": "parent"})
+    pid = os.fork()
+    if pid == 0:
+        try:
+            fichier.ajouter({"processus": "enfant"})
+            fichier.fermer()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    fichier.fermer()
+    assert sorted(l["processus"] for l in lignes(tmp_path / "journal.jsonl")) == ["enfant", "parent"]
+
+
+def test_journal_lent(tmp_path):
+    journal = JournalLent(0.1, capacite=2, fichier=str(tmp_path / "lentes.jsonl"))
+    assert not journal.est_lente(0.05) and journal.est_lente(0.2)
+    for duree in (0.3, 0.5, 0.2):
+        journal.enregistrer({"endpoint": "/kpi/globaux", "requete": "globaux", "filtres": {},
+                             "duree_ms": duree * 1000, "chemin": "cube"})
+    # Deux plus récentes en mémoire, toutes dans le fichier
+    assert [e["duree_ms"] for e in journal.pires(5)] == [500.0, 200.0]
+    journal.fichier.fermer()
+    assert len(lignes(tmp_path / "lentes.jsonl")) == 3
+
+
+def test_admin_slow(api, client, admin, monkeypatch):
+    assert client.get("/admin/slow").status_code == 401
+    monkeypatch.setattr(api.journal_lent, "seuil_s", 1e-9)
+    assert client.get("/kpi/globaux", params={"region": "West", "date_debut": "2023-03-01"}).status_code == 200
+    reponse = client.get("/admin/slow", params={"endpoint": "/kpi/globaux"}, headers=admin)
+    assert reponse.status_code == 200
+    pire = reponse.json()["pires"][0]
+    assert pire["endpoint"] == "/kpi/globaux"
+    assert pire["filtres"]["region"] == "West"
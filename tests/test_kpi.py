@@ -0,0 +1,162 @@
+"""
+Tests d'équivalence des KPI (kpi.py) : les agrégats construits en flux donnent
+les mêmes résultats que les calculs pandas sur les lignes brutes
+"""
+
+import pandas as pd
+import pytest
+
+from agregats import ConstructeurAgregats
+from kpi import (
+    calcul_categories, calcul_clients, calcul_geographique, calcul_kpi_globaux,
+    calcul_temporel, calcul_top_produits, CHAMPS_KPI_GLOBAUX
+)
+from versions import Snapshot
+
+# Lignes par bloc : assez de blocs pour déclencher plusieurs compactages
+TAILLE_BLOC = 15
+
+
+@pytest.fixture
+def snap(dataset):
+    """
+    Instantané dont les agrégats sont construits bloc par bloc, comme au chargement
+    du CSV (sans stockage : ces KPI ne lisent que les agrégats)
+    """
+    constructeur = ConstructeurAgregats()
+    for debut in range(0, len(dataset), TAILLE_BLOC):
+        constructeur.ajouter(dataset.iloc[debut:debut + TAILLE_BLOC])
+    return Snapshot(1, None, constructeur.finaliser())
+
+
+def par_cle(table: pd.DataFrame, cle: str) -> pd.DataFrame:
+    """Table indexée par sa clé en texte (l'ordre des ex aequo n'est pas comparé)"""
+    return table.set_index(table[cle].astype(str).rename(None)).drop(columns=cle).sort_index()
+
+
+@pytest.mark.parametrize("filtres", [
+    {},
+    {"date_debut": "2023-03-01", "date_fin": "2023-12-31"},
+    {"region": "West", "segment": "Corporate"},
+    {"date_debut": "2024-01-01", "categorie": "Technology", "region": "Toutes"},
+])
+def test_kpi_globaux(snap, dataset, filtres):
+    df = dataset
+    if "date_debut" in filtres:
+        df = df[df['Order Date'] >= filtres["date_debut"]]
+    if "date_fin" in filtres:
+        df = df[df['Order Date'] <= filtres["date_fin"]]
+    for parametre, colonne in (("categorie", 'Category'), ("region", 'Region'), ("segment", 'Segment')):
+        if filtres.get(parametre) not in (None, "Toutes", "Tous"):
+            df = df[df[colonne] == filtres[parametre]]
+
+    kpi = calcul_kpi_globaux(snap, **filtres)
+    assert kpi["ca_total"] == round(df['Sales'].sum(), 2)
+    assert kpi["profit_total"] == round(df['Profit'].sum(), 2)
+    assert kpi["nb_commandes"] == df['Order ID'].nunique()
+    assert kpi["nb_clients"] == df['Customer ID'].nunique()
+    assert kpi["quantite_vendue"] == df['Quantity'].sum()
+    assert kpi["panier_moyen"] == round(df['Sales'].sum() / df['Order ID'].nunique(), 2)
+
+
+@pytest.mark.parametrize("periode, frequence", [("jour", "D"), ("mois", "M"), ("annee", "Y")])
+def test_temporel(snap, dataset, periode, frequence):
+    attendu = dataset.groupby(dataset['Order Date'].dt.to_period(frequence).astype(str)).agg(
+        ca=('Sales', 'sum'), profit=('Profit', 'sum'), quantite=('Quantity', 'sum'), nb_commandes=('Order ID', 'nunique')
+    )
+    temporel = calcul_temporel(snap, periode)
+    assert temporel['periode'].tolist() == attendu.index.tolist()
+    pd.testing.assert_frame_equal(
+        temporel.set_index('periode')[attendu.columns], attendu, check_dtype=False, check_names=False
+    )
+
+
+def test_clients(snap, dataset):
+    attendu = dataset.groupby('Customer ID').agg(
+        ca_total=('Sales', 'sum'), profit_total=('Profit', 'sum'), nb_commandes=('Order ID', 'nunique')
+    )
+    resultat = calcul_clients(snap, limite=len(attendu))
+    top = par_cle(resultat["top_clients"], 'customer_id')
+    pd.testing.assert_frame_equal(top[attendu.columns], attendu, check_dtype=False, check_names=False)
+    assert resultat["recurrence"] == {
+        "clients_1_achat": int((attendu['nb_commandes'] == 1).sum()),
+        "clients_recurrents": int((attendu['nb_commandes'] > 1).sum()),
+        "nb_commandes_moyen": round(attendu['nb_commandes'].mean(), 2),
+        "total_clients": len(attendu)
+    }
+    segments = dataset.groupby('Segment').agg(
+        ca=('Sales', 'sum'), profit=('Profit', 'sum'), nb_clients=('Customer ID', 'nunique')
+    )
+    pd.testing.assert_frame_equal(
+        par_cle(resultat["segments"], 'segment'), segments, check_dtype=False, check_names=False
+    )
+
+
+@pytest.mark.parametrize("tri_par, colonne", [("ca", 'Sales'), ("profit", 'Profit'), ("quantite", 'Quantity')])
+def test_top_produits(snap, dataset, tri_par, colonne):
+    produits = dataset.groupby(['Product Name', 'Category'])[['Sales', 'Profit', 'Quantity']].sum()
+    attendu = produits.sort_values(colonne, ascending=False).head(10)
+    top = calcul_top_produits(snap, limite=10, tri_par=tri_par)
+    # Même suite de valeurs triées ; chaque produit avec ses propres totaux
+    assert top[tri_par].tolist() == attendu[colonne].round(2).tolist()
+    for ligne in top.itertuples():
+        totaux = produits.loc[(ligne.produit, ligne.categorie)]
+        assert (ligne.ca, ligne.profit, ligne.quantite) == \
+            (round(totaux['Sales'], 2), round(totaux['Profit'], 2), totaux['Quantity'])
+
+
+def test_categories(snap, dataset):
+    attendu = dataset.groupby('Category').agg(
+        ca=('Sales', 'sum'), profit=('Profit', 'sum'), nb_commandes=('Order ID', 'nunique')
+    )
+    attendu['marge_pct'] = (attendu['profit'] / attendu['ca'] * 100).round(2)
+    categories = calcul_categories(snap)
+    assert categories['ca'].is_monotonic_decreasing
+    pd.testing.assert_frame_equal(par_cle(categories, 'categorie'), attendu, check_dtype=False, check_names=False)
+
+
+def test_geographique(snap, dataset):
+    attendu = dataset.groupby('Region').agg(
+        ca=('Sales', 'sum'), profit=('Profit', 'sum'),
+        nb_clients=('Customer ID', 'nunique'), nb_commandes=('Order ID', 'nunique')
+    )
+    geo = calcul_geographique(snap)
+    assert geo['ca'].is_monotonic_decreasing
+    pd.testing.assert_frame_equal(par_cle(geo, 'region'), attendu, check_dtype=False, check_names=False)
+
+
+def test_champs_non_demandes_non_calcules(snap, monkeypatch):
+    def interdit(*args, **kwargs):
+        raise AssertionError("comptage distinct non demandé")
+
+    # Les comptages distincts (les plus coûteux) ne sont faits que s'ils sont demandés
+    monkeypatch.setattr(pd.Series, "nunique", interdit)
+    monkeypatch.setattr(pd.core.groupby.SeriesGroupBy, "nunique", interdit)
+    assert list(calcul_kpi_globaux(snap, champs=("ca_total", "marge_moyenne"))) == ["ca_total", "marge_moyenne"]
+    assert calcul_categories(snap, champs=("ca",)).columns.tolist() == ["categorie", "ca"]
+    assert calcul_temporel(snap, "mois", champs=("ca", "quantite")).columns.tolist() == ["periode", "ca", "quantite"]
+    assert calcul_geographique(snap, champs=("profit",)).columns.tolist() == ["region", "profit"]
+    with pytest.raises(AssertionError, match="non demandé"):
+        calcul_kpi_globaux(snap, champs=("nb_clients",))
+
+
+def test_fields(client):
+    complet = client.get("/kpi/globaux").json()
+    assert list(complet) == CHAMPS_KPI_GLOBAUX
+    partiel = client.get("/kpi/globaux", params={"fields": "nb_clients, ca_total"}).json()
+    assert partiel == {"ca_total": complet["ca_total"], "nb_clients": complet["nb_clients"]}
+
+    # Tables : la colonne d'identification est toujours renvoyée
+    lignes = client.get("/kpi/categories", params={"fields": "ca"}).json()
+    assert all(set(ligne) == {"categorie", "ca"} for ligne in lignes)
+    assert list(client.get("/kpi/clients", params={"fields": "recurrence"}).json()) == ["recurrence"]
+    page = client.get("/data/commandes", params={"limite": 3, "fields": "Order ID,Sales"}).json()
+    assert all(set(ligne) == {"Order ID", "Sales"} for ligne in page["data"])
+
+
+@pytest.mark.parametrize("url", ["/kpi/globaux", "/kpi/produits/top", "/kpi/temporel", "/kpi/clients",
+                                 "/data/commandes", "/data/export"])
+def test_fields_inconnus_422(client, url):
+    reponse = client.get(url, params={"fields": "ca,inconnu"})
+    assert reponse.status_code == 422
+    assert "inconnu" in reponse.json()["detail"]
@@ -0,0 +1,59 @@
+"""
+Tests des métriques Prometheus (metriques.py, GET /metrics)
+"""
+
+import re
+
+from metriques import Registre
+
+# Ligne d'échantillon du format texte : nom{etiquettes} valeur
+LIGNE_SERIE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="([^"\\]|\\.)*",?)*\})? [-+0-9.eEInf]+$')
+
+
+def series(texte: str) -> dict:
+    """{nom{etiquettes}: valeur} de toutes les lignes d'échantillon"""
+    resultat = {}
+    for ligne in texte.splitlines():
+        if ligne and not ligne.startswith("#"):
+            serie, _, valeur = ligne.rpartition(" ")
+            resultat[serie] = float(valeur)
+    return resultat
+
+
+def test_histogramme_cumule():
+    registre = Registre()
+    duree = registre.histogramme("test_duree_secondes", "Durée", ("endpoint",), bornes=(0.1, 1.0))
+    for valeur in (0.05, 0.5, 0.5, 3.0):
+        duree.observer(valeur, endpoint="/kpi")
+    texte = registre.exposer()
+    assert "# TYPE test_duree_secondes histogram" in texte
+    valeurs = series(texte)
+    assert valeurs['test_duree_secondes_bucket{endpoint="/kpi",le="0.1"}'] == 1
+    assert valeurs['test_duree_secondes_bucket{endpoint="/kpi",le="1"}'] == 3
+    assert valeurs['test_duree_secondes_bucket{endpoint="/kpi",le="+Inf"}'] == 4
+    assert valeurs['test_duree_secondes_count{endpoint="/kpi"}'] == 4
+    assert valeurs['test_duree_secondes_sum{endpoint="/kpi"}'] == 4.05
+
+
+def test_etiquettes_echappees_et_jauge_lue():
+    registre = Registre()
+    registre.compteur("test_total", "Compteur", ("nom",)).inc(nom='a"b\\c')
+    registre.jauge("test_lue", "Jauge lue à la collecte", ("cache",), lambda: {("resultats",): 3, ("disque",): None})
+    valeurs = series(registre.exposer())
+    assert valeurs == {'test_total{nom="a\\"b\\\\c"}': 1, 'test_lue{cache="resultats"}': 3}
+
+
+def test_endpoint_metrics(client):
+    assert client.get("/kpi/categories").status_code == 200
+    reponse = client.get("/metrics")
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texte = reponse.text
+    for ligne in texte.splitlines():
+        assert ligne.startswith("# HELP ") or ligne.startswith("# TYPE ") or LIGNE_SERIE.match(ligne), ligne
+
+    valeurs = series(texte)
+    assert valeurs['superstore_requetes_total{endpoint="/kpi/categories",methode="GET",statut="200"}'] >= 1
+    assert valeurs['superstore_requete_duree_secondes_count{endpoint="/kpi/categories",methode="GET"}'] >= 1
+    assert valeurs["superstore_dataset_version"] >= 1
+    assert any(serie.startswith("superstore_etape_duree_secondes_bucket{") for serie in valeurs)
@@ -0,0 +1,107 @@
+"""
+Tests de la pagination par curseur (pagination.py, GET /data/commandes)
+"""
+
+import numpy as np
+import orjson
+import pytest
+
+from pagination import IndexCommandes, CurseurInvalide, encoder_curseur, decoder_curseur, COLONNES_TRI
+
+
+def parcourir(index: IndexCommandes, tri: str, ordre: str, limite: int, **filtres) -> list:
+    """Numéros de ligne de toutes les pages, en suivant les curseurs"""
+    numeros, apres = [], None
+    while True:
+        page, apres = index.page(tri, ordre, limite, apres, **filtres)
+        numeros.extend(page.tolist())
+        if apres is None:
+            return numeros
+
+
+def ordre_attendu(index: IndexCommandes, tri: str, ordre: str, masque: np.ndarray) -> list:
+    """Tri de référence : clé de tri, puis numéro de ligne pour départager les ex aequo"""
+    valeurs = index.valeurs[tri] * (-1.0 if ordre == "desc" else 1.0)
+    numeros = np.flatnonzero(masque)
+    return numeros[np.lexsort((numeros, valeurs[numeros]))].tolist()
+
+
+@pytest.mark.parametrize("tri", list(COLONNES_TRI))
+@pytest.mark.parametrize("ordre", ["asc", "desc"])
+def test_parcours_complet_sans_trou_ni_doublon(stockage, tri, ordre):
+    index = IndexCommandes(stockage)
+    # 7 ne divise pas le nombre de lignes, et les ex aequo (CA) chevauchent les pages
+    numeros = parcourir(index, tri, ordre, 7)
+    assert len(numeros) == len(set(numeros)) == index.nb_lignes
+    assert numeros == ordre_attendu(index, tri, ordre, np.ones(index.nb_lignes, dtype=bool))
+
+
+def test_parcours_filtre(stockage):
+    index = IndexCommandes(stockage)
+    filtres = {"date_debut": "2023-04-01", "date_fin": "2024-02-29", "egalites": {"Region": "East", "Category": "Technology"}}
+    numeros = parcourir(index, "ca", "desc", 5, **filtres)
+    masque = index.masque(np.arange(index.nb_lignes), filtres["date_debut"], filtres["date_fin"], filtres["egalites"])
+    assert numeros == ordre_attendu(index, "ca", "desc", masque)
+    assert len(numeros) == index.total(filtres["date_debut"], filtres["date_fin"], filtres["egalites"])
+
+
+def test_lignes_lues_dans_l_ordre_de_la_page(stockage):
+    index = IndexCommandes(stockage)
+    page, _ = index.page("profit", "desc", 25)
+    lignes = index.lire(page, ["Row ID", "Profit"])
+    assert lignes["Profit"].is_monotonic_decreasing
+    assert len(lignes) == 25
+
+
+def test_curseur_refuse_autre_version_ou_autre_tri():
+    curseur = encoder_curseur("empreinte-1", "ca", "desc", 99.99, 42)
+    assert decoder_curseur(curseur, "empreinte-1", "ca", "desc") == (99.99, 42)
+    with pytest.raises(CurseurInvalide):
+        decoder_curseur(curseur, "empreinte-2", "ca", "desc")
+    with pytest.raises(CurseurInvalide):
+        decoder_curseur(curseur, "empreinte-1", "ca", "asc")
+    with pytest.raises(CurseurInvalide):
+        decoder_curseur("pas-un-curseur", "empreinte-1", "ca", "desc")
+
+
+def test_api_parcours_complet(api, client):
+    params = {"tri": "ca", "ordre": "desc", "limite": 37, "region": "West", "fields": "Row ID,Sales"}
+    lignes, curseur, total = [], None, None
+    while True:
+        reponse = client.get("/data/commandes", params={**params, **({"curseur": curseur} if curseur else {})})
+        assert reponse.status_code == 200
+        page = reponse.json()
+        total = page["total"]
+        lignes.extend(page["data"])
+        curseur = page["curseur_suivant"]
+        if curseur is None:
+            break
+    identifiants = [l["Row ID"] for l in lignes]
+    assert len(identifiants) == len(set(identifiants)) == total
+    ventes = [l["Sales"] for l in lignes]
+    assert ventes == sorted(ventes, reverse=True)
+    # Mêmes lignes que l'export avec le même filtre
+    export = client.get("/data/export", params={"region": "West", "colonnes": "Row ID"})
+    assert sorted(identifiants) == sorted(orjson.loads(l)["Row ID"] for l in export.content.splitlines())
+
+
+def test_api_curseur_perime(api, client):
+    snap = api.gestionnaire.courant()
+    perime = encoder_curseur("ancienne-empreinte", "date", "asc", 0.0, 0)
+    assert client.get("/data/commandes", params={"curseur": perime}).status_code == 400
+    autre_tri = encoder_curseur(snap.empreinte, "profit", "asc", 0.0, 0)
+    assert client.get("/data/commandes", params={"curseur": autre_tri}).status_code == 400
+
+
+def test_api_ordre_du_fichier_par_defaut(client):
+    # Sans tri : ordre du fichier source (Row ID), comme avant la pagination par curseur
+    page = client.get("/data/commandes", params={"limite": 5, "offset": 3}).json()
+    export = client.get("/data/export", params={"colonnes": "Row ID"})
+    identifiants = sorted(i for i in (orjson.loads(l)["Row ID"] for l in export.content.splitlines()) if i is not None)
+    assert [l["Row ID"] for l in page["data"]] == identifiants[3:8]
+    assert (page["tri"], page["ordre"], page["offset"]) == ("ligne", "asc", 3)
+
+
+def test_api_dates_invalides(client):
+    assert client.get("/data/commandes", params={"date_debut": "abc"}).status_code == 422
+    assert client.get("/data/commandes", params={"date_fin": "2024-13-01"}).status_code == 422
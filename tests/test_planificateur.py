@@ -0,0 +1,98 @@
+"""
+Tests du planificateur des artefacts matérialisés (planificateur.py, /admin/materialisations)
+"""
+
+import time
+
+import pytest
+
+from planificateur import A_CHAQUE_VERSION, A_INTERVALLE, A_LA_DEMANDE, Planificateur
+from versions import Snapshot
+
+
+def planificateur_sur(snaps: list) -> Planificateur:
+    """Planificateur dont l'instantané courant est le dernier de la liste"""
+    return Planificateur(lambda: snaps[-1] if snaps else None)
+
+
+def compteur(appels: list, nom: str):
+    def construire(snap):
+        appels.append((nom, snap.version))
+        return f"{nom} v{snap.version}"
+    return construire
+
+
+def test_politiques():
+    snaps, appels = [Snapshot(1, None, None)], []
+    planificateur = planificateur_sur(snaps)
+    planificateur.enregistrer("version", compteur(appels, "version"), A_CHAQUE_VERSION)
+    planificateur.enregistrer("intervalle", compteur(appels, "intervalle"), A_INTERVALLE, intervalle_s=0.05)
+    planificateur.enregistrer("demande", compteur(appels, "demande"), A_LA_DEMANDE)
+
+    # Dans l'ordre d'enregistrement ; rien à refaire sur la même version
+    assert planificateur.executer(snaps[-1]) == ["version", "intervalle"]
+    assert snaps[-1].materialises == {"version": "version v1", "intervalle": "intervalle v1"}
+    assert planificateur.executer(snaps[-1]) == []
+
+    time.sleep(0.06)
+    assert planificateur.executer(snaps[-1]) == ["intervalle"]
+
+    planificateur.demander("demande")
+    assert planificateur.executer(snaps[-1]) == ["demande"]
+    assert planificateur.executer(snaps[-1]) == []
+
+    snaps.append(Snapshot(2, None, None))
+    assert planificateur.executer(snaps[-1]) == ["version", "intervalle"]
+    assert planificateur.etat()["demande"]["statut"] == "obsolete"
+    assert planificateur.etat()["demande"]["retard_versions"] == 1
+    assert planificateur.etat()["version"]["nb_constructions"] == 2
+
+
+def test_erreur_puis_nouvelle_tentative():
+    snaps = [Snapshot(1, None, None)]
+    planificateur = planificateur_sur(snaps)
+
+    def construire(snap):
+        if snap.version == 1:
+            raise RuntimeError("échec")
+        return "table"
+
+    planificateur.enregistrer("table", construire)
+    assert planificateur.executer(snaps[-1]) == []
+    assert planificateur.etat()["table"]["statut"] == "erreur"
+    # Pas de nouvelle tentative sur la même version
+    assert planificateur.executer(snaps[-1]) == []
+
+    snaps.append(Snapshot(2, None, None))
+    assert planificateur.executer(snaps[-1]) == ["table"]
+    assert planificateur.etat()["table"]["statut"] == "a jour"
+
+
+def test_politique_invalide():
+    planificateur = planificateur_sur([])
+    with pytest.raises(ValueError):
+        planificateur.enregistrer("table", str, "toujours")
+    with pytest.raises(ValueError):
+        planificateur.enregistrer("table", str, A_INTERVALLE)
+    with pytest.raises(KeyError):
+        planificateur.demander("inconnu")
+
+
+def test_admin_materialisations(api, client, admin):
+    assert client.get("/admin/materialisations").status_code == 401
+    api.planificateur.executer(api.gestionnaire.courant())
+    reponse = client.get("/admin/materialisations", headers=admin).json()
+    assert reponse["version_donnees"] == api.gestionnaire.courant().version
+    artefacts = reponse["artefacts"]
+    assert set(api.kpi.TABLES_MATERIALISEES) | {"index_commandes"} <= set(artefacts)
+    assert artefacts["categories"]["statut"] == "a jour"
+    assert artefacts["categories"]["politique"] == A_CHAQUE_VERSION
+
+    assert client.post("/admin/materialisations/inconnu", headers=admin).status_code == 404
+    demande = client.post("/admin/materialisations/categories", headers=admin)
+    assert demande.status_code == 202
+    limite = time.monotonic() + 10
+    while client.get("/admin/materialisations", headers=admin).json()["artefacts"]["categories"]["nb_constructions"] \
+            < artefacts["categories"]["nb_constructions"] + 1:
+        assert time.monotonic() < limite, "artefact non reconstruit"
+        time.sleep(0.05)
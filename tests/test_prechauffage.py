@@ -0,0 +1,42 @@
+"""
+Tests du préchauffage du cache des réponses (prechauffage.py)
+"""
+
+from datetime import datetime, timedelta
+
+from cache_resultats import CacheResultats
+from prechauffage import PERIODES_CEO
+
+
+def test_requetes_des_dashboards_servies_par_le_prechauffage(api, client, monkeypatch):
+    cache = CacheResultats(256 * 1024 * 1024)
+    monkeypatch.setattr(api, "cache_resultats", cache)
+    api.prechauffer(api.gestionnaire.courant())
+    assert api.prechauffage.etat["etape"] == "termine" and api.prechauffage.etat["erreurs"] == 0
+    prechauffees = cache.etat()["entrees"]
+
+    # Paramètres tels que les pages Streamlit les envoient
+    valeurs = client.get("/filters/valeurs").json()
+    date_max = datetime.strptime(valeurs["plage_dates"]["max"], "%Y-%m-%d")
+    trimestre = {
+        "date_debut": (date_max - timedelta(days=PERIODES_CEO["Trimestre actuel"])).strftime("%Y-%m-%d"),
+        "date_fin": valeurs["plage_dates"]["max"],
+    }
+    requetes = [
+        ("/kpi/globaux", {}),
+        ("/kpi/globaux", {**trimestre, "region": valeurs["regions"][0]}),
+        ("/kpi/globaux", {"date_debut": valeurs["plage_dates"]["min"], "date_fin": valeurs["plage_dates"]["max"],
+                          "categorie": valeurs["categories"][-1], "segment": valeurs["segments"][0]}),
+        ("/kpi/temporel", {"periode": "mois", "format": "colonnes"}),
+        ("/kpi/temporel", {"periode": "jour"}),
+        ("/kpi/categories", {"format": "colonnes"}),
+        ("/kpi/geographique", {}),
+        ("/kpi/clients", {"limite": 5, "format": "colonnes"}),
+        ("/kpi/produits/top", {"limite": 5, "tri_par": "profit", "format": "colonnes"}),
+        ("/kpi/produits/top", {}),
+    ]
+    for url, params in requetes:
+        assert client.get(url, params=params).status_code == 200
+    # Mêmes clés que les vraies requêtes : aucune réponse calculée en plus
+    assert cache.nb_echecs == 0
+    assert cache.etat()["entrees"] == prechauffees
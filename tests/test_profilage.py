@@ -0,0 +1,50 @@
+"""
+Tests du profilage d'une requête (?profile=, profilage.py)
+"""
+
+import orjson
+
+from profilage import Echantillonneur
+
+URL = "/kpi/globaux"
+PARAMS = {"region": "Central", "segment": "Consumer"}
+
+
+def test_profilage_reserve_aux_administrateurs(client):
+    assert client.get(URL, params={**PARAMS, "profile": "1"}).status_code == 401
+    assert client.get(URL, params={**PARAMS, "profile": "1"}, headers={"X-Token-Admin": "mauvais"}).status_code == 401
+    assert client.get(URL, params=PARAMS, headers={"X-Profil": "1"}).status_code == 401
+    # profile=0 : requête ordinaire
+    assert client.get(URL, params={**PARAMS, "profile": "0"}).status_code == 200
+
+
+def test_arbre_des_etapes(client, admin):
+    normale = client.get(URL, params=PARAMS)
+    profilee = client.get(URL, params={**PARAMS, "profile": "1"}, headers=admin)
+    assert profilee.status_code == 200
+    assert profilee.content == normale.content
+    assert profilee.headers["cache-control"] == "no-store"
+    arbre = orjson.loads(profilee.headers["x-profil"])
+    assert arbre["etape"] == "calcul_kpi_globaux"
+    assert [sous_etape["etape"] for sous_etape in arbre["etapes"]] == ["agregation", "serialisation"]
+    assert "serialisation;dur=" in profilee.headers["server-timing"]
+    assert client.get(URL, params={**PARAMS, "profile": "inconnu"}, headers=admin).status_code == 422
+
+
+def test_flamegraph_d_un_calcul_rapide(client, admin):
+    reponse = client.get(URL, params={**PARAMS, "profile": "flamegraph"}, headers=admin)
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/plain")
+    assert 'filename="calcul_kpi_globaux.folded"' in reponse.headers["content-disposition"]
+    # Calcul plus rapide que l'intervalle d'échantillonnage : relancé jusqu'à avoir des piles
+    lignes = reponse.text.splitlines()
+    assert lignes and int(reponse.headers["x-profil-echantillons"]) >= 1
+    assert sum(int(ligne.rsplit(" ", 1)[1]) for ligne in lignes) == int(reponse.headers["x-profil-echantillons"])
+    assert any("calcul_kpi_globaux" in ligne for ligne in lignes)
+
+
+def test_echantillonneur_complete_un_calcul_court():
+    echantillonneur = Echantillonneur()
+    echantillonneur.completer(lambda: sum(range(1000)), nb_min=5)
+    assert echantillonneur.nb_echantillons >= 5 and echantillonneur.nb_repetitions >= 1
+    assert echantillonneur.piles_repliees()
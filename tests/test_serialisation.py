@@ -0,0 +1,81 @@
+"""
+Tests de la sérialisation des réponses (serialisation.py)
+"""
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+
+from serialisation import MEDIA_ARROW, enregistrements, serialiser
+
+
+def test_enregistrements_comme_to_dict():
+    df = pd.DataFrame({
+        "produit": ["A", "B"],
+        "quantite": np.array([3, 4], dtype="int64"),
+        "ca": [10.5, np.nan],
+        "date": pd.to_datetime(["2023-01-05", None]),
+        "code": pd.array([1, None], dtype="Int64"),
+    })
+    assert orjson.loads(serialiser(enregistrements(df))) == [
+        {"produit": "A", "quantite": 3, "ca": 10.5, "date": "2023-01-05", "code": 1},
+        {"produit": "B", "quantite": 4, "ca": None, "date": None, "code": None},
+    ]
+    # Même forme que to_dict('records') (hors dates et valeurs manquantes)
+    simple = df[["produit", "quantite"]]
+    assert enregistrements(simple) == simple.to_dict("records")
+
+
+def test_scalaires_numpy():
+    assert orjson.loads(serialiser({"n": np.int64(5), "x": np.float64(1.5), "v": np.arange(3)})) == \
+        {"n": 5, "x": 1.5, "v": [0, 1, 2]}
+
+
+def test_forme_des_reponses(client):
+    categories = client.get("/kpi/categories")
+    assert categories.headers["content-type"] == "application/json"
+    lignes = categories.json()
+    assert isinstance(lignes, list) and lignes
+    assert set(lignes[0]) == {"categorie", "ca", "profit", "nb_commandes", "marge_pct"}
+
+    globaux = client.get("/kpi/globaux").json()
+    assert isinstance(globaux["nb_commandes"], int) and isinstance(globaux["ca_total"], float)
+
+    clients = client.get("/kpi/clients", params={"limite": 3}).json()
+    assert len(clients["top_clients"]) == 3
+    assert isinstance(clients["recurrence"], dict) and isinstance(clients["segments"], list)
+
+
+def test_format_colonnes(client):
+    lignes = client.get("/kpi/temporel", params={"periode": "annee"}).json()
+    colonnes = client.get("/kpi/temporel", params={"periode": "annee", "format": "colonnes"}).json()
+    assert colonnes == {cle: [ligne[cle] for ligne in lignes] for cle in lignes[0]}
+    # Tables imbriquées converties aussi, le reste inchangé
+    clients = client.get("/kpi/clients", params={"limite": 3, "format": "columns"}).json()
+    assert len(clients["top_clients"]["customer_id"]) == 3
+    assert "total_clients" in clients["recurrence"]
+
+
+def test_format_arrow(client):
+    lignes = client.get("/kpi/categories").json()
+    for params, entetes in (({"format": "arrow"}, {}), ({}, {"Accept": MEDIA_ARROW})):
+        reponse = client.get("/kpi/categories", params=params, headers=entetes)
+        assert reponse.status_code == 200
+        assert reponse.headers["content-type"] == MEDIA_ARROW
+        table = pa.ipc.open_stream(reponse.content).read_all()
+        assert table.to_pylist() == lignes
+
+
+def test_format_arrow_commandes_avec_metadonnees(client):
+    reponse = client.get("/data/commandes", params={"limite": 5, "format": "arrow"})
+    table = pa.ipc.open_stream(reponse.content).read_all()
+    assert table.num_rows == 5
+    metadonnees = orjson.loads(table.schema.metadata[b"reponse"])
+    assert metadonnees["table"] == "data" and metadonnees["limite"] == 5
+
+
+def test_format_arrow_indisponible(client):
+    # Trois éléments dont deux tables : pas de représentation Arrow
+    reponse = client.get("/kpi/clients", params={"format": "arrow"})
+    assert reponse.status_code == 406
@@ -0,0 +1,101 @@
+"""
+Tests du stockage partitionné (stockage.py)
+"""
+
+import pandas as pd
+import pytest
+
+
+def lire_filtre(stockage, date_debut=None, date_fin=None, egalites=None) -> pd.DataFrame:
+    """Lignes retenues par le plan de lecture, filtrées ligne à ligne comme le fait l'API"""
+    blocs = list(stockage.parcourir(date_debut, date_fin, egalites))
+    df = pd.concat(blocs, ignore_index=True) if blocs else stockage.schema_vide()
+    if date_debut:
+        df = df[df["Order Date"] >= date_debut]
+    if date_fin:
+        df = df[df["Order Date"] <= date_fin]
+    for colonne, valeur in (egalites or {}).items():
+        df = df[df[colonne] == valeur]
+    return df
+
+
+def filtre_pandas(dataset, date_debut=None, date_fin=None, egalites=None) -> pd.DataFrame:
+    """Filtre de référence, sur le DataFrame complet"""
+    masque = pd.Series(True, index=dataset.index)
+    if date_debut:
+        masque &= dataset["Order Date"] >= date_debut
+    if date_fin:
+        masque &= dataset["Order Date"] <= date_fin
+    for colonne, valeur in (egalites or {}).items():
+        masque &= dataset[colonne] == valeur
+    return dataset[masque]
+
+
+def test_une_partition_par_mois(stockage, dataset):
+    assert len(stockage.partitions) == 24
+    assert stockage.nb_lignes == len(dataset)
+    for partition in stockage.partitions:
+        annee, mois = partition["cle"].split("-")
+        assert partition["date_min"][:7] == partition["date_max"][:7] == f"{annee}-{mois}"
+        assert f"annee={annee}" in partition["fichier"] and f"mois={mois}" in partition["fichier"]
+
+
+def test_elagage_des_partitions_par_date(stockage):
+    plan = stockage.plan("2023-11-15", "2024-02-10")
+    assert [p["cle"] for p, _ in plan] == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    assert stockage.plan("2030-01-01") == []
+
+
+@pytest.mark.parametrize("date_debut, date_fin", [(None, None), ("2023-03-10", "2023-09-20"), ("2024-12-01", None)])
+def test_lecture_par_dates_identique_a_pandas(stockage, dataset, date_debut, date_fin):
+    lu = lire_filtre(stockage, date_debut, date_fin)
+    assert sorted(lu["Row ID"]) == sorted(filtre_pandas(dataset, date_debut, date_fin)["Row ID"])
+
+
+def test_zones_des_groupes(stockage):
+    for partition in stockage.partitions:
+        df = stockage.lire_partition(partition)
+        for groupe in partition["groupes"]:
+            assert groupe["nb_lignes"] <= stockage.taille_groupe
+            bloc = df.iloc[groupe["debut"]:groupe["debut"] + groupe["nb_lignes"]]
+            assert groupe["zones"]["Region"]["valeurs"] == sorted(bloc["Region"].unique())
+            assert groupe["zones"]["Order Date"]["min"] == bloc["Order Date"].min().strftime("%Y-%m-%d")
+
+
+def test_zone_maps_ignorent_des_groupes(stockage):
+    egalites = {"Region": "East", "Category": "Technology"}
+    plan = stockage.plan(egalites=egalites)
+    nb_retenus = sum(len(groupes) for _, groupes in plan)
+    nb_total = sum(len(p["groupes"]) for p in stockage.partitions)
+    assert 0 < nb_retenus < nb_total / 2
+    # Aucun groupe ignoré ne contenait de ligne correspondante
+    retenus = {p["cle"]: groupes for p, groupes in plan}
+    for partition in stockage.partitions:
+        df = stockage.lire_partition(partition)
+        for i, groupe in enumerate(partition["groupes"]):
+            bloc = df.iloc[groupe["debut"]:groupe["debut"] + groupe["nb_lignes"]]
+            if i not in retenus.get(partition["cle"], []):
+                assert not ((bloc["Region"] == "East") & (bloc["Category"] == "Technology")).any()
+
+
+@pytest.mark.parametrize("egalites", [
+    {"Region": "West"},
+    {"Region": "South", "Segment": "Corporate"},
+    {"Category": "Furniture", "State": "Texas"},
+    {"Region": "Nulle part"},
+])
+def test_lecture_filtree_identique_a_pandas(stockage, dataset, egalites):
+    lu = lire_filtre(stockage, "2023-05-01", "2024-06-30", egalites)
+    assert sorted(lu["Row ID"]) == sorted(filtre_pandas(dataset, "2023-05-01", "2024-06-30", egalites)["Row ID"])
+
+
+def test_ecriture_en_plusieurs_blocs(dataset, tmp_path):
+    from stockage import StockagePartitionne
+    stockage = StockagePartitionne(str(tmp_path / "blocs"), 64 * 1024 * 1024, taille_groupe=8)
+    stockage.ouvrir_ecriture()
+    # Blocs à cheval sur plusieurs mois : chaque partition reçoit plusieurs ajouts
+    for debut in range(0, len(dataset), 50):
+        stockage.ajouter(dataset.iloc[debut:debut + 50])
+    stockage.fermer_ecriture()
+    assert len(stockage.partitions) == 24 and stockage.nb_lignes == len(dataset)
+    assert sorted(lire_filtre(stockage)["Row ID"]) == sorted(dataset["Row ID"])
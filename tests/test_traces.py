@@ -0,0 +1,107 @@
+"""
+Tests des traces de bout en bout (traces.py, POST /v1/traces, /admin/traces)
+"""
+
+import os
+import time
+
+import orjson
+import pytest
+
+from traces import JournalTraces, lot_otlp, span, verifier_lot_otlp
+
+ID_TRACE = "4bf92f3577b34da6a3ce929d0e0e4736"
+ID_RENDU = "00f067aa0ba902b7"
+JETON_TRACES = "jeton-traces-test"
+
+
+def lot_dashboard(trace_id: str = ID_TRACE) -> dict:
+    """Lot envoyé par un dashboard : span du rendu de page"""
+    debut = time.time_ns()
+    return lot_otlp("superstore-dashboard", [
+        span(trace_id, ID_RENDU, None, "rendu Home", debut, debut + 5_000_000, {"streamlit.page": "Home"})
+    ])
+
+
+@pytest.fixture
+def traces(api, monkeypatch, tmp_path):
+    """Traces activées sur un fichier temporaire"""
+    journal = JournalTraces(str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(api, "journal_traces", journal)
+    monkeypatch.setattr(api, "TRACES_TOKEN", JETON_TRACES)
+    yield journal
+    journal.fichier.fermer()
+
+
+def attendre(condition, delai_s: float = 5):
+    """Les lots sont écrits par un thread : attend qu'ils soient relisibles"""
+    limite = time.monotonic() + delai_s
+    while not condition():
+        assert time.monotonic() < limite, "condition non remplie"
+        time.sleep(0.02)
+
+
+def test_verifier_lot_otlp():
+    verifier_lot_otlp(lot_dashboard())
+    for invalide in ([], {"resourceSpans": {}}, {"resourceSpans": [1]},
+                     {"resourceSpans": [{"scopeSpans": [{"spans": [{"traceId": "x"}]}]}]}):
+        with pytest.raises(ValueError):
+            verifier_lot_otlp(invalide)
+
+
+def test_lecture_bornee_a_la_fin_du_fichier(tmp_path):
+    journal = JournalTraces(str(tmp_path / "traces.jsonl"), max_octets_lus=2000)
+    ids = [f"{i:032x}" for i in range(1, 51)]
+    for trace_id in ids:
+        journal.ecrire(lot_dashboard(trace_id))
+    journal.fichier.fermer()
+    recentes = journal.recentes(100)
+    # Seules les dernières traces tiennent dans les 2000 derniers octets
+    assert 0 < len(recentes) < len(ids)
+    assert {t["trace_id"] for t in recentes} <= set(ids[-len(recentes):])
+
+
+def test_traces_ecrites_par_un_worker_forke(tmp_path):
+    # Journal créé à l'import, avant le fork des workers (PRECHARGEMENT=1)
+    journal = JournalTraces(str(tmp_path / "traces.jsonl"))
+    pid = os.fork()
+    if pid == 0:
+        try:
+            journal.ecrire(lot_dashboard())
+            journal.fichier.fermer()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert [t["trace_id"] for t in journal.recentes(10)] == [ID_TRACE]
+
+
+def test_post_traces_protege(client, traces):
+    corps = orjson.dumps(lot_dashboard())
+    assert client.post("/v1/traces", content=corps).status_code == 401
+    entetes = {"X-Token-Traces": JETON_TRACES, "Content-Type": "application/json"}
+    assert client.post("/v1/traces", content=b"{", headers=entetes).status_code == 400
+    assert client.post("/v1/traces", content=b'{"resourceSpans": [1]}', headers=entetes).status_code == 400
+    enorme = orjson.dumps({"resourceSpans": [], "x": "a" * 300 * 1024})
+    assert client.post("/v1/traces", content=enorme, headers=entetes).status_code == 413
+    assert client.post("/v1/traces", content=corps, headers=entetes).status_code == 200
+
+
+def test_cascade_dashboard_et_api(client, admin, traces):
+    entetes = {"X-Token-Traces": JETON_TRACES}
+    assert client.post("/v1/traces", content=orjson.dumps(lot_dashboard()), headers=entetes).status_code == 200
+    reponse = client.get(
+        "/kpi/globaux", params={"segment": "Consumer"},
+        headers={"traceparent": f"00-{ID_TRACE}-{ID_RENDU}-01"}
+    )
+    assert reponse.status_code == 200
+
+    def cascade():
+        reponse = client.get(f"/admin/traces/{ID_TRACE}", headers=admin)
+        return reponse.json()["spans"] if reponse.status_code == 200 else []
+
+    attendre(lambda: any(s["service"] == "superstore-api" for s in cascade()))
+    spans = cascade()
+    assert spans[0]["nom"] == "rendu Home" and spans[0]["profondeur"] == 0
+    requete = next(s for s in spans if s["nom"] == "GET /kpi/globaux")
+    assert requete["parent_id"] == ID_RENDU and requete["profondeur"] == 1
+    assert client.get("/admin/traces", headers=admin).json()["traces"][0]["trace_id"] == ID_TRACE
@@ -0,0 +1,75 @@
+"""
+Tests des versions immuables du dataset (versions.py)
+"""
+
+import os
+import threading
+
+from agregats import Agregats, ConstructeurAgregats
+from stockage import StockagePartitionne
+from versions import GestionnaireDataset, Snapshot
+
+
+def gestionnaire_sur(dossier) -> GestionnaireDataset:
+    return GestionnaireDataset(
+        str(dossier / "versions"), lambda repertoire: StockagePartitionne(repertoire, 64 * 1024 * 1024, taille_groupe=8)
+    )
+
+
+def construire(stockage: StockagePartitionne, df) -> Agregats:
+    """Remplit le stockage de la version et calcule ses agrégats (comme load_data)"""
+    stockage.ouvrir_ecriture()
+    stockage.ajouter(df)
+    stockage.fermer_ecriture()
+    constructeur = ConstructeurAgregats()
+    constructeur.ajouter(df)
+    return constructeur.finaliser()
+
+
+def test_versions_successives(tmp_path, dataset):
+    gestionnaire = gestionnaire_sur(tmp_path)
+    assert gestionnaire.courant() is None
+    v1 = gestionnaire.reconstruire(lambda s: construire(s, dataset))
+    v2 = gestionnaire.reconstruire(lambda s: construire(s, dataset.iloc[:100]))
+    assert (v1.version, v2.version) == (1, 2)
+    assert gestionnaire.courant() is v2
+    # La version précédente reste lisible pour les requêtes en cours
+    assert v1.stockage.nb_lignes == len(dataset) and v2.stockage.nb_lignes == 100
+    assert sum(len(v1.stockage.lire_partition(p)) for p in v1.stockage.partitions) == len(dataset)
+    # Mêmes données = même empreinte, données différentes = empreinte différente
+    v3 = gestionnaire.reconstruire(lambda s: construire(s, dataset))
+    assert v3.empreinte == v1.empreinte != v2.empreinte
+
+
+def test_seules_les_deux_dernieres_versions_sont_gardees(tmp_path, dataset):
+    gestionnaire = gestionnaire_sur(tmp_path)
+    for _ in range(4):
+        snap = gestionnaire.reconstruire(lambda s: construire(s, dataset.iloc[:50]))
+    assert sorted(os.listdir(tmp_path / "versions")) == ["v00003", "v00004"]
+    assert os.path.basename(snap.stockage.repertoire) == "v00004"
+
+
+def test_reconstruction_en_arriere_plan_unique(tmp_path, dataset):
+    gestionnaire = gestionnaire_sur(tmp_path)
+    debloquer, publiee = threading.Event(), threading.Event()
+
+    def construire_lentement(stockage):
+        debloquer.wait(5)
+        return construire(stockage, dataset)
+
+    assert gestionnaire.reconstruire_en_arriere_plan(construire_lentement, lambda snap: publiee.set())
+    assert gestionnaire.reconstruction_en_cours
+    assert not gestionnaire.reconstruire_en_arriere_plan(construire_lentement)
+    debloquer.set()
+    assert publiee.wait(5)
+    assert gestionnaire.courant().version == 1
+
+
+def test_tables_derivees_ajoutees_par_copie():
+    snap = Snapshot(1, None, None)
+    snap.ajouter_materialise("categories", "table 1")
+    parcours = snap.materialises
+    snap.ajouter_materialise("clients", "table 2")
+    # Un lecteur qui parcourait l'ancien dictionnaire n'est pas perturbé
+    assert parcours == {"categories": "table 1"}
+    assert snap.materialises == {"categories": "table 1", "clients": "table 2"}